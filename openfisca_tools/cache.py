@@ -0,0 +1,445 @@
+"""
+Bounded caches of simulations and their results.
+"""
+
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from functools import partial
+import hashlib
+import os
+from pathlib import Path
+import re
+from types import CodeType, FunctionType, MethodType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    ItemsView,
+    Iterator,
+    Optional,
+    Tuple,
+    ValuesView,
+)
+import numpy as np
+from openfisca_core.variables import Variable
+
+try:
+    from importlib.metadata import PackageNotFoundError, version
+except ImportError:  # Python < 3.8
+    from pkg_resources import DistributionNotFound as PackageNotFoundError
+    from pkg_resources import get_distribution
+
+    def version(name: str) -> str:
+        return get_distribution(name).version
+
+
+_file_hashes: Dict[Tuple[str, int, int], str] = {}
+
+
+class SimulationCache(MutableMapping):
+    """A dictionary of simulations which evicts the least recently used ones
+    when their combined memory usage exceeds a budget.
+
+    Simulations must provide a `memory_usage()` method returning a number of
+    bytes, which is re-measured on each access as simulations grow when they
+    calculate more variables.
+    """
+
+    def __init__(self, max_memory: float = None):
+        """Initialises an empty cache.
+
+        Args:
+            max_memory (float, optional): The memory budget in bytes. Defaults to None (unbounded).
+        """
+        self.max_memory = max_memory
+        self._simulations = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __getitem__(self, key: Hashable) -> Any:
+        if key not in self._simulations:
+            self.misses += 1
+            raise KeyError(key)
+        self.hits += 1
+        self._simulations.move_to_end(key)
+        self.evict(keep=key)
+        return self._simulations[key]
+
+    def __setitem__(self, key: Hashable, simulation: Any):
+        self._simulations[key] = simulation
+        self._simulations.move_to_end(key)
+        self.evict(keep=key)
+
+    def __delitem__(self, key: Hashable):
+        del self._simulations[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._simulations
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._simulations)
+
+    def __len__(self) -> int:
+        return len(self._simulations)
+
+    # The methods below act on the stored simulations directly, as those
+    # inherited from MutableMapping go through `__getitem__`, which would
+    # count each entry as a hit.
+
+    def clear(self):
+        self._simulations.clear()
+
+    def pop(self, key: Hashable, *default: Any) -> Any:
+        return self._simulations.pop(key, *default)
+
+    def popitem(self) -> Tuple[Hashable, Any]:
+        return self._simulations.popitem(last=False)
+
+    def items(self) -> ItemsView:
+        return self._simulations.items()
+
+    def values(self) -> ValuesView:
+        return self._simulations.values()
+
+    def memory_usage(self) -> int:
+        """Returns the combined memory usage of the cached simulations.
+
+        Returns:
+            int: The number of bytes used.
+        """
+        return sum(
+            simulation.memory_usage()
+            for simulation in self._simulations.values()
+        )
+
+    def evict(self, keep: Hashable = None):
+        """Removes least recently used simulations until the cache is within its
+        memory budget.
+
+        Args:
+            keep (Hashable, optional): A key never to evict (e.g. the one in use). Defaults to None.
+        """
+        if self.max_memory is None:
+            return
+        sizes = {
+            key: simulation.memory_usage()
+            for key, simulation in self._simulations.items()
+        }
+        total = sum(sizes.values())
+        for key in list(self._simulations):
+            if total <= self.max_memory:
+                break
+            if key == keep:
+                continue
+            del self._simulations[key]
+            total -= sizes[key]
+            self.evictions += 1
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Returns usage statistics for the cache.
+
+        Returns:
+            Dict[str, int]: Hits, misses, evictions, entries and memory usage.
+        """
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            entries=len(self),
+            memory_usage=self.memory_usage(),
+        )
+
+
+class ResultCache:
+    """A folder of calculated arrays, stored as one `.npy` file per variable and
+    period under a key identifying the simulation. When the folder exceeds a
+    size limit, the least recently used files are removed."""
+
+    def __init__(self, folder: Path, max_size: float = None):
+        """Opens (and creates, if needed) a result cache folder.
+
+        Args:
+            folder (Path): The folder to store results in.
+            max_size (float, optional): The size limit in bytes. Defaults to None (unbounded).
+        """
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = None
+
+    def file(self, key: str, variable: str, period: Any) -> Path:
+        return self.folder / key / f"{variable}_{period}.npy"
+
+    def get(
+        self, key: str, variable: str, period: Any
+    ) -> Optional[np.ndarray]:
+        """Reads a stored result.
+
+        Args:
+            key (str): The simulation key.
+            variable (str): The name of the variable.
+            period (Any): The time period.
+
+        Returns:
+            Optional[np.ndarray]: The values, or None if they are not stored.
+        """
+        file = self.file(key, variable, period)
+        try:
+            values = np.load(file)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        # Modification times record recency of use, for eviction.
+        os.utime(file)
+        self.hits += 1
+        return values
+
+    def put(
+        self, key: str, variable: str, period: Any, values: np.ndarray
+    ) -> None:
+        """Stores a result.
+
+        Args:
+            key (str): The simulation key.
+            variable (str): The name of the variable.
+            period (Any): The time period.
+            values (np.ndarray): The values.
+        """
+        file = self.file(key, variable, period)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so other processes never read partial files.
+        temporary_file = file.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporary_file, "wb") as f:
+            np.save(f, np.asarray(values))
+        os.replace(temporary_file, file)
+        if self._size is not None:
+            self._size += file.stat().st_size
+        self.evict()
+
+    def size(self) -> int:
+        """Returns the total size of stored results.
+
+        Returns:
+            int: The number of bytes.
+        """
+        return sum(file.stat().st_size for file in self.folder.glob("*/*.npy"))
+
+    def evict(self) -> None:
+        """Removes least recently used results until the folder is within its
+        size limit."""
+        if self.max_size is None:
+            return
+        if self._size is None:
+            self._size = self.size()
+        if self._size <= self.max_size:
+            return
+        files = sorted(
+            (file.stat().st_mtime, file.stat().st_size, file)
+            for file in self.folder.glob("*/*.npy")
+        )
+        self._size = sum(size for _, size, _ in files)
+        for _, size, file in files:
+            if self._size <= self.max_size:
+                break
+            _remove(file)
+            self._size -= size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Removes all stored results."""
+        for file in self.folder.glob("*/*.npy"):
+            _remove(file)
+        self._size = 0
+
+
+def _remove(file: Path) -> None:
+    # Other processes may remove the same files.
+    try:
+        file.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def hash_file(path: Path) -> str:
+    """Hashes the contents of a file, once per process for each version of
+    the file.
+
+    Args:
+        path (Path): The file.
+
+    Returns:
+        str: The SHA-256 hex digest.
+    """
+    stat = os.stat(path)
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_hashes:
+        file_hash = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                file_hash.update(block)
+        _file_hashes[key] = file_hash.hexdigest()
+    return _file_hashes[key]
+
+
+def get_package_version(module: str) -> str:
+    """Returns the installed version of the package containing a module.
+
+    Args:
+        module (str): The module name, e.g. "openfisca_uk.system".
+
+    Returns:
+        str: The version, or an empty string if the package is not installed.
+    """
+    package = module.split(".")[0]
+    for name in (package, package.replace("_", "-")):
+        try:
+            return version(name)
+        except PackageNotFoundError:
+            continue
+    return ""
+
+
+def fingerprint_function(function: Callable) -> tuple:
+    """Summarises a function's code, default arguments and the values it
+    closes over, recursing into closed-over functions, so that the
+    fingerprint is the same in every process. Values whose representation
+    includes a memory address are summarised by their attributes, or make
+    fingerprints differ between processes (which only causes cache misses)
+    if they have none.
+
+    Args:
+        function (Callable): The function.
+
+    Returns:
+        tuple: The fingerprint.
+    """
+    return _fingerprint_value(function, set())
+
+
+def _fingerprint_value(value: Any, seen: set) -> Any:
+    if isinstance(value, (type(None), bool, int, float, complex, str, bytes)):
+        return repr(value)
+    if id(value) in seen:
+        # A reference cycle, e.g. a recursive closure.
+        return "<cycle>"
+    seen = seen | {id(value)}
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    if isinstance(value, CodeType):
+        return _fingerprint_code(value)
+    if isinstance(value, partial):
+        return (
+            "partial",
+            _fingerprint_value(value.func, seen),
+            _fingerprint_value(value.args, seen),
+            _fingerprint_value(value.keywords, seen),
+        )
+    if isinstance(value, MethodType):
+        return (
+            "method",
+            _fingerprint_value(value.__func__, seen),
+            _fingerprint_value(type(value.__self__), seen),
+        )
+    if isinstance(value, FunctionType):
+        closure = []
+        for cell in value.__closure__ or ():
+            try:
+                closure.append(_fingerprint_value(cell.cell_contents, seen))
+            except ValueError:  # An empty cell
+                closure.append("<empty>")
+        return (
+            _fingerprint_code(value.__code__),
+            _fingerprint_value(value.__defaults__, seen),
+            _fingerprint_value(value.__kwdefaults__, seen),
+            tuple(closure),
+        )
+    if isinstance(value, (list, tuple)):
+        return (
+            type(value).__name__,
+            tuple(_fingerprint_value(item, seen) for item in value),
+        )
+    if isinstance(value, (set, frozenset)):
+        return (
+            type(value).__name__,
+            tuple(
+                sorted(repr(_fingerprint_value(item, seen)) for item in value)
+            ),
+        )
+    if isinstance(value, dict):
+        return (
+            type(value).__name__,
+            tuple(
+                sorted(
+                    (
+                        repr(_fingerprint_value(key, seen)),
+                        _fingerprint_value(item, seen),
+                    )
+                    for key, item in value.items()
+                )
+            ),
+        )
+    if isinstance(value, np.ndarray):
+        return (
+            "ndarray",
+            value.dtype.str,
+            value.shape,
+            hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest(),
+        )
+    representation = repr(value)
+    if _MEMORY_ADDRESS.search(representation) and hasattr(value, "__dict__"):
+        return (
+            _fingerprint_value(type(value), seen),
+            _fingerprint_value(vars(value), seen),
+        )
+    return representation
+
+
+# Matches the memory addresses in default object representations.
+_MEMORY_ADDRESS = re.compile(r" at 0x[0-9a-fA-F]+")
+
+
+def _fingerprint_code(code: CodeType) -> tuple:
+    # Nested functions' code objects are represented with memory addresses.
+    return (
+        code.co_code,
+        code.co_names,
+        tuple(
+            (
+                _fingerprint_code(constant)
+                if isinstance(constant, CodeType)
+                else repr(constant)
+            )
+            for constant in code.co_consts
+        ),
+    )
+
+
+def fingerprint_variable(variable: Optional[Variable]) -> tuple:
+    """Summarises a variable's definition, including its formulas.
+
+    Args:
+        variable (Optional[Variable]): The variable, or None if removed.
+
+    Returns:
+        tuple: The fingerprint.
+    """
+    if variable is None:
+        return ()
+    return (
+        variable.name,
+        variable.entity.key,
+        repr(variable.value_type),
+        variable.definition_period,
+        variable.is_neutralized,
+        repr(variable.default_value),
+        tuple(
+            (start, fingerprint_function(formula))
+            for start, formula in variable.formulas.items()
+        ),
+    )
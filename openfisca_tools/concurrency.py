@@ -0,0 +1,244 @@
+"""
+Awaitable calculations, for serving simulations from an asyncio event loop.
+"""
+
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable
+
+_executor: Executor = None
+_executor_lock = threading.Lock()
+# Simulations sharing a baseline share a lock, as they read its results.
+_simulation_locks = weakref.WeakKeyDictionary()
+# In-flight calls, by event loop and then by call key.
+_calls = weakref.WeakKeyDictionary()
+# The cancellation event of the calculation running in each worker thread.
+_running = threading.local()
+
+
+class CalculationCancelled(Exception):
+    """Raised in a worker thread to stop a calculation whose callers have all
+    been cancelled."""
+
+
+class Call:
+    """A calculation running in the executor, awaited by one or more
+    callers."""
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        executor: Executor,
+        function: Callable,
+    ):
+        self.cancelled = threading.Event()
+        self.waiters = 0
+        self.future = loop.run_in_executor(executor, function, self.cancelled)
+
+    def cancel(self) -> None:
+        """Stops the calculation: it is removed from the executor's queue if
+        it hasn't started, or stopped before its next variable if it has."""
+        self.cancelled.set()
+        self.future.cancel()
+
+
+def get_executor() -> Executor:
+    """Gets the executor running awaitable calculations, creating a thread
+    pool if none is set.
+
+    Returns:
+        Executor: The executor.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                thread_name_prefix="openfisca-tools"
+            )
+        return _executor
+
+
+def set_executor(executor: Executor) -> None:
+    """Sets the executor running awaitable calculations, shutting down any
+    thread pool created by `get_executor`.
+
+    Args:
+        executor (Executor): The executor, e.g. a `ThreadPoolExecutor` sized for the service.
+    """
+    global _executor
+    with _executor_lock:
+        previous, _executor = _executor, executor
+    if previous is not None and previous is not executor:
+        previous.shutdown(wait=False)
+
+
+def shutdown_executor(wait: bool = True) -> None:
+    """Shuts down the executor running awaitable calculations. A new one is
+    created when next needed.
+
+    Args:
+        wait (bool, optional): Whether to wait for running calculations to finish. Defaults to True.
+    """
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+def get_simulation_lock(sim: Any) -> threading.Lock:
+    """Gets the lock held while a simulation calculates. OpenFisca simulations
+    are not thread-safe, so a simulation, its baseline and any other
+    simulations using that baseline calculate one at a time.
+
+    Args:
+        sim (Any): The Microsimulation or IndividualSim.
+
+    Returns:
+        threading.Lock: The lock.
+    """
+    while getattr(sim, "baseline", None) is not None:
+        sim = sim.baseline
+    with _executor_lock:
+        if sim not in _simulation_locks:
+            _simulation_locks[sim] = threading.Lock()
+        return _simulation_locks[sim]
+
+
+def get_call_key(sim: Any, method: str, args: tuple, kwargs: dict) -> Hashable:
+    """Identifies a call, so that identical concurrent calls can share one
+    calculation.
+
+    Args:
+        sim (Any): The simulation.
+        method (str): The name of the method called.
+        args (tuple): The positional arguments.
+        kwargs (dict): The keyword arguments.
+
+    Returns:
+        Hashable: The key, or None if the arguments are not hashable.
+    """
+
+    def freeze(value: Any) -> Hashable:
+        if isinstance(value, (list, tuple)):
+            return tuple(freeze(item) for item in value)
+        if isinstance(value, dict):
+            return tuple(
+                sorted((key, freeze(item)) for key, item in value.items())
+            )
+        hash(value)
+        return value
+
+    try:
+        return (id(sim), method, freeze(args), freeze(kwargs))
+    except TypeError:
+        return None
+
+
+def run_calculation(
+    sim: Any,
+    method: str,
+    args: tuple,
+    kwargs: dict,
+    cancelled: threading.Event,
+) -> Any:
+    """Runs a simulation method in a worker thread, in which the simulations
+    it uses stop before their next variable if the calculation is cancelled
+    (see `check_cancelled`).
+
+    Args:
+        sim (Any): The simulation.
+        method (str): The name of the method.
+        args (tuple): The positional arguments.
+        kwargs (dict): The keyword arguments.
+        cancelled (threading.Event): Set when the calculation should stop.
+
+    Raises:
+        CalculationCancelled: If the calculation is cancelled.
+
+    Returns:
+        Any: The method's result.
+    """
+    with get_simulation_lock(sim):
+        if cancelled.is_set():
+            raise CalculationCancelled()
+        _running.cancelled = cancelled
+        try:
+            return getattr(sim, method)(*args, **kwargs)
+        finally:
+            _running.cancelled = None
+
+
+def check_cancelled() -> None:
+    """Stops the calculation running in this thread if it has been cancelled.
+    Simulations call this before each variable they calculate.
+
+    Raises:
+        CalculationCancelled: If the calculation is cancelled.
+    """
+    cancelled = getattr(_running, "cancelled", None)
+    if cancelled is not None and cancelled.is_set():
+        raise CalculationCancelled()
+
+
+def stop_when_cancelled(simulation: Any) -> None:
+    """Makes an OpenFisca simulation check before each variable it calculates
+    whether the awaited calculation using it has been cancelled.
+
+    Args:
+        simulation (Any): The OpenFisca simulation.
+    """
+    calculate = simulation._calculate
+
+    def check_and_calculate(variable_name, period):
+        check_cancelled()
+        return calculate(variable_name, period)
+
+    # Formulas calculate their inputs through the simulation, which finds
+    # cached values or runs formulas in `_calculate`.
+    simulation._calculate = check_and_calculate
+
+
+async def run_async(sim: Any, method: str, *args, **kwargs) -> Any:
+    """Runs a simulation method in the executor without blocking the event
+    loop. Identical concurrent calls on the same simulation share one
+    calculation (and its result, which callers should not modify), and
+    it is cancelled if all its callers are.
+
+    Args:
+        sim (Any): The Microsimulation or IndividualSim.
+        method (str): The name of the method, e.g. "calc".
+
+    Returns:
+        Any: The method's result.
+    """
+    loop = asyncio.get_event_loop()
+    calls: Dict[Hashable, Call] = _calls.setdefault(loop, {})
+    key = get_call_key(sim, method, args, kwargs)
+    call = calls.get(key) if key is not None else None
+    if call is None:
+        call = Call(
+            loop,
+            get_executor(),
+            lambda cancelled: run_calculation(
+                sim, method, args, kwargs, cancelled
+            ),
+        )
+        if key is not None:
+            calls[key] = call
+            call.future.add_done_callback(
+                lambda _: (
+                    calls.pop(key, None) if calls.get(key) is call else None
+                )
+            )
+    call.waiters += 1
+    try:
+        return await asyncio.shield(call.future)
+    finally:
+        call.waiters -= 1
+        if call.waiters == 0 and not call.future.done():
+            call.cancel()
+            if calls.get(key) is call:
+                del calls[key]
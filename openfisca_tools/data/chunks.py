@@ -0,0 +1,206 @@
+"""
+Partitioning of array datasets into chunks of whole groups.
+"""
+
+from typing import Dict, Iterator, List
+import numpy as np
+from openfisca_tools.data.dataset import Dataset, MemoryMappedArrays
+
+
+class DatasetChunk:
+    """An in-memory subset of the groups in an array dataset, which a
+    Microsimulation can load in place of the full dataset."""
+
+    def __init__(self, dataset: Dataset, year: int, data: MemoryMappedArrays):
+        self.name = f"{dataset.name}_chunk"
+        self.label = dataset.label
+        self.data_format = dataset.data_format
+        self.years = [year]
+        self.data = data
+
+    def load(
+        self,
+        year: int,
+        key: str = None,
+        mode: str = "r",
+        memory_map: bool = False,
+    ) -> MemoryMappedArrays:
+        """Returns the chunk's arrays, in the same way as `Dataset.load`.
+
+        Args:
+            year (int): The year of the dataset.
+            key (str, optional): The key to load. Defaults to None.
+
+        Returns:
+            MemoryMappedArrays: The arrays, or a single array if a key is given.
+        """
+        if key is None:
+            return self.data
+        return self.data[key]
+
+
+def iter_dataset_chunks(
+    dataset: Dataset,
+    year: int,
+    person_entity: str,
+    group_entities: List[str],
+    variable_entities: Dict[str, str],
+    chunk_size: int,
+) -> Iterator[DatasetChunk]:
+    """Splits an array dataset into chunks, each containing up to `chunk_size`
+    of the first group entity (e.g. households), with all their members and
+    the other groups those members belong to. Only one chunk's arrays are held
+    in memory at a time, as the dataset is memory-mapped.
+
+    Args:
+        dataset (Dataset): The dataset.
+        year (int): The year of the dataset.
+        person_entity (str): The person entity key, e.g. "person".
+        group_entities (List[str]): The group entity keys, partitioning by the first.
+        variable_entities (Dict[str, str]): The entity key of each variable. Arrays of other variables are dropped.
+        chunk_size (int): The number of top-level groups per chunk.
+
+    Returns:
+        Iterator[DatasetChunk]: The chunks.
+    """
+    data = load_memory_mapped(dataset, year)
+    top_positions = get_top_group_positions(
+        data, dataset, year, person_entity, group_entities
+    )
+    top_count = len(data[f"{group_entities[0]}_id{_suffix(dataset, year)}"])
+    chunk_count = -(-top_count // chunk_size)
+    entity_indices = {
+        entity: np.split(
+            np.argsort(chunks, kind="stable"),
+            np.cumsum(np.bincount(chunks, minlength=chunk_count))[:-1],
+        )
+        for entity, chunks in (
+            (entity, positions // chunk_size)
+            for entity, positions in top_positions.items()
+        )
+    }
+    for i in range(chunk_count):
+        yield DatasetChunk(
+            dataset,
+            year,
+            subset_arrays(
+                data,
+                dataset,
+                person_entity,
+                group_entities,
+                variable_entities,
+                {
+                    entity: indices[i]
+                    for entity, indices in entity_indices.items()
+                },
+            ),
+        )
+
+
+def load_memory_mapped(dataset: Dataset, year: int) -> MemoryMappedArrays:
+    """Memory-maps a year of a dataset, saving the memory map if needed.
+
+    Args:
+        dataset (Dataset): The dataset.
+        year (int): The year of the dataset.
+
+    Returns:
+        MemoryMappedArrays: The arrays.
+    """
+    if not dataset.has_memory_map(year):
+        dataset.save_memory_map(year)
+    return dataset.load(year, memory_map=True)
+
+
+def get_top_group_positions(
+    data: MemoryMappedArrays,
+    dataset: Dataset,
+    year: int,
+    person_entity: str,
+    group_entities: List[str],
+) -> Dict[str, np.ndarray]:
+    """Finds the position of the first group entity (e.g. household) which
+    each person and group belongs to, i.e. that of its members.
+
+    Args:
+        data (MemoryMappedArrays): The dataset's arrays.
+        dataset (Dataset): The dataset.
+        year (int): The year of the dataset.
+        person_entity (str): The person entity key, e.g. "person".
+        group_entities (List[str]): The group entity keys, the first containing the others.
+
+    Returns:
+        Dict[str, np.ndarray]: The positions of each entity's records, by entity key.
+    """
+    suffix = _suffix(dataset, year)
+    top_entity = group_entities[0]
+    person_positions = _positions(
+        data[f"{top_entity}_id{suffix}"],
+        data[f"person_{top_entity}_id{suffix}"],
+    )
+    positions = {person_entity: person_positions}
+    for group in group_entities:
+        group_positions = np.zeros(len(data[f"{group}_id{suffix}"]), dtype=int)
+        group_positions[
+            _positions(
+                data[f"{group}_id{suffix}"], data[f"person_{group}_id{suffix}"]
+            )
+        ] = person_positions
+        positions[group] = group_positions
+    return positions
+
+
+def subset_arrays(
+    data: MemoryMappedArrays,
+    dataset: Dataset,
+    person_entity: str,
+    group_entities: List[str],
+    variable_entities: Dict[str, str],
+    entity_indices: Dict[str, np.ndarray],
+) -> MemoryMappedArrays:
+    """Reads the given records of each entity into memory.
+
+    Args:
+        data (MemoryMappedArrays): The dataset's arrays.
+        dataset (Dataset): The dataset.
+        person_entity (str): The person entity key, e.g. "person".
+        group_entities (List[str]): The group entity keys.
+        variable_entities (Dict[str, str]): The entity key of each variable. Arrays of other variables are dropped.
+        entity_indices (Dict[str, np.ndarray]): The indices of the records to keep, by entity key.
+
+    Returns:
+        MemoryMappedArrays: The subset arrays.
+    """
+    for group in group_entities:
+        variable_entities = {
+            **variable_entities,
+            f"{group}_id": group,
+            f"person_{group}_id": person_entity,
+            f"person_{group}_role": person_entity,
+        }
+    variable_entities["role"] = person_entity
+    subset = MemoryMappedArrays()
+    for variable in data.keys():
+        if variable not in variable_entities:
+            continue
+        indices = entity_indices[variable_entities[variable]]
+        if dataset.data_format == Dataset.TIME_PERIOD_ARRAYS:
+            subset[variable] = MemoryMappedArrays()
+            for period in data[variable].keys():
+                subset[variable][period] = data[variable][period][indices]
+        else:
+            subset[variable] = data[variable][indices]
+    return subset
+
+
+def _suffix(dataset: Dataset, year: int) -> str:
+    # The key suffix of arrays for the year.
+    if dataset.data_format == Dataset.TIME_PERIOD_ARRAYS:
+        return f"/{year}"
+    return ""
+
+
+def _positions(ids: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    # The index in `ids` of each of `keys`.
+    sorter = np.argsort(ids)
+    return sorter[np.searchsorted(ids, keys, sorter=sorter)]
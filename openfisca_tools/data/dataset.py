@@ -1,12 +1,145 @@
-from typing import Callable, Union
+from typing import Any, Callable, Union
+import json
 import logging
 import os
 from pathlib import Path
 import re
+import shutil
 import pandas as pd
 import h5py
 import numpy as np
 
+# The file in a memory map folder identifying the HDF5 file it mirrors.
+MEMORY_MAP_SOURCE = "source.json"
+
+
+class MemoryMappedArrays(dict):
+    """A read-only, dictionary-like view of an array dataset file, in which
+    arrays are memory-mapped rather than read into memory where the storage
+    layout allows it. Nested keys (e.g. for time-period arrays) are returned as
+    nested `MemoryMappedArrays`."""
+
+    def __init__(self, file: Path = None, memory_map_folder: Path = None):
+        super().__init__()
+        if file is None:
+            return
+        if memory_map_folder is not None and not is_memory_map_current(
+            file, memory_map_folder
+        ):
+            # `.npy` files written from an earlier version of the file.
+            memory_map_folder = None
+        with h5py.File(file, mode="r") as f:
+            f.visititems(
+                lambda key, item: self._add(file, memory_map_folder, key, item)
+            )
+
+    def _add(
+        self,
+        file: Path,
+        memory_map_folder: Path,
+        key: str,
+        item: Union[h5py.Dataset, h5py.Group],
+    ):
+        if not isinstance(item, h5py.Dataset):
+            return
+        *groups, name = key.split("/")
+        node = self
+        for group in groups:
+            node = node.setdefault(group, MemoryMappedArrays())
+        npy_file = (
+            memory_map_folder / f"{key}.npy"
+            if memory_map_folder is not None
+            else None
+        )
+        if npy_file is not None and npy_file.exists():
+            values = np.load(npy_file, mmap_mode="r")
+        elif (
+            item.chunks is None
+            and item.compression is None
+            and item.dtype.kind != "O"
+            and item.id.get_offset() is not None
+        ):
+            # Contiguous, uncompressed datasets can be mapped directly.
+            values = np.memmap(
+                file,
+                mode="r",
+                dtype=item.dtype,
+                shape=item.shape,
+                offset=item.id.get_offset(),
+            )
+        else:
+            # Chunked or compressed datasets are read when first used.
+            node[name] = _DeferredRead(file, key)
+            return
+        # Plain array views of the maps, so results of operations on them are not memmaps.
+        node[name] = np.asarray(values)
+
+    def __getitem__(self, key: str) -> Union[np.ndarray, "MemoryMappedArrays"]:
+        if "/" in key:
+            group, key = key.split("/", 1)
+            return self[group][key]
+        value = super().__getitem__(key)
+        if isinstance(value, _DeferredRead):
+            value = value.read()
+            self[key] = value
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def close(self):
+        """Included for compatibility with `h5py.File`: memory maps are released
+        when the arrays using them are."""
+        pass
+
+
+def is_memory_map_current(file: Path, memory_map_folder: Path) -> bool:
+    """Checks whether a folder of `.npy` files was written from the current
+    version of an HDF5 file.
+
+    Args:
+        file (Path): The HDF5 file.
+        memory_map_folder (Path): The folder of `.npy` files.
+
+    Returns:
+        bool: Whether the folder exists and matches the file's size and modification time.
+    """
+    source_file = Path(memory_map_folder) / MEMORY_MAP_SOURCE
+    if not source_file.exists():
+        return False
+    return json.loads(source_file.read_text()) == _get_file_stamp(file)
+
+
+def _write_memory_map_source(file: Path, memory_map_folder: Path):
+    # Records the version of the HDF5 file the `.npy` files mirror.
+    source_file = Path(memory_map_folder) / MEMORY_MAP_SOURCE
+    source_file.write_text(json.dumps(_get_file_stamp(file)))
+
+
+def _get_file_stamp(file: Path) -> dict:
+    stat = os.stat(file)
+    return dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+
+class _DeferredRead:
+    # A dataset in an HDF5 file which can't be memory-mapped, read on use.
+
+    def __init__(self, file: Path, key: str):
+        self.file = file
+        self.key = key
+
+    def read(self) -> np.ndarray:
+        with h5py.File(self.file, mode="r") as f:
+            values = np.asarray(f[self.key][()])
+        values.flags.writeable = False
+        return values
+
 
 class Dataset:
     """The `Dataset` class is a base class for datasets used directly or indirectly for OpenFisca models.
@@ -96,8 +229,68 @@ class Dataset:
         """
         return self.folder_path / self.filename(year)
 
+    def memory_map_folder(self, year: int) -> Path:
+        """Returns the path to the folder of `.npy` files mirroring the dataset for a given year.
+
+        Args:
+            year (int): The year of the dataset.
+
+        Returns:
+            Path: The path to the folder.
+        """
+        return self.folder_path / f"{self.name}_{year}_arrays"
+
+    def has_memory_map(self, year: int) -> bool:
+        """Checks whether the `.npy` files mirroring the dataset for a given year
+        are up to date, i.e. were written from the current HDF5 file.
+
+        Args:
+            year (int): The year of the dataset.
+
+        Returns:
+            bool: Whether the memory map is up to date.
+        """
+        return self.file(year).exists() and is_memory_map_current(
+            self.file(year), self.memory_map_folder(year)
+        )
+
+    def save_memory_map(self, year: int):
+        """Writes every array in the dataset for a given year to a `.npy` file, which
+        `load(year, memory_map=True)` will then memory-map regardless of how the
+        HDF5 file stores it (e.g. with compression). The files are only used
+        while the HDF5 file is unchanged.
+
+        Args:
+            year (int): The year of the dataset.
+        """
+        if self.data_format not in (
+            Dataset.ARRAYS,
+            Dataset.TIME_PERIOD_ARRAYS,
+        ):
+            raise ValueError(
+                f"Memory-mapping is only supported for array datasets, not {self.data_format}."
+            )
+        folder = self.memory_map_folder(year)
+        if folder.exists():
+            shutil.rmtree(folder)
+        folder.mkdir(parents=True)
+
+        def save_array(key: str, item: Union[h5py.Dataset, h5py.Group]):
+            if isinstance(item, h5py.Dataset):
+                npy_file = folder / f"{key}.npy"
+                npy_file.parent.mkdir(parents=True, exist_ok=True)
+                np.save(npy_file, item[()])
+
+        with h5py.File(self.file(year), mode="r") as f:
+            f.visititems(save_array)
+        _write_memory_map_source(self.file(year), folder)
+
     def load(
-        self, year: int, key: str = None, mode: str = "r"
+        self,
+        year: int,
+        key: str = None,
+        mode: str = "r",
+        memory_map: bool = False,
     ) -> Union[h5py.File, np.array, pd.DataFrame, pd.HDFStore]:
         """Loads the dataset for a given year, returning a H5 file reader. You can then access the
         dataset like a dictionary (e.g.e Dataset.load(2022)["variable"]).
@@ -106,11 +299,25 @@ class Dataset:
             year (int): The year of the dataset to load.
             key (str, optional): The key to load. Defaults to None.
             mode (str, optional): The mode to open the file with. Defaults to "r".
+            memory_map (bool, optional): Whether to return read-only, memory-mapped arrays
+                instead of a H5 file reader (array datasets only). Defaults to False.
 
         Returns:
             Union[h5py.File, np.array, pd.DataFrame, pd.HDFStore]: The dataset.
         """
         file = self.folder_path / self.filename(year)
+        if memory_map:
+            if self.data_format not in (
+                Dataset.ARRAYS,
+                Dataset.TIME_PERIOD_ARRAYS,
+            ):
+                raise ValueError(
+                    f"Memory-mapping is only supported for array datasets, not {self.data_format}."
+                )
+            data = MemoryMappedArrays(file, self.memory_map_folder(year))
+            if key is None:
+                return data
+            return data[key]
         if self.data_format in (Dataset.ARRAYS, Dataset.TIME_PERIOD_ARRAYS):
             if key is None:
                 # If no key provided, return the basic H5 reader.
@@ -144,11 +351,18 @@ class Dataset:
         """
         file = self.folder_path / self.filename(year)
         if self.data_format in (Dataset.ARRAYS, Dataset.TIME_PERIOD_ARRAYS):
+            has_memory_map = self.has_memory_map(year)
             with h5py.File(file, "a") as f:
                 # Overwrite if existing
                 if key in f:
                     del f[key]
                 f.create_dataset(key, data=values)
+            if has_memory_map:
+                # Keep the memory-mapped copy in sync
+                npy_file = self.memory_map_folder(year) / f"{key}.npy"
+                if npy_file.exists():
+                    np.save(npy_file, values)
+                _write_memory_map_source(file, self.memory_map_folder(year))
         elif self.data_format == Dataset.TABLES:
             with pd.HDFStore(file, "a") as f:
                 f.put(key, values)
@@ -230,6 +444,11 @@ class Dataset:
             filepath = self.folder_path / filename
             if filepath.exists():
                 os.remove(filepath)
+            memory_map_folder = self.folder_path / filename.replace(
+                ".h5", "_arrays"
+            )
+            if memory_map_folder.exists():
+                shutil.rmtree(memory_map_folder)
 
     @property
     def years(self):
@@ -0,0 +1,166 @@
+"""
+Stratified subsamples of array datasets, with weights adjusted to represent
+the full dataset.
+"""
+
+from typing import Dict, List
+import numpy as np
+from openfisca_tools.data.chunks import (
+    DatasetChunk,
+    _suffix,
+    get_top_group_positions,
+    load_memory_mapped,
+    subset_arrays,
+)
+from openfisca_tools.data.dataset import Dataset, MemoryMappedArrays
+
+
+class DatasetSample(DatasetChunk):
+    """A random subset of the groups in an array dataset, which a
+    Microsimulation can load in place of the full dataset. Each sampled group
+    (e.g. household) is kept whole, and its members' weights are multiplied by
+    the inverse of its stratum's sampling fraction."""
+
+    def __init__(
+        self,
+        dataset: Dataset,
+        year: int,
+        data: MemoryMappedArrays,
+        strata: np.ndarray,
+        population_sizes: np.ndarray,
+        sample_sizes: np.ndarray,
+    ):
+        super().__init__(dataset, year, data)
+        self.name = f"{dataset.name}_sample"
+        self.strata = strata
+        self.population_sizes = population_sizes
+        self.sample_sizes = sample_sizes
+
+    def standard_error(self, totals: np.ndarray) -> float:
+        """Estimates the standard error of a weighted total from the sample.
+
+        Args:
+            totals (np.ndarray): The weighted contribution of each sampled group, in order.
+
+        Returns:
+            float: The standard error, zero for strata with a single sampled group.
+        """
+        sums = np.bincount(self.strata, weights=totals)
+        squares = np.bincount(self.strata, weights=totals**2)
+        n = self.sample_sizes.astype(np.float64)
+        # Sample variance within each stratum, with a finite population correction.
+        variances = np.divide(
+            squares - sums**2 / np.maximum(n, 1),
+            n - 1,
+            out=np.zeros_like(n),
+            where=n > 1,
+        )
+        fpc = 1 - n / np.maximum(self.population_sizes, 1)
+        return float(np.sqrt(max(np.sum(fpc * n * variances), 0)))
+
+
+def sample_dataset(
+    dataset: Dataset,
+    year: int,
+    person_entity: str,
+    group_entities: List[str],
+    variable_entities: Dict[str, str],
+    fraction: float,
+    strata: str = None,
+    seed: int = 0,
+    num_strata: int = 10,
+) -> DatasetSample:
+    """Draws a stratified random sample of the first group entity (e.g.
+    households) in an array dataset, without replacement, keeping every
+    sampled group's members and the other groups they belong to.
+
+    Args:
+        dataset (Dataset): The dataset.
+        year (int): The year of the dataset.
+        person_entity (str): The person entity key, e.g. "person".
+        group_entities (List[str]): The group entity keys, sampling the first.
+        variable_entities (Dict[str, str]): The entity key of each variable. Arrays of other variables are dropped.
+        fraction (float): The fraction of groups to sample from each stratum.
+        strata (str, optional): The group or person variable to stratify by: groups are stratified by
+            its distinct values if there are at most `num_strata`, and otherwise by quantiles of it (summed over
+            members for person variables). Defaults to the group weight.
+        seed (int, optional): The random seed. Defaults to 0.
+        num_strata (int, optional): The maximum number of strata. Defaults to 10.
+
+    Raises:
+        ValueError: If the fraction is not between 0 and 1.
+
+    Returns:
+        DatasetSample: The sample.
+    """
+    if not 0 < fraction <= 1:
+        raise ValueError("The sampling fraction must be between 0 and 1.")
+    data = load_memory_mapped(dataset, year)
+    suffix = _suffix(dataset, year)
+    top_entity = group_entities[0]
+    positions = get_top_group_positions(
+        data, dataset, year, person_entity, group_entities
+    )
+    group_count = len(data[f"{top_entity}_id{suffix}"])
+
+    strata = strata or f"{top_entity}_weight"
+    values = np.asarray(data[f"{strata}{suffix}"])
+    if variable_entities.get(strata, top_entity) != top_entity:
+        values = np.bincount(
+            positions[variable_entities[strata]],
+            weights=values,
+            minlength=group_count,
+        )
+    distinct, group_strata = np.unique(values, return_inverse=True)
+    if len(distinct) > num_strata:
+        edges = np.quantile(values, np.linspace(0, 1, num_strata + 1)[1:-1])
+        _, group_strata = np.unique(
+            np.searchsorted(edges, values, side="right"), return_inverse=True
+        )
+
+    random_state = np.random.RandomState(seed)
+    population_sizes = np.bincount(group_strata)
+    # At least two groups per stratum (where there are two), to estimate variance.
+    sample_sizes = np.minimum(
+        population_sizes,
+        np.maximum(np.round(population_sizes * fraction).astype(int), 2),
+    )
+    sampled = np.zeros(group_count, dtype=bool)
+    for stratum, size in enumerate(sample_sizes):
+        sampled[
+            random_state.choice(
+                np.flatnonzero(group_strata == stratum), size, replace=False
+            )
+        ] = True
+    factors = population_sizes / sample_sizes
+
+    entity_indices = {
+        entity: np.flatnonzero(sampled[entity_positions])
+        for entity, entity_positions in positions.items()
+    }
+    sample = subset_arrays(
+        data,
+        dataset,
+        person_entity,
+        group_entities,
+        variable_entities,
+        entity_indices,
+    )
+    for entity, indices in entity_indices.items():
+        weight = f"{entity}_weight"
+        if weight not in sample:
+            continue
+        adjustment = factors[group_strata[positions[entity][indices]]]
+        if dataset.data_format == Dataset.TIME_PERIOD_ARRAYS:
+            for period in sample[weight].keys():
+                sample[weight][period] = sample[weight][period] * adjustment
+        else:
+            sample[weight] = sample[weight] * adjustment
+    return DatasetSample(
+        dataset,
+        year,
+        sample,
+        group_strata[sampled],
+        population_sizes,
+        sample_sizes,
+    )
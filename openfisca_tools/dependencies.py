@@ -0,0 +1,551 @@
+"""
+Recording of the variables and parameters each calculation depends on.
+"""
+
+import math
+from collections import Counter
+from types import CodeType, FunctionType
+from typing import Any, Dict, Iterable, Set, Tuple
+from openfisca_core.parameters import (
+    Parameter,
+    ParameterNode,
+    ParameterNodeAtInstant,
+    ParameterScale,
+    VectorialParameterNodeAtInstant,
+)
+from openfisca_core.periods import ETERNITY, Period
+from openfisca_core.simulations import Simulation
+from openfisca_core.taxbenefitsystems import TaxBenefitSystem
+from openfisca_core.tracers import SimpleTracer, TracingParameterNodeAtInstant
+from openfisca_core.variables import Variable
+
+Node = Tuple[str, Period]
+
+
+class DependencyTracer(SimpleTracer):
+    """A tracer which records, for each (variable, period) calculated, the
+    (variable, period) pairs and parameters its formula read. Unlike OpenFisca's
+    `FullTracer`, no calculation results are kept."""
+
+    def __init__(self):
+        super().__init__()
+        self.variables: Dict[Node, Set[Node]] = {}
+        self.parameters: Dict[Node, Set[str]] = {}
+        self.requests = Counter()
+
+    def record_calculation_start(self, variable: str, period: Period):
+        node = (variable, period)
+        if self.stack:
+            frame = self.stack[-1]
+            self.variables[(frame["name"], frame["period"])].add(node)
+        if node not in self.variables:
+            self.variables[node] = set()
+            self.parameters[node] = set()
+        self.requests[variable] += 1
+        super().record_calculation_start(variable, period)
+
+    def record_parameter_access(self, parameter: str, period, value):
+        if self.stack:
+            frame = self.stack[-1]
+            self.parameters[(frame["name"], frame["period"])].add(
+                parameter.lstrip(".")
+            )
+
+    def get_nb_requests(self, variable: str) -> int:
+        return self.requests[variable]
+
+    def depends_on(
+        self,
+        node: Node,
+        variables: Set[str],
+        parameters: Set[str],
+        memo: Dict[Node, bool] = None,
+    ) -> bool:
+        """Checks whether a recorded calculation read (directly or through
+        its dependencies) any of the given variables or parameters.
+
+        Args:
+            node (Node): The (variable, period) calculation.
+            variables (Set[str]): The variable names to look for.
+            parameters (Set[str]): The parameter names to look for.
+            memo (Dict[Node, bool], optional): Results of previous checks against the same sets.
+
+        Returns:
+            bool: True if the calculation depends on any of them, or if it was never recorded.
+        """
+        if memo is None:
+            memo = {}
+        return self._depends_on(node, variables, parameters, memo, {})[0]
+
+    def _depends_on(
+        self,
+        node: Node,
+        variables: Set[str],
+        parameters: Set[str],
+        memo: Dict[Node, bool],
+        in_progress: Dict[Node, int],
+    ) -> Tuple[bool, float]:
+        # Returns the answer, and the depth of the shallowest calculation still
+        # being checked which it assumed to be unaffected (in quasi-circular
+        # dependencies). Answers are only memoised once no such assumption
+        # remains, as they may change when the assumed calculation's is known.
+        if node in memo:
+            return memo[node], math.inf
+        if node in in_progress:
+            return False, in_progress[node]
+        if node not in self.variables:
+            return True, math.inf
+        depth = len(in_progress)
+        in_progress[node] = depth
+        assumed = math.inf
+        result = node[0] in variables or any(
+            parameter_overlaps(name, changed)
+            for name in self.parameters[node]
+            for changed in parameters
+        )
+        for dependency in () if result else self.variables[node]:
+            result, dependency_assumed = self._depends_on(
+                dependency, variables, parameters, memo, in_progress
+            )
+            if result:
+                break
+            assumed = min(assumed, dependency_assumed)
+        del in_progress[node]
+        if result or assumed >= depth:
+            memo[node] = result
+            return result, math.inf
+        return result, assumed
+
+    def dependents(self, variable: str, period: Period) -> Set[Node]:
+        """Finds the recorded calculations which read (directly or through
+        their dependencies) a variable in any period overlapping the given one.
+
+        Args:
+            variable (str): The variable name.
+            period (Period): The time period.
+
+        Returns:
+            Set[Node]: The dependent (variable, period) calculations, excluding those of the variable itself
+                in overlapping periods.
+        """
+        readers = {}
+        for node, dependencies in self.variables.items():
+            for dependency in dependencies:
+                readers.setdefault(dependency, []).append(node)
+        seeds = [
+            node
+            for node in readers
+            if node[0] == variable and periods_overlap(node[1], period)
+        ]
+        found = set()
+        stack = list(seeds)
+        while stack:
+            for reader in readers.get(stack.pop(), ()):
+                if reader not in found:
+                    found.add(reader)
+                    stack.append(reader)
+        return found - set(seeds)
+
+    def forget(self, nodes: Set[Node]) -> None:
+        """Removes the records of calculations, e.g. after their results are
+        deleted.
+
+        Args:
+            nodes (Set[Node]): The (variable, period) calculations.
+        """
+        for node in nodes:
+            self.variables.pop(node, None)
+            self.parameters.pop(node, None)
+
+    def copy_from(self, other: "DependencyTracer", node: Node):
+        """Copies the recorded dependencies of a calculation (and of everything
+        it depends on) from another tracer.
+
+        Args:
+            other (DependencyTracer): The tracer to copy from.
+            node (Node): The (variable, period) calculation.
+        """
+        self.variables.setdefault(node, set())
+        self.parameters.setdefault(node, set())
+        self.variables[node] |= other.variables.get(node, set())
+        self.parameters[node] |= other.parameters.get(node, set())
+        stack = list(self.variables[node])
+        while stack:
+            current = stack.pop()
+            if current in self.variables or current not in other.variables:
+                continue
+            self.variables[current] = set(other.variables[current])
+            self.parameters[current] = set(other.parameters[current])
+            stack += list(other.variables[current])
+
+
+class VariableGraph:
+    """The dependencies between the variables of a tax-benefit system, and
+    the parameters each reads. Dependencies are found by inspecting formulas
+    (for variable names and parameter paths in their code, the lists they
+    close over, e.g. in `add` or `sum_of_variables`, and `defined_for`
+    masks), which may find more than are used, and can be added to from the
+    calculations recorded by a `DependencyTracer`, which are exact."""
+
+    def __init__(
+        self, system: TaxBenefitSystem, tracer: DependencyTracer = None
+    ):
+        """Inspects the formulas of a tax-benefit system.
+
+        Args:
+            system (TaxBenefitSystem): The tax-benefit system.
+            tracer (DependencyTracer, optional): Recorded calculations to add. Defaults to None.
+        """
+        self.system = system
+        self.variables: Dict[str, Set[str]] = {}
+        self.parameters: Dict[str, Set[str]] = {}
+        for name, variable in system.variables.items():
+            strings, names = get_variable_references(variable)
+            self.variables[name] = set(
+                string
+                for string in strings
+                if string in system.variables and string != name
+            )
+            for string in strings:
+                # Lists of variables may be parameters (as in `sum_of_variables`).
+                values = get_latest_parameter_value(system.parameters, string)
+                if isinstance(values, list):
+                    self.variables[name] |= set(values) & set(system.variables)
+            self.parameters[name] = find_parameters(
+                system.parameters, names | set(strings)
+            ) | set(
+                string
+                for string in strings
+                if get_latest_parameter_value(system.parameters, string)
+                is not None
+            )
+        if tracer is not None:
+            self.record(tracer)
+
+    def record(self, tracer: DependencyTracer) -> None:
+        """Adds the dependencies of recorded calculations.
+
+        Args:
+            tracer (DependencyTracer): The tracer.
+        """
+        for (name, _), dependencies in tracer.variables.items():
+            self.variables.setdefault(name, set()).update(
+                dependency for dependency, _ in dependencies
+            )
+            self.variables[name].discard(name)
+        for (name, _), parameters in tracer.parameters.items():
+            self.parameters.setdefault(name, set()).update(parameters)
+
+    def upstream(
+        self, variables: Iterable[str], stop_at: Iterable[str] = ()
+    ) -> Set[str]:
+        """Finds the variables which the given variables depend on, directly or
+        indirectly.
+
+        Args:
+            variables (Iterable[str]): The variable names.
+            stop_at (Iterable[str], optional): Variables whose own dependencies are not followed,
+                e.g. those provided as inputs. Defaults to ().
+
+        Returns:
+            Set[str]: The names of the dependencies, excluding the variables themselves.
+        """
+        stop_at = set(stop_at)
+        found = set()
+        stack = list(variables)
+        while stack:
+            name = stack.pop()
+            if name in stop_at and name in found:
+                continue
+            for dependency in self.variables.get(name, ()):
+                if dependency not in found:
+                    found.add(dependency)
+                    if dependency not in stop_at:
+                        stack.append(dependency)
+        return found - set(variables)
+
+    def downstream(self, variables: Iterable[str]) -> Set[str]:
+        """Finds the variables which depend on the given variables, directly
+        or indirectly.
+
+        Args:
+            variables (Iterable[str]): The variable names.
+
+        Returns:
+            Set[str]: The names of the dependants, excluding the variables themselves.
+        """
+        dependants = {}
+        for name, dependencies in self.variables.items():
+            for dependency in dependencies:
+                dependants.setdefault(dependency, set()).add(name)
+        found = set()
+        stack = list(variables)
+        while stack:
+            for dependant in dependants.get(stack.pop(), ()):
+                if dependant not in found:
+                    found.add(dependant)
+                    stack.append(dependant)
+        return found - set(variables)
+
+    def inputs(
+        self, variables: Iterable[str], available: Iterable[str] = None
+    ) -> Set[str]:
+        """Finds the inputs needed to calculate variables: the variables
+        without formulas they depend on, and any available inputs (e.g.
+        the variables in a dataset) they depend on before reaching those.
+
+        Args:
+            variables (Iterable[str]): The variable names.
+            available (Iterable[str], optional): Variables with inputs, whose formulas are not used. Defaults to None.
+
+        Returns:
+            Set[str]: The names of the inputs, including any of the variables themselves.
+        """
+        available = set(available or ())
+        variables = set(variables)
+        required = variables | self.upstream(variables, stop_at=available)
+        return set(
+            name
+            for name in required
+            if name in available
+            or (
+                name in self.system.variables
+                and not self.system.variables[name].formulas
+            )
+        )
+
+    def parameter_reads(self, variables: Iterable[str]) -> Set[str]:
+        """Finds the parameters read in calculating variables.
+
+        Args:
+            variables (Iterable[str]): The variable names.
+
+        Returns:
+            Set[str]: The parameter names.
+        """
+        variables = set(variables)
+        return set(
+            parameter
+            for name in variables | self.upstream(variables)
+            for parameter in self.parameters.get(name, ())
+        )
+
+
+def get_variable_references(variable: Variable) -> Tuple[Set[str], Set[str]]:
+    """Collects the strings and attribute names used by a variable's formulas
+    and `defined_for` mask.
+
+    Args:
+        variable (Variable): The variable.
+
+    Returns:
+        Tuple[Set[str], Set[str]]: The strings, and the attribute and global names.
+    """
+    strings = set()
+    names = set()
+    defined_for = getattr(variable, "defined_for", None)
+    if isinstance(defined_for, str):
+        strings.add(defined_for)
+    for formula in variable.formulas.values():
+        _collect_references(formula, strings, names, set())
+    return strings, names
+
+
+def _collect_references(
+    value: Any, strings: Set[str], names: Set[str], seen: Set[int]
+) -> None:
+    # Recurses through functions, the values they close over and refer to
+    # globally, and their code objects.
+    if id(value) in seen:
+        return
+    seen.add(id(value))
+    if isinstance(value, str):
+        strings.add(value)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            if isinstance(item, (str, list, tuple, set, frozenset, CodeType)):
+                _collect_references(item, strings, names, seen)
+    elif isinstance(value, FunctionType):
+        _collect_references(value.__code__, strings, names, seen)
+        for cell in value.__closure__ or ():
+            try:
+                _collect_references(cell.cell_contents, strings, names, seen)
+            except ValueError:
+                # An empty cell.
+                continue
+        for default in value.__defaults__ or ():
+            _collect_references(default, strings, names, seen)
+        for name in value.__code__.co_names:
+            global_value = value.__globals__.get(name)
+            if isinstance(global_value, (list, tuple, set, frozenset)):
+                _collect_references(global_value, strings, names, seen)
+    elif isinstance(value, CodeType):
+        names.update(value.co_names)
+        for constant in value.co_consts:
+            _collect_references(constant, strings, names, seen)
+
+
+def find_parameters(node: ParameterNode, names: Set[str]) -> Set[str]:
+    """Finds the parameters reachable from a node through children with the
+    given names, as when formulas read e.g. `parameters(period).tax.rate`.
+
+    Args:
+        node (ParameterNode): The parameter node.
+        names (Set[str]): The names used.
+
+    Returns:
+        Set[str]: The deepest parameters and nodes reachable.
+    """
+    found = set()
+    for name, child in node.children.items():
+        if name not in names:
+            continue
+        if isinstance(child, ParameterNode):
+            found |= find_parameters(child, names) or {child.name}
+        else:
+            found.add(child.name)
+    return found
+
+
+def get_latest_parameter_value(root: ParameterNode, name: str) -> Any:
+    """Gets the latest value of a parameter from its name.
+
+    Args:
+        root (ParameterNode): The root of the parameter tree.
+        name (str): The name, e.g. "tax.rate".
+
+    Returns:
+        Any: The value, or None if there is no such parameter.
+    """
+    node = root
+    for key in name.split("."):
+        children = getattr(node, "children", None)
+        if children is None or key not in children:
+            return None
+        node = children[key]
+    if not isinstance(node, Parameter) or not node.values_list:
+        return None
+    return node.values_list[0].value
+
+
+class RecordingParameterNodeAtInstant(TracingParameterNodeAtInstant):
+    """Parameter node wrapper passed to formulas, reporting every value read
+    (including tax scales, which OpenFisca's tracing skips) to the tracer."""
+
+    def get_traced_child(self, child, key):
+        if isinstance(
+            child,
+            (ParameterNodeAtInstant, VectorialParameterNodeAtInstant),
+        ):
+            return RecordingParameterNodeAtInstant(child, self.tracer)
+        node = self.parameter_node_at_instant
+        if not isinstance(key, str) or isinstance(
+            node, VectorialParameterNodeAtInstant
+        ):
+            name = node._name
+        else:
+            name = f"{node._name}.{key}"
+        self.tracer.record_parameter_access(name, node._instant_str, child)
+        return child
+
+
+def record_dependencies(
+    simulation: Simulation, tracer: DependencyTracer = None
+) -> DependencyTracer:
+    """Attaches a `DependencyTracer` to a simulation.
+
+    Args:
+        simulation (Simulation): The OpenFisca simulation.
+        tracer (DependencyTracer, optional): The tracer to attach. Defaults to a new `DependencyTracer`.
+
+    Returns:
+        DependencyTracer: The tracer, which records from now on.
+    """
+    # Formulas only receive traced parameters when tracing is switched on.
+    simulation.trace = True
+    simulation.tracer = tracer or DependencyTracer()
+    system = simulation.tax_benefit_system
+    simulation.trace_parameters_at_instant = (
+        lambda instant: RecordingParameterNodeAtInstant(
+            system.get_parameters_at_instant(instant), simulation.tracer
+        )
+    )
+    return simulation.tracer
+
+
+def periods_overlap(first: Period, second: Period) -> bool:
+    """Checks whether two time periods have any time in common.
+
+    Args:
+        first (Period): A time period.
+        second (Period): Another time period.
+
+    Returns:
+        bool: True if the periods overlap, or either is eternal.
+    """
+    if ETERNITY in (first.unit, second.unit):
+        return True
+    return first.start <= second.stop and second.start <= first.stop
+
+
+def parameter_overlaps(first: str, second: str) -> bool:
+    """Checks whether one parameter name is equal to, or contains, the other.
+
+    Args:
+        first (str): A parameter name, e.g. `tax.rates`.
+        second (str): A parameter name, e.g. `tax.rates[0].rate`.
+
+    Returns:
+        bool: True if either parameter is (a descendant of) the other.
+    """
+    if first == second:
+        return True
+    shorter, longer = sorted((first, second), key=len)
+    return longer.startswith(shorter) and longer[len(shorter)] in ".["
+
+
+def get_parameter_values(root: ParameterNode) -> Dict[str, tuple]:
+    """Flattens a parameter tree into the values of each parameter.
+
+    Args:
+        root (ParameterNode): The root of the parameter tree.
+
+    Returns:
+        Dict[str, tuple]: The (instant, value) pairs of each parameter, by name.
+    """
+    descendants = list(root.get_descendants())
+    for scale in filter(lambda p: isinstance(p, ParameterScale), descendants):
+        for bracket in scale.brackets:
+            for allowed_key in bracket._allowed_keys:
+                if hasattr(bracket, allowed_key):
+                    descendants.append(getattr(bracket, allowed_key))
+    return {
+        parameter.name: tuple(
+            (entry.instant_str, entry.value) for entry in parameter.values_list
+        )
+        for parameter in descendants
+        if isinstance(parameter, Parameter)
+    }
+
+
+def get_changed_parameters(
+    baseline: ParameterNode, reformed: ParameterNode
+) -> Set[str]:
+    """Finds the parameters whose values differ between two parameter trees.
+
+    Args:
+        baseline (ParameterNode): The baseline parameter tree.
+        reformed (ParameterNode): The reformed parameter tree.
+
+    Returns:
+        Set[str]: The names of parameters added, removed or changed.
+    """
+    if baseline is reformed:
+        return set()
+    baseline_values = get_parameter_values(baseline)
+    reformed_values = get_parameter_values(reformed)
+    return set(
+        name
+        for name in set(baseline_values) | set(reformed_values)
+        if baseline_values.get(name) != reformed_values.get(name)
+    )
@@ -2,7 +2,8 @@
 IndividualSim and any other interfaces to intialising and running simulations on hypothetical situations.
 """
 
-from typing import Dict, List
+import logging
+from typing import Any, Callable, Dict, List
 from openfisca_core.entities.entity import Entity
 from openfisca_tools.model_api.model_api import ReformType
 import numpy as np
@@ -10,9 +11,16 @@ from openfisca_core.simulation_builder import SimulationBuilder
 from openfisca_core.taxbenefitsystems.tax_benefit_system import (
     TaxBenefitSystem,
 )
-from openfisca_core.periods import period
+from openfisca_core.errors import VariableNotFoundError
+from openfisca_core.parameters import Parameter
+from openfisca_core.periods import Period, instant, period
 from functools import partial
-from openfisca_tools.reforms import set_parameter
+from openfisca_tools.concurrency import run_async, stop_when_cancelled
+from openfisca_tools.dependencies import record_dependencies
+from openfisca_tools.membership import get_membership_indices, map_to_entity
+from openfisca_tools.profiling import ProfilingTracer
+from openfisca_tools.reforms import get_parameter, set_parameter
+from openfisca_tools.tax_benefit_system import get_tax_benefit_system
 
 
 class IndividualSim:
@@ -26,6 +34,10 @@ class IndividualSim:
 
     default_roles: Dict[str, str] = None
     required_entities: List[str] = None
+    cache_tax_benefit_system: bool = False
+    profiling: bool = False
+    profile_memory: bool = False
+    vectorised_parametric_vary: bool = True
 
     def __init__(
         self,
@@ -41,7 +53,7 @@ class IndividualSim:
         """
         self.year = year
         self.reform = reform
-        self.system = tax_benefit_system or self.tax_benefit_system()
+        self.system = tax_benefit_system or self.new_tax_benefit_system()
         self.sim_builder = SimulationBuilder()
         self.parametric_vary = False
         self.entities = {var.key: var for var in self.system.entities}
@@ -51,6 +63,8 @@ class IndividualSim:
         }
         self.varying = False
         self.num_points = None
+        self.parametric_simulation = None
+        self.unvectorised_variables = set()
         self.group_entity_names = [
             entity.key
             for entity in self.system.entities
@@ -64,7 +78,34 @@ class IndividualSim:
                 self, f"add_{entity}", partial(self.add_data, entity=entity)
             )
 
+    def new_tax_benefit_system(self) -> TaxBenefitSystem:
+        """Creates an unreformed instance of the tax-benefit system, cloning a
+        process-level cached instance if `cache_tax_benefit_system` is set.
+
+        Returns:
+            TaxBenefitSystem: The tax-benefit system.
+        """
+        if self.cache_tax_benefit_system:
+            return get_tax_benefit_system(type(self).tax_benefit_system)
+        return self.tax_benefit_system()
+
     def build(self):
+        self.add_required_entities()
+        self.simulation = self.sim_builder.build_from_entities(
+            self.system, self.situation_data
+        )
+        self.simulation.trace = True
+        stop_when_cancelled(self.simulation)
+        if self.profiling:
+            self.profiler = record_dependencies(
+                self.simulation, ProfilingTracer(memory=self.profile_memory)
+            )
+        self.sim = self.simulation
+        self.membership = get_membership_indices(self.simulation)
+
+    def add_required_entities(self) -> None:
+        """Adds any missing required entities to the situation, containing
+        every person in their default role."""
         if self.required_entities is not None:
             # Check for missing entities
             entities = {entity.key: entity for entity in self.system.entities}
@@ -90,11 +131,42 @@ class IndividualSim:
                         default_role.plural
                     ] = members
             # Add missing entities with specified default roles
-        self.simulation = self.sim_builder.build_from_entities(
-            self.system, self.situation_data
+
+    def build_parametric(self) -> None:
+        """Builds one simulation of the situation replicated for each value
+        of the varied parameter, in which the parameter is an array of the
+        values, repeated for each entity of each replicate."""
+        self.add_required_entities()
+        count = len(self.parametric_values)
+        simulation = SimulationBuilder().build_from_entities(
+            self.system,
+            replicate_situation(self.situation_data, self.entities, count),
         )
-        self.simulation.trace = True
-        self.sim = self.simulation
+        simulation.trace = True
+        stop_when_cancelled(simulation)
+        values = self.parametric_values
+        name = self.parametric_parameter
+        reform_period = period(self.parametric_period)
+        trace_parameters_at_instant = simulation.trace_parameters_at_instant
+
+        def get_values() -> np.ndarray:
+            # The parameter is read by the formula on top of the stack.
+            variable = simulation.tracer.stack[-1]["name"]
+            population = simulation.get_variable_population(variable)
+            return np.repeat(values, population.count // count)
+
+        def parameters_at_instant(at):
+            node = trace_parameters_at_instant(at)
+            start = at.start if isinstance(at, Period) else instant(at)
+            if reform_period.start <= start <= reform_period.stop:
+                return VaryingParameterNodeAtInstant(
+                    node, "", name, get_values
+                )
+            return node
+
+        simulation.trace_parameters_at_instant = parameters_at_instant
+        self.parametric_simulation = simulation
+        self.parametric_membership = get_membership_indices(simulation)
 
     def apply_reform(self, reform: ReformType) -> None:
         """Recursively applies a reform to the tax-benefit system.
@@ -158,6 +230,9 @@ class IndividualSim:
                 except:
                     data[var] = value
         self.situation_data[entity_plural][name] = data
+        # Parametric results must be recalculated for the new situation.
+        self.parametric_simulation = None
+        self.unvectorised_variables = set()
 
     def get_entity(self, name: str) -> Entity:
         """Gets the entity type of the entity with a given name.
@@ -192,33 +267,7 @@ class IndividualSim:
         Returns:
             np.array: The mapped values.
         """
-        entity_pop = self.simulation.populations[entity]
-        target_pop = self.simulation.populations[target_entity]
-        if entity == "person" and target_entity in self.group_entity_names:
-            if how and how not in (
-                "sum",
-                "any",
-                "min",
-                "max",
-                "all",
-                "value_from_first_person",
-            ):
-                raise ValueError("Not a valid function.")
-            return target_pop.__getattribute__(how or "sum")(arr)
-        elif entity in self.group_entity_names and target_entity == "person":
-            if not how:
-                return entity_pop.project(arr)
-            if how == "mean":
-                return entity_pop.project(arr / entity_pop.nb_persons())
-        elif entity == target_entity:
-            return arr
-        else:
-            return self.map_to(
-                self.map_to(arr, entity, "person", how="mean"),
-                "person",
-                target_entity,
-                how="sum",
-            )
+        return map_to_entity(arr, entity, target_entity, self.membership, how)
 
     def get_group(self, entity: str, name: str) -> str:
         """Gets the name of the containing entity for a named entity and group type.
@@ -262,6 +311,30 @@ class IndividualSim:
         if not hasattr(self, "simulation"):
             self.build()
 
+        if (
+            self.parametric_vary
+            and reform is None
+            and self.vectorised_parametric_vary
+            and var not in self.unvectorised_variables
+            and not self.varying
+        ):
+            try:
+                return self.calc_parametric(
+                    var,
+                    period=period,
+                    target=target,
+                    index=index,
+                    map_to=map_to,
+                )
+            except (ValueError, TypeError) as e:
+                # Formulas which can't take an array of parameter values
+                # are evaluated once per value.
+                logging.warning(
+                    f"Could not calculate {var} for all values of {self.parametric_parameter} at once, "
+                    f"so calculating it for each value: {e}"
+                )
+                self.unvectorised_variables.add(var)
+
         if self.parametric_vary and reform is None:
             results = [
                 self.calc(
@@ -277,7 +350,7 @@ class IndividualSim:
             return np.array(results)
 
         if reform is not None:
-            self.system = self.tax_benefit_system()
+            self.system = self.new_tax_benefit_system()
             self.apply_reform(reform)
             self.build()
 
@@ -311,6 +384,81 @@ class IndividualSim:
             return result[index]
         return result
 
+    def calc_parametric(
+        self,
+        var: str,
+        period: int = None,
+        target: str = None,
+        index: int = None,
+        map_to: str = None,
+    ) -> np.array:
+        """Calculates a variable at each value of the varied parameter, in one
+        simulation of replicates of the situation.
+
+        Args:
+            var (str): The variable to calculate.
+            period (int, optional): The time period to calculate for. Defaults to None.
+            target (str, optional): The target entity if not all entities are required. Defaults to None.
+            index (int, optional): The numerical index of the target entity. Defaults to None.
+            map_to (str, optional): The entity to map to. Defaults to None.
+
+        Returns:
+            np.array: The values, with one row per parameter value.
+        """
+        if self.parametric_simulation is None:
+            self.build_parametric()
+        simulation = self.parametric_simulation
+        period = period or self.year
+        entity = self.system.variables[var].entity
+        try:
+            result = simulation.calculate(var, period)
+        except VariableNotFoundError:
+            raise
+        except:
+            try:
+                result = simulation.calculate_add(var, period)
+            except:
+                result = simulation.calculate_divide(var, period)
+        if (
+            target is not None
+            and target not in self.situation_data[entity.plural]
+        ):
+            map_to = self.get_entity(target).key
+        if map_to is not None:
+            result = map_to_entity(
+                result, entity.key, map_to, self.parametric_membership
+            )
+            entity = self.entities[map_to]
+        members = list(self.situation_data[entity.plural])
+        result = result.reshape((len(self.parametric_values), len(members)))
+        if index is not None:
+            index = min(len(members) - 1, index)
+        if target is not None:
+            index = members.index(target)
+        if target is not None or index is not None:
+            return result[:, index]
+        return result
+
+    async def acalc(self, *args, **kwargs) -> np.array:
+        """Calculates a variable as `calc` does, in the executor of
+        `openfisca_tools.concurrency` rather than blocking the event loop.
+        Identical concurrent calls (including the reform) share one
+        calculation, which is stopped if all its callers are cancelled.
+
+        Returns:
+            np.array: The resulting values.
+        """
+        return await run_async(self, "calc", *args, **kwargs)
+
+    async def aderiv(self, *args, **kwargs) -> np.array:
+        """Calculates a derivative as `deriv` does, without blocking the
+        event loop (see `acalc`).
+
+        Returns:
+            np.array: The derivatives as the source variable varies.
+        """
+        return await run_async(self, "deriv", *args, **kwargs)
+
     def deriv(
         self,
         var: str,
@@ -401,7 +549,97 @@ class IndividualSim:
             # Parametric vary
             self.parametric_vary = True
             parameter_values = np.linspace(min, max, count)
+            self.parametric_parameter = parameter
+            self.parametric_values = parameter_values
+            self.parametric_period = period or "year:2022:10"
+            self.parametric_simulation = None
+            self.unvectorised_variables = set()
+            # Only whole parameters (not scale brackets) can take arrays.
+            self.vectorised_parametric_vary = type(
+                self
+            ).vectorised_parametric_vary and isinstance(
+                get_parameter(self.system.parameters, parameter), Parameter
+            )
             self.parametric_reforms = [
                 set_parameter(parameter, value, period or "year:2022:10")
                 for value in parameter_values
             ]
+
+
+class VaryingParameterNodeAtInstant:
+    """A view of a parameter tree at an instant in which one parameter is
+    replaced by an array of values, one for each entity of the population
+    reading it."""
+
+    def __init__(
+        self,
+        node: Any,
+        name: str,
+        parameter: str,
+        get_values: Callable[[], np.ndarray],
+    ):
+        self.node = node
+        self.name = name
+        self.parameter = parameter
+        self.get_values = get_values
+
+    def __getattr__(self, key: str) -> Any:
+        return self._get_child(key, getattr(self.node, key))
+
+    def __getitem__(self, key: Any) -> Any:
+        return self._get_child(key, self.node[key])
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.node(*args, **kwargs)
+
+    def _get_child(self, key: Any, child: Any) -> Any:
+        if not isinstance(key, str):
+            if self.parameter.startswith(f"{self.name}."):
+                # Vectorial access may read the varied parameter.
+                raise ValueError(
+                    "Can't vary a parameter read by vectorial access."
+                )
+            return child
+        name = f"{self.name}.{key}" if self.name else key
+        if name == self.parameter:
+            return self.get_values()
+        if self.parameter.startswith(f"{name}."):
+            return VaryingParameterNodeAtInstant(
+                child, name, self.parameter, self.get_values
+            )
+        return child
+
+
+def replicate_situation(
+    situation: dict, entities: Dict[str, Entity], count: int
+) -> dict:
+    """Copies each entity of a situation a number of times, with the first
+    copy of every entity before the second, and so on.
+
+    Args:
+        situation (dict): The situation, without axes.
+        entities (Dict[str, Entity]): The entities, by key.
+        count (int): The number of copies.
+
+    Returns:
+        dict: The replicated situation.
+    """
+    replicated = {}
+    for entity in entities.values():
+        members = situation.get(entity.plural, {})
+        role_keys = set(
+            role.plural or role.key for role in getattr(entity, "roles", ())
+        )
+        replicated[entity.plural] = {
+            f"{name}_{i}": {
+                key: (
+                    [f"{member}_{i}" for member in value]
+                    if key in role_keys
+                    else value
+                )
+                for key, value in data.items()
+            }
+            for i in range(count)
+            for name, data in members.items()
+        }
+    return replicated
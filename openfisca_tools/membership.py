@@ -0,0 +1,161 @@
+"""
+Precomputed group membership, for mapping values between entities.
+"""
+
+from typing import Dict
+import numpy as np
+from openfisca_core.populations import GroupPopulation
+from openfisca_core.simulations import Simulation
+
+# Reducers for person-to-group mapping, and their values for empty groups
+# (as in OpenFisca's `GroupPopulation.reduce`).
+REDUCERS = {
+    "sum": (np.add, 0.0),
+    "min": (np.minimum, np.inf),
+    "max": (np.maximum, -np.inf),
+    "all": (np.logical_and, True),
+}
+
+
+class MembershipIndex:
+    """The members of every group of one group entity, laid out so that
+    aggregations over members are single vectorised NumPy operations."""
+
+    def __init__(self, population: GroupPopulation):
+        """Indexes a group population.
+
+        Args:
+            population (GroupPopulation): The OpenFisca group population.
+        """
+        self.count = population.count
+        self.group_index = np.asarray(population.members_entity_id)
+        # Person indices sorted by group, and where each group starts, with
+        # the same integer width as the population's own indices.
+        dtype = self.group_index.dtype
+        self.order = np.argsort(self.group_index, kind="stable").astype(
+            dtype, copy=False
+        )
+        self.sizes = np.bincount(self.group_index, minlength=self.count)
+        self.offsets = (np.cumsum(self.sizes) - self.sizes).astype(
+            dtype, copy=False
+        )
+        self.non_empty = self.sizes > 0
+        # The member at position 0 of each group, as in OpenFisca.
+        self.first_members = np.flatnonzero(
+            np.asarray(population.members_position) == 0
+        ).astype(dtype, copy=False)
+
+    def aggregate(self, values: np.ndarray, how: str = "sum") -> np.ndarray:
+        """Aggregates person-level values to the group level.
+
+        Args:
+            values (np.ndarray): The person-level values, optionally with one column per variable.
+            how (str, optional): One of "sum", "any", "min", "max", "all" or "value_from_first_person". Defaults to "sum".
+
+        Raises:
+            ValueError: If an invalid aggregation function is passed.
+
+        Returns:
+            np.ndarray: The group-level values.
+        """
+        shape = (self.count,) + values.shape[1:]
+        if how == "sum":
+            # Sums are 64-bit floats (even of booleans), as `bincount` casts
+            # its weights, so 1-D values are passed without a copy.
+            if values.ndim == 1:
+                return np.bincount(
+                    self.group_index, weights=values, minlength=self.count
+                )
+            values = values.astype(np.float64, copy=False)
+        if how == "any":
+            # Counts non-zero values, as members' values may cancel out.
+            return self.aggregate(values != 0, "sum") > 0
+        if how == "value_from_first_person":
+            result = np.zeros(shape, dtype=values.dtype)
+            result[self.group_index[self.first_members]] = values[
+                self.first_members
+            ]
+            return result
+        if how not in REDUCERS:
+            raise ValueError("Not a valid function.")
+        reducer, neutral_element = REDUCERS[how]
+        result = np.full(shape, neutral_element)
+        result[self.non_empty] = reducer.reduceat(
+            values[self.order], self.offsets[self.non_empty], axis=0
+        )
+        return result
+
+    def project(self, values: np.ndarray, how: str = None) -> np.ndarray:
+        """Projects group-level values onto each member.
+
+        Args:
+            values (np.ndarray): The group-level values.
+            how (str, optional): None to give each member the group's value, or "mean" to split it equally. Defaults to None.
+
+        Raises:
+            ValueError: If an invalid disaggregation function is passed.
+
+        Returns:
+            np.ndarray: The person-level values.
+        """
+        if how is None:
+            return values[self.group_index]
+        if how == "mean":
+            sizes = self.sizes[self.group_index]
+            return values[self.group_index] / sizes.reshape(
+                (-1,) + (1,) * (values.ndim - 1)
+            )
+        raise ValueError("Not a valid function.")
+
+
+def get_membership_indices(
+    simulation: Simulation,
+) -> Dict[str, MembershipIndex]:
+    """Indexes the membership of every group entity in a simulation.
+
+    Args:
+        simulation (Simulation): The OpenFisca simulation.
+
+    Returns:
+        Dict[str, MembershipIndex]: The indices, by group entity key.
+    """
+    return {
+        key: MembershipIndex(population)
+        for key, population in simulation.populations.items()
+        if not population.entity.is_person
+    }
+
+
+def map_to_entity(
+    values: np.ndarray,
+    entity: str,
+    target_entity: str,
+    indices: Dict[str, MembershipIndex],
+    how: str = None,
+) -> np.ndarray:
+    """Maps values from one entity to another. Values moving between two
+    group entities are split equally between members of the source group and
+    summed over members of the target group.
+
+    Args:
+        values (np.ndarray): The values in their original position.
+        entity (str): The source entity.
+        target_entity (str): The target entity.
+        indices (Dict[str, MembershipIndex]): The membership indices of the group entities.
+        how (str, optional): A function to use when mapping. Defaults to None.
+
+    Raises:
+        ValueError: If an invalid (dis)aggregation function is passed.
+
+    Returns:
+        np.ndarray: The mapped values.
+    """
+    if entity == target_entity:
+        return values
+    if entity not in indices:
+        return indices[target_entity].aggregate(values, how or "sum")
+    if target_entity not in indices:
+        return indices[entity].project(values, how)
+    return indices[target_entity].aggregate(
+        indices[entity].project(values, "mean")
+    )
@@ -2,20 +2,65 @@
 Microsimulation interfaces and utility functions.
 """
 
+import copy
+import hashlib
 import logging
+from pathlib import Path
+from functools import partial
 from re import S
-from typing import Callable, List, Tuple
+from typing import Any, Callable, Dict, List, Tuple, Union
 from openfisca_core.entities.entity import Entity
 from microdf.generic import MicroDataFrame
 import numpy as np
+import pandas as pd
 from openfisca_core.entities import GroupEntity
 from openfisca_core.model_api import *
+from openfisca_core.commons import empty_clone
+from openfisca_core import periods
+from openfisca_core.indexed_enums import ENUM_ARRAY_DTYPE, EnumArray
+from openfisca_core.periods import Period
+from openfisca_core.populations import Population
+from openfisca_core.simulations import Simulation
 from openfisca_core.simulation_builder import SimulationBuilder
 from microdf import MicroSeries
 from openfisca_core.taxbenefitsystems import TaxBenefitSystem
+from openfisca_tools.cache import (
+    ResultCache,
+    SimulationCache,
+    fingerprint_variable,
+    get_package_version,
+    hash_file,
+)
+from openfisca_tools.concurrency import check_cancelled, run_async
 from openfisca_tools.data.dataset import Dataset
+from openfisca_tools.data.sampling import sample_dataset
+from openfisca_tools.dependencies import (
+    VariableGraph,
+    get_changed_parameters,
+    get_parameter_values,
+    record_dependencies,
+)
 
+from openfisca_tools.membership import get_membership_indices, map_to_entity
 from openfisca_tools.model_api.model_api import carried_over, ReformType
+from openfisca_tools.pool import WarmPool
+from openfisca_tools.populations import build_populations
+from openfisca_tools.profiling import ProfilingTracer
+from openfisca_tools.state import (
+    load_dependencies,
+    load_simulation_state,
+    read_state_attributes,
+    save_simulation_state,
+)
+from openfisca_tools.streaming import stream_microsimulation
+from openfisca_tools.sweep import Metric, sweep_reforms
+from openfisca_tools.tax_benefit_system import (
+    clone_tax_benefit_system,
+    get_tax_benefit_system,
+)
+
+# The dtype of float variables under each precision policy.
+FLOAT_DTYPES = {None: None, "single": np.float32, "double": np.float64}
 
 
 class Microsimulation:
@@ -26,9 +71,30 @@ class Microsimulation:
     pre_reform: ReformType = ()
     post_reform: ReformType = ()
     default_year: int = None
+    memory_map: bool = False
+    lazy_inputs: bool = False
+    cache_tax_benefit_system: bool = False
+    bonus_sims_max_memory: float = None
+    result_cache_folder: str = None
+    result_cache_max_size: float = None
+    profiling: bool = False
+    profile_memory: bool = False
+    sample_fraction: float = None
+    sample_strata: str = None
+    sample_seed: int = 0
+    precision: str = None
+    precision_overrides: Dict[str, type] = None
+    categorical_enums: bool = True
+    output_variables: List[str] = None
 
     def __init__(
-        self, reform: ReformType = (), dataset: type = None, year: int = None
+        self,
+        reform: ReformType = (),
+        dataset: type = None,
+        year: int = None,
+        baseline: "Microsimulation" = None,
+        sample_fraction: float = None,
+        state: str = None,
     ):
         """Initialises a microsimulation.
 
@@ -36,18 +102,46 @@ class Microsimulation:
             reform (ReformType): The reform to apply. Can be a tuple of OpenFisca Reforms.
             dataset (type, optional): The dataset to use.
             year (int, optional): The year of the dataset to load. Defaults to 2020.
+            baseline (Microsimulation, optional): A simulation on the same dataset and year to reuse
+                results from, for any variable the reform cannot affect. Defaults to None.
+            sample_fraction (float, optional): The fraction of groups (e.g. households) to simulate, sampled
+                within strata of `sample_strata` and reweighted to represent the dataset. Defaults to
+                `sample_fraction` (None, simulating the whole dataset).
+            state (str, optional): A file written by `save_state` to restore the simulation from,
+                instead of loading the dataset. Defaults to None.
         """
         self.reform = reform
+        if sample_fraction is not None:
+            self.sample_fraction = sample_fraction
         if dataset is None:
             self.dataset = self.default_dataset
         else:
             self.dataset = dataset
-        if year is None:
+        if year is None and state is not None:
+            self.year = read_state_attributes(state)["year"]
+        elif year is None:
             self.year = self.default_year or max(self.dataset.years)
         else:
             self.year = year
         self.default_year = year
-        self.bonus_sims = {}
+        if baseline is not None and (
+            baseline.dataset is not self.dataset
+            or baseline.year != self.year
+            or baseline.sampling() != self.sampling()
+            or baseline.precision_policy() != self.precision_policy()
+        ):
+            raise ValueError(
+                "A baseline simulation must use the same dataset, year, sample and precision."
+            )
+        self.baseline = baseline
+        self.bonus_sims = SimulationCache(self.bonus_sims_max_memory)
+        # Results are keyed by a hash of the dataset file, so need one.
+        self.result_cache = (
+            ResultCache(self.result_cache_folder, self.result_cache_max_size)
+            if self.result_cache_folder is not None
+            and hasattr(self.dataset, "file")
+            else None
+        )
         self.person_entities = tuple(
             filter(
                 lambda entity: not isinstance(entity, GroupEntity),
@@ -66,7 +160,112 @@ class Microsimulation:
         self.group_entity_names = tuple(
             map(lambda entity: entity.key, self.group_entities)
         )
-        self.load_dataset(self.dataset, self.year)
+        if state is not None:
+            self.load_state(state)
+        else:
+            self.load_dataset(self.dataset, self.year)
+
+    @classmethod
+    def sweep(
+        cls,
+        reforms: Union[List[ReformType], Dict[Any, ReformType]],
+        variables: List[str] = (),
+        metrics: Dict[str, Metric] = None,
+        dataset: type = None,
+        year: int = None,
+        processes: int = None,
+    ) -> pd.DataFrame:
+        """Evaluates many reforms on the same dataset across a process pool,
+        sharing one memory-mapped copy of the dataset between workers.
+
+        Args:
+            reforms (Union[List[ReformType], Dict[Any, ReformType]]): The reforms, optionally keyed by name.
+            variables (List[str], optional): Variables to report the weighted totals of. Defaults to ().
+            metrics (Dict[str, Metric], optional): Named functions of a simulation returning a number. Defaults to None.
+            dataset (type, optional): The dataset to use. Defaults to the default dataset.
+            year (int, optional): The year to simulate. Defaults to the latest year of the dataset.
+            processes (int, optional): The number of worker processes. Defaults to the number of CPUs.
+
+        Returns:
+            pd.DataFrame: One row per reform and output, with columns `reform`, `output` and `value`.
+        """
+        return sweep_reforms(
+            cls,
+            reforms,
+            variables=variables,
+            metrics=metrics,
+            dataset=dataset,
+            year=year,
+            processes=processes,
+        )
+
+    @classmethod
+    def warm_pool(
+        cls,
+        variables: List[str] = (),
+        metrics: Dict[str, Metric] = None,
+        dataset: type = None,
+        year: int = None,
+        processes: int = None,
+    ) -> WarmPool:
+        """Builds a baseline simulation, calculating the given variables, and
+        forks worker processes from it which evaluate reforms on request.
+
+        Args:
+            variables (List[str], optional): Variables to calculate in the baseline before forking. Defaults to ().
+            metrics (Dict[str, Metric], optional): Named functions of a simulation returning a number. Defaults to None.
+            dataset (type, optional): The dataset to use. Defaults to the default dataset.
+            year (int, optional): The year to simulate. Defaults to the latest year of the dataset.
+            processes (int, optional): The number of worker processes. Defaults to the number of CPUs.
+
+        Returns:
+            WarmPool: The pool.
+        """
+        return WarmPool(
+            cls,
+            variables=variables,
+            metrics=metrics,
+            dataset=dataset,
+            year=year,
+            processes=processes,
+        )
+
+    @classmethod
+    def stream(
+        cls,
+        variables: List[str],
+        reform: ReformType = (),
+        dataset: type = None,
+        year: int = None,
+        chunk_size: int = 10_000,
+        map_to: str = None,
+        output_file: Path = None,
+    ) -> pd.DataFrame:
+        """Simulates the dataset in chunks of groups (e.g. households), so that
+        only one chunk is held in memory at a time, and merges the results.
+
+        Args:
+            variables (List[str]): The variables to aggregate.
+            reform (ReformType, optional): The reform to apply. Defaults to ().
+            dataset (type, optional): The array dataset to use. Defaults to the default dataset.
+            year (int, optional): The year to simulate. Defaults to the latest year of the dataset.
+            chunk_size (int, optional): The number of groups per chunk. Defaults to 10,000.
+            map_to (str, optional): The entity to map variables to. Defaults to None (each variable's own).
+            output_file (Path, optional): A CSV file to write each chunk's values to. Defaults to None.
+
+        Returns:
+            pd.DataFrame: The weighted sum, mean and count (of non-zero values) of each variable.
+        """
+        return stream_microsimulation(
+            cls,
+            variables,
+            reform=reform,
+            dataset=dataset,
+            year=year,
+            chunk_size=chunk_size,
+            map_to=map_to,
+            output_file=output_file,
+        )
 
     def apply_reform(self, reform: ReformType) -> None:
         """Recursively applies a reform to the tax-benefit system.
@@ -88,6 +287,17 @@ class Microsimulation:
         else:
             reform.apply(self.system)
 
+    def new_tax_benefit_system(self) -> TaxBenefitSystem:
+        """Creates an unreformed instance of the tax-benefit system, cloning a
+        process-level cached instance if `cache_tax_benefit_system` is set.
+
+        Returns:
+            TaxBenefitSystem: The tax-benefit system.
+        """
+        if self.cache_tax_benefit_system:
+            return get_tax_benefit_system(type(self).tax_benefit_system)
+        return self.tax_benefit_system()
+
     def load_dataset(self, dataset: type, year: int) -> None:
         """Loads the dataset with the specified year.
 
@@ -95,28 +305,31 @@ class Microsimulation:
             dataset (type): The dataset to use.
             year (int): The year of the data to load.
         """
-        self.system = self.tax_benefit_system()
+        self.system = self.new_tax_benefit_system()
         if year not in dataset.years:
             dataset.generate(year)
-        data = dataset.load(year)
-
-        class carry_over_by_default(Reform):
-            def apply(s):
-                for var in data.keys():
-                    if var in self.system.variables:
-                        var_cls = type(self.system.variables[var])
-                        s.update_variable(carried_over(var_cls))
-
-        self.apply_reform(
-            (
-                self.pre_reform,
-                carry_over_by_default,
-                self.reform,
-                self.post_reform,
+        if self.sample_fraction is not None:
+            dataset = self.sample = sample_dataset(
+                dataset,
+                year,
+                person_entity=self.person_entity_names[0],
+                group_entities=list(self.group_entity_names),
+                variable_entities={
+                    name: variable.entity.key
+                    for name, variable in self.system.variables.items()
+                },
+                fraction=self.sample_fraction,
+                strata=self.sample_strata,
+                seed=self.sample_seed,
             )
-        )
-        builder = SimulationBuilder()
-        builder.create_entities(self.system)
+        else:
+            self.sample = None
+        if self.memory_map:
+            data = dataset.load(year, memory_map=True)
+        else:
+            data = dataset.load(year)
+        self.build_system(list(data.keys()))
+        narrow = narrow_integers if self.precision == "single" else np.array
 
         if not hasattr(dataset, "data_format"):
             dataset.data_format = Dataset.ARRAYS
@@ -127,61 +340,572 @@ class Microsimulation:
             else ""
         )
 
-        for person_entity in self.person_entity_names:
-            builder.declare_person_entity(
-                person_entity,
-                np.array(data[f"{person_entity}_id{key_suffix}"]),
-            )
-
-        for group_entity in self.group_entity_names:
-            primary_keys = np.array(data[f"{group_entity}_id{key_suffix}"])
-            group = builder.declare_entity(group_entity, primary_keys)
-            foreign_keys = np.array(
-                data[f"person_{group_entity}_id{key_suffix}"]
-            )
-            if f"person_{group_entity}_role{key_suffix}" in data.keys():
-                roles = np.array(
-                    data[f"person_{group_entity}_role{key_suffix}"]
-                ).astype(str)
-            elif "role" in data.keys():
-                roles = np.array(data["role"]).astype(str)
-            else:
-                roles = np.array(
-                    [self.default_role] * len(foreign_keys)
-                ).astype(str)
-            builder.join_with_persons(group, foreign_keys, roles)
+        def get_array(key: str) -> np.ndarray:
+            for name in (f"{key}{key_suffix}", key):
+                try:
+                    return data[name]
+                except KeyError:
+                    continue
+            return None
 
-        self.simulation = builder.build(self.system)
-        self.simulation.max_spiral_loops = 10
+        ids = {
+            entity: narrow(get_array(f"{entity}_id"))
+            for entity in self.person_entity_names + self.group_entity_names
+        }
+        memberships = {
+            entity: get_array(f"person_{entity}_id")
+            for entity in self.group_entity_names
+        }
+        roles = {}
+        positions = {}
+        for entity in self.group_entity_names:
+            entity_roles = get_array(f"person_{entity}_role")
+            if entity_roles is None:
+                entity_roles = get_array("role")
+            if entity_roles is not None:
+                roles[entity] = entity_roles
+            entity_positions = get_array(f"person_{entity}_position")
+            if entity_positions is not None:
+                positions[entity] = entity_positions
+        populations = build_populations(
+            self.system,
+            ids,
+            memberships,
+            roles=roles,
+            positions=positions,
+            default_role=self.default_role,
+        )
+        self.create_simulation(populations)
         if dataset.data_format == Dataset.TIME_PERIOD_ARRAYS:
-            for variable in data.keys():
-                for period in data[variable].keys():
-                    try:
-                        self.set_input(
-                            variable, period, data[variable][period]
-                        )
-                    except Exception as e:
-                        logging.warn(
-                            f"Could not set {variable} for {period}: {e}"
-                        )
+            inputs = [
+                (variable, period, f"{variable}/{period}")
+                for variable in data.keys()
+                for period in data[variable].keys()
+            ]
         else:
-            for variable in data.keys():
+            inputs = [(variable, year, variable) for variable in data.keys()]
+        if self.output_variables is not None:
+            # Only inputs which the outputs depend on are set now, the rest
+            # only if they are later used.
+            required = self.dependency_graph().inputs(
+                self.output_variables,
+                available=set(variable for variable, _, _ in inputs),
+            ) | set(
+                f"{entity}_weight"
+                for entity in self.person_entity_names
+                + self.group_entity_names
+            )
+        for variable, period, key in inputs:
+            if self.lazy_inputs or (
+                self.output_variables is not None and variable not in required
+            ):
+                if variable in self.system.variables:
+                    self.pending_inputs.setdefault(variable, {})[
+                        periods.period(period)
+                    ] = key
+            else:
                 try:
-                    self.set_input(variable, year, data[variable])
+                    self._set_input(variable, period, data[key])
                 except Exception as e:
                     logging.warn(f"Could not set {variable} for {period}: {e}")
-        data.close()
+        if self.memory_map and (
+            self.lazy_inputs or self.output_variables is not None
+        ):
+            # Mapped arrays are only read from disk when used.
+            self._read_input = lambda key: data[key]
+        else:
+            data.close()
+            self._read_input = lambda key: dataset.load(year, key)
+        if self.baseline is not None:
+            self.use_baseline_results()
+
+    def save_state(self, file: str) -> None:
+        """Saves the simulation's entities, inputs, results and calculation
+        dependencies to an HDF5 file, to restore with `load_state` (or the
+        `state` argument) without loading the dataset or recalculating.
+
+        Args:
+            file (str): The file to write.
+
+        Raises:
+            ValueError: If the simulation takes results from a baseline, so does not hold them all.
+        """
+        if self.baseline is not None:
+            raise ValueError(
+                "Simulations using a baseline's results can't be saved."
+            )
+        for variable in list(self.pending_inputs):
+            self.load_pending_inputs(variable)
+        save_simulation_state(
+            file,
+            self.simulation,
+            self.dependencies,
+            attributes=dict(
+                year=self.year,
+                dataset=self.dataset.name,
+                dataset_hash=hash_file(self.dataset.file(self.year)),
+                input_variables=self.input_variables,
+                input_periods={
+                    variable: sorted(map(str, input_periods))
+                    for variable, input_periods in self.input_periods.items()
+                },
+                system_key=self.system_key(),
+            ),
+        )
+
+    def load_state(self, file: str, memory_map: bool = True) -> None:
+        """Restores a simulation saved with `save_state`, instead of loading
+        the dataset.
+
+        Args:
+            file (str): The state file.
+            memory_map (bool, optional): Whether to memory-map arrays, read-only, rather than read them. Defaults to True.
+
+        Raises:
+            ValueError: If the simulation was saved from a different dataset (if the dataset is available), or with a
+                different reform, precision, sample or package versions.
+        """
+        attributes = read_state_attributes(file)
+        dataset_file = self.dataset.file(self.year)
+        if attributes["dataset"] != self.dataset.name or (
+            # The state can be restored without the dataset file.
+            dataset_file.exists()
+            and attributes["dataset_hash"] != hash_file(dataset_file)
+        ):
+            raise ValueError(
+                "The state was saved from a simulation of a different dataset."
+            )
+        self.system = self.new_tax_benefit_system()
+        self.sample = None
+        self.build_system(attributes["input_variables"])
+        if attributes["system_key"] != self.system_key():
+            raise ValueError(
+                "The state was saved from a simulation with a different reform, precision, sample or package versions."
+            )
+        populations, arrays = load_simulation_state(
+            file, self.system, memory_map=memory_map
+        )
+        self.create_simulation(populations)
+        self.input_periods = {
+            variable: set(map(periods.period, input_periods))
+            for variable, input_periods in attributes.get(
+                "input_periods", {}
+            ).items()
+        }
+        load_dependencies(file, self.dependencies)
+        for variable, variable_arrays in arrays.items():
+            holder = self.simulation.get_holder(variable)
+            for period, values in variable_arrays.items():
+                holder.put_in_cache(values, periods.period(period))
+        if self.baseline is not None:
+            self.use_baseline_results()
+
+    def build_system(self, input_variables: List[str]) -> None:
+        """Applies `pre_reform` to the tax-benefit system, makes input variables
+        carry over their values by default, then applies the reform.
+
+        Args:
+            input_variables (List[str]): The variables with inputs in the dataset.
+        """
+        system = self.system
+
+        class carry_over_by_default(Reform):
+            def apply(self):
+                for name in input_variables:
+                    if name in system.variables:
+                        variable = type(system.variables[name])
+                        self.update_variable(carried_over(variable))
+
+        self.input_variables = input_variables
+        # Kept to identify every variable the reforms below change.
+        self.untouched_variables = dict(self.system.variables)
+        self.apply_reform((self.pre_reform, carry_over_by_default))
+        # Kept for clones to apply other reforms to.
+        self.unreformed_system = self.system
+        self.apply_reforms()
+
+    def create_simulation(self, populations: Dict[str, Population]) -> None:
+        """Creates the OpenFisca simulation, without any inputs.
+
+        Args:
+            populations (Dict[str, Population]): The populations of each entity.
+        """
+        self.simulation = Simulation(self.system, populations)
+        self.simulation.max_spiral_loops = 10
+        if self.precision == "single":
+            for group_entity in self.group_entity_names:
+                population = self.simulation.populations[group_entity]
+                population.members_entity_id = narrow_integers(
+                    population.members_entity_id
+                )
+        self.membership = get_membership_indices(self.simulation)
+        self._hook_simulation()
+        self.pending_inputs = {}
+        # The periods each variable has inputs for, to copy to reformed clones.
+        self.input_periods = {}
+        self._weights = {}
+        self.inputs_changed = False
+        self._result_cache_key = None
+
+    def apply_reforms(self) -> None:
+        """Builds the simulation's tax-benefit system, by applying its reform
+        and `post_reform` to a copy of the unreformed system, and setting the
+        precision of its variables."""
+        self.system = clone_tax_benefit_system(self.unreformed_system)
+        self.apply_reform(self.reform)
+        self.reformed_variables = set(
+            name
+            for name in set(self.unreformed_system.variables)
+            | set(self.system.variables)
+            if self.unreformed_system.variables.get(name)
+            is not self.system.variables.get(name)
+        )
+        self.apply_reform(self.post_reform)
+        self.modified_variables = set(
+            name
+            for name in set(self.untouched_variables)
+            | set(self.system.variables)
+            if self.untouched_variables.get(name)
+            is not self.system.variables.get(name)
+        )
+        self.apply_precision()
+
+    def dependency_graph(self) -> VariableGraph:
+        """Finds the dependencies between variables, from their formulas and
+        the calculations run in this simulation so far.
+
+        Returns:
+            VariableGraph: The dependency graph.
+        """
+        return VariableGraph(self.system, self.dependencies)
+
+    def precision_policy(self) -> tuple:
+        """Identifies the precision that variables are stored with.
+
+        Returns:
+            tuple: The precision and any per-variable overrides.
+        """
+        return (
+            self.precision,
+            sorted(
+                (name, np.dtype(dtype).name)
+                for name, dtype in (self.precision_overrides or {}).items()
+            ),
+        )
+
+    def apply_precision(self) -> None:
+        """Sets the dtype that each variable's inputs and results are stored
+        with. With `precision` "single", float variables are stored as 32-bit
+        floats and entity IDs and membership indices as the narrowest integers
+        that fit them; with "double", float variables are stored as 64-bit
+        floats. `precision_overrides` sets the dtype of individual variables,
+        e.g. to keep sensitive totals at double precision. Weights are always
+        aggregated at double precision.
+
+        Raises:
+            ValueError: If an invalid precision is set.
+        """
+        if self.precision not in FLOAT_DTYPES:
+            raise ValueError("Not a valid precision.")
+        overrides = self.precision_overrides or {}
+        if self.precision is None and not overrides:
+            return
+        for name, variable in list(self.system.variables.items()):
+            dtype = overrides.get(name)
+            if dtype is None and variable.value_type == float:
+                dtype = FLOAT_DTYPES[self.precision]
+            if dtype is None or np.dtype(dtype) == np.dtype(variable.dtype):
+                continue
+            # Variables may be shared with other systems, so are copied.
+            variable = copy.copy(variable)
+            variable.dtype = np.dtype(dtype).type
+            self.system.variables[name] = variable
+
+    def load_pending_inputs(self, variable: str) -> None:
+        """Reads a variable's inputs from the dataset, if they have not been yet.
+
+        Args:
+            variable (str): The name of the variable.
+        """
+        for period, key in self.pending_inputs.pop(variable, {}).items():
+            try:
+                self._set_input(variable, period, self._read_input(key))
+            except Exception as e:
+                logging.warn(f"Could not set {variable} for {period}: {e}")
+
+    def clone(self, reform: ReformType = None) -> "Microsimulation":
+        """Creates a simulation with the same dataset and inputs, without
+        reloading the dataset. The copy takes results from this simulation (as its
+        baseline) until its inputs are changed with `set_input`, after which only
+        variables depending on the changed inputs are recalculated.
+
+        Args:
+            reform (ReformType, optional): A reform to apply to the copy, on top of this
+                simulation's. Only results the reform can affect are recalculated. Defaults to None.
+
+        Returns:
+            Microsimulation: The copy.
+        """
+        clone = empty_clone(self)
+        clone.__dict__.update(self.__dict__)
+        clone.baseline = self
+        clone.bonus_sims = SimulationCache(self.bonus_sims_max_memory)
+        clone.pending_inputs = {}
+        clone.input_periods = {
+            variable: set(input_periods)
+            for variable, input_periods in self.input_periods.items()
+        }
+        clone._weights = {}
+        clone._result_cache_key = None
+        clone.simulation = self.simulation.clone()
+        if reform is not None:
+            clone.reform = (self.reform, reform)
+            clone.apply_reforms()
+            clone.simulation.tax_benefit_system = clone.system
+        entities = {entity.key: entity for entity in clone.system.entities}
+        for population in clone.simulation.populations.values():
+            # Holders are filled from this simulation on first use.
+            population._holders = {}
+            population.entity = entities[population.entity.key]
+            if population is not clone.simulation.persons:
+                population.members = clone.simulation.persons
+        clone._hook_simulation()
+        clone.use_baseline_results()
+        # Variables redefined by the reform aren't taken from this
+        # simulation, so need its inputs.
+        inputs = set(self.pending_inputs) | set(self.input_periods)
+        for variable in (
+            clone.changed_variables & inputs & set(clone.system.variables)
+        ):
+            if variable in self.pending_inputs:
+                clone.pending_inputs[variable] = dict(
+                    self.pending_inputs[variable]
+                )
+            holder = self.simulation.get_holder(variable)
+            clone_holder = clone.simulation.get_holder(variable)
+            for period in holder.get_known_periods():
+                if any(
+                    input_period.contains(period)
+                    for input_period in self.input_periods.get(variable, ())
+                ):
+                    clone_holder.put_in_cache(holder.get_array(period), period)
+        return clone
+
+    def memory_usage(self) -> int:
+        """Returns the memory used by the simulation's stored arrays, excluding
+        those shared with its baseline.
+
+        Returns:
+            int: The number of bytes used.
+        """
+        shared = (
+            set(map(id, get_stored_arrays(self.baseline.simulation)))
+            if self.baseline is not None
+            else set()
+        )
+        return sum(
+            array.nbytes
+            for array in get_stored_arrays(self.simulation)
+            if id(array) not in shared
+        )
+
+    def _hook_simulation(self) -> None:
+        # Route the OpenFisca simulation's cache-or-formula step through
+        # `_calculate`, and record calculation dependencies.
+        self.profiler = (
+            ProfilingTracer(memory=self.profile_memory)
+            if self.profiling
+            else None
+        )
+        self.dependencies = record_dependencies(self.simulation, self.profiler)
+        self._simulation_calculate = partial(
+            Simulation._calculate, self.simulation
+        )
+        self.simulation._calculate = self._calculate
+
+    def use_baseline_results(self) -> None:
+        """Makes the simulation take results from the baseline simulation
+        wherever the recorded dependencies of the baseline calculation include
+        no variable or parameter changed by either simulation's reform.
+        """
+        if self.system is self.baseline.system:
+            self.changed_variables = set()
+            self.changed_parameters = set()
+        else:
+            self.changed_variables = (
+                self.reformed_variables | self.baseline.reformed_variables
+            )
+            self.changed_parameters = get_changed_parameters(
+                self.baseline.system.parameters, self.system.parameters
+            )
+        self._affected_by_reform = {}
+
+    def _calculate(self, variable_name: str, period: Period) -> np.ndarray:
+        # Replaces the OpenFisca simulation's own method, which checks the
+        # cache and otherwise runs the variable's formula.
+        check_cancelled()
+        if variable_name in self.pending_inputs:
+            self.load_pending_inputs(variable_name)
+        holder = self.simulation.get_holder(variable_name)
+        if (
+            self.baseline is not None
+            and variable_name not in self.changed_variables
+            and holder.get_array(period) is None
+        ):
+            array = self.baseline.simulation.calculate(variable_name, period)
+            node = (variable_name, period)
+            if not self.baseline.dependencies.depends_on(
+                node,
+                self.changed_variables,
+                self.changed_parameters,
+                self._affected_by_reform,
+            ):
+                self.dependencies.copy_from(self.baseline.dependencies, node)
+                holder.put_in_cache(array, period)
+                return array
+        if holder.get_array(period) is None:
+            array = self._uprate(variable_name, period)
+            if array is not None:
+                holder.put_in_cache(array, period)
+                return array
+        return self._simulation_calculate(variable_name, period)
+
+    def _uprate(self, variable_name: str, period: Period) -> np.ndarray:
+        # Calculates an uprated (or carried-over) variable in closed form, as
+        # its latest earlier value multiplied by the change in the uprating
+        # parameter since then, rather than recursing back one year at a time.
+        variable = self.system.variables[variable_name]
+        formula = variable.get_formula(period)
+        if variable.definition_period != YEAR or not hasattr(
+            formula, "uprating"
+        ):
+            return None
+        holder = self.simulation.get_holder(variable_name)
+        known_periods = [
+            known_period
+            for known_period in holder.get_known_periods()
+            if known_period.unit == YEAR and known_period.start < period.start
+        ]
+        if not known_periods:
+            return None
+        base = max(known_periods, key=lambda known_period: known_period.start)
+        values = holder.get_array(base)
+        if variable.get_formula(base.offset(1)) is not formula or (
+            # The formula falls back to the original one if there are zeros.
+            formula.uprating is not None
+            and formula.fallback_formula is not None
+            and not np.all(values)
+        ):
+            return None
+        # The result is derived from the earlier value, without reading it
+        # through the simulation.
+        self.dependencies.variables.setdefault(
+            (variable_name, period), set()
+        ).add((variable_name, base))
+        if formula.uprating is None:
+            return values
+        current = self.system.get_parameters_at_instant(period)
+        previous = self.system.get_parameters_at_instant(base)
+        for key in formula.uprating.split("."):
+            current = getattr(current, key)
+            previous = getattr(previous, key)
+        self.dependencies.parameters.setdefault(
+            (variable_name, period), set()
+        ).add(formula.uprating)
+        return (values * (current / previous)).astype(variable.dtype)
 
     def set_input(self, variable: str, year: int, values: np.ndarray) -> None:
+        """Overwrites the values of a variable for a time period. Stored results
+        of calculations which read the variable in an overlapping period are
+        deleted, so that only they are recalculated when next requested.
+
+        Args:
+            variable (str): The name of the variable.
+            year (int): The time period.
+            values (np.ndarray): The values to set.
+        """
+        period = periods.period(year)
+        pending = self.pending_inputs.get(variable, {})
+        for pending_period in list(pending):
+            # Dataset values overlapping the new input would overwrite it
+            # when read, so are dropped, or read now if they extend beyond it.
+            if (
+                pending_period.start <= period.stop
+                and period.start <= pending_period.stop
+            ):
+                key = pending.pop(pending_period)
+                if not period.contains(pending_period):
+                    self._set_input(
+                        variable, pending_period, self._read_input(key)
+                    )
+        dependents = self.dependencies.dependents(variable, period)
+        for name, dependent_period in dependents:
+            self.simulation.get_holder(name).delete_arrays(dependent_period)
+        self.dependencies.forget(dependents)
+        # Derivatives were calculated from the old input.
+        self.bonus_sims.clear()
+        if self.baseline is not None:
+            # Baseline results using the old input are no longer valid.
+            self.changed_variables.add(variable)
+            self._affected_by_reform.clear()
+        # Weights may depend on the input.
+        self._weights.clear()
+        # Stored results would not reflect the input.
+        self.inputs_changed = True
+        self._set_input(variable, year, values)
+
+    def _set_input(self, variable: str, year: int, values: np.ndarray) -> None:
         if variable in self.system.variables:
-            values = np.array(values)
-            target_dtype = self.system.variables[variable].value_type
-            if target_dtype in (Enum, str):
+            self.input_periods.setdefault(variable, set()).add(
+                periods.period(year)
+            )
+            metadata = self.system.variables[variable]
+            if metadata.value_type == Enum:
+                values = encode_enum(values, metadata.possible_values)
+                self.simulation.set_input(variable, year, values)
+                return
+            # Avoid copying inputs which already have the variable's dtype
+            values = np.asarray(values)
+            if metadata.value_type == str:
                 values = values.astype(str)
             else:
-                values = values.astype(target_dtype)
+                values = values.astype(
+                    self.system.variables[variable].dtype, copy=False
+                )
             self.simulation.set_input(variable, year, values)
 
+    def project(
+        self,
+        variables: List[str],
+        start_year: int = None,
+        end_year: int = None,
+        how: str = "sum",
+        map_to: str = None,
+    ) -> pd.DataFrame:
+        """Calculates aggregates of variables over a range of years, evaluating
+        years in order so that each reuses the previous year's results. Uprated
+        and carried-over variables are calculated in closed form from their
+        latest earlier values.
+
+        Args:
+            variables (List[str]): The variables to aggregate.
+            start_year (int, optional): The first year. Defaults to the simulation year.
+            end_year (int, optional): The last year. Defaults to the first year.
+            how (str, optional): The aggregation function, as in `aggregate`. Defaults to "sum".
+            map_to (str, optional): The entity to map to before aggregating. Defaults to None.
+
+        Returns:
+            pd.DataFrame: The aggregates, with a row for each year and a column for each variable.
+        """
+        start_year = start_year or self.year
+        end_year = end_year or start_year
+        results = {}
+        for year in range(start_year, end_year + 1):
+            results[year] = self.aggregate(
+                variables, how=how, period=year, map_to=map_to
+            )
+        return pd.DataFrame.from_dict(results, orient="index")
+
     def map_to(
         self, arr: np.array, entity: str, target_entity: str, how: str = None
     ):
@@ -199,33 +923,15 @@ class Microsimulation:
         Returns:
             np.array: The mapped values.
         """
-        entity_pop = self.simulation.populations[entity]
-        target_pop = self.simulation.populations[target_entity]
-        if entity == "person" and target_entity in self.group_entity_names:
-            if how and how not in (
-                "sum",
-                "any",
-                "min",
-                "max",
-                "all",
-                "value_from_first_person",
-            ):
-                raise ValueError("Not a valid function.")
-            return target_pop.__getattribute__(how or "sum")(arr)
-        elif entity in self.group_entity_names and target_entity == "person":
-            if not how:
-                return entity_pop.project(arr)
-            if how == "mean":
-                return entity_pop.project(arr / entity_pop.nb_persons())
-        elif entity == target_entity:
-            return arr
-        else:
-            return self.map_to(
-                self.map_to(arr, entity, "person", how="mean"),
-                "person",
-                target_entity,
-                how="sum",
+        if isinstance(arr, pd.Categorical):
+            # Enum values are mapped as their codes.
+            return pd.Categorical.from_codes(
+                map_to_entity(
+                    arr.codes, entity, target_entity, self.membership, how
+                ),
+                dtype=arr.dtype,
             )
+        return map_to_entity(arr, entity, target_entity, self.membership, how)
 
     def calc(
         self,
@@ -245,29 +951,233 @@ class Microsimulation:
             weighted (bool, optional): Whether to return weighted results. Defaults to True.
 
         Returns:
-            Union[np.array, MicroSeries]: A weighted or unweighted array.
+            Union[np.array, pd.Categorical, MicroSeries]: A weighted or unweighted array. Enum values
+                are a categorical of item names, or names as strings if `categorical_enums` is False.
         """
         if period is None:
             period = self.year
         var_metadata = self.simulation.tax_benefit_system.variables[variable]
         entity = var_metadata.entity.key
-        arr = self.simulation.calculate(variable, period)
+        arr = self._calculate_values(variable, period)
         if var_metadata.value_type == Enum:
-            arr = arr.decode_to_str()
+            if self.categorical_enums:
+                arr = enum_to_categorical(arr)
+            else:
+                arr = arr.decode_to_str()
         if map_to:
             arr = self.map_to(arr, entity, map_to, how=how)
             entity = map_to
         if weighted:
-            series = MicroSeries(
-                arr,
-                weights=self.calc(
-                    f"{entity}_weight", period=period, weighted=False
-                ),
-            )
+            series = MicroSeries(arr, weights=self.weights(entity, period))
             return series
         else:
             return arr
 
+    def sampling(self) -> tuple:
+        """Identifies the subsample of the dataset simulated, if any.
+
+        Returns:
+            tuple: The sampling fraction, stratification variable and seed, or None if not sampling.
+        """
+        if self.sample_fraction is None:
+            return None
+        return (self.sample_fraction, self.sample_strata, self.sample_seed)
+
+    def standard_errors(
+        self,
+        variables: List[str],
+        how: str = "sum",
+        period: int = None,
+        map_to: str = None,
+        threshold: float = 0,
+    ) -> Dict[str, float]:
+        """Estimates the sampling standard errors of the aggregates returned by
+        `aggregate`, which are zero unless simulating a subsample. Errors of means
+        and shares use a linear approximation of the ratio of weighted totals.
+
+        Args:
+            variables (List[str]): The variables to aggregate.
+            how (str, optional): "sum", "mean", "count" or "share_above". Defaults to "sum".
+            period (int, optional): The time period to calculate for. Defaults to the simulation year.
+            map_to (str, optional): The entity to map to before aggregating. Defaults to None.
+            threshold (float, optional): The threshold for "share_above". Defaults to 0.
+
+        Raises:
+            ValueError: If an invalid aggregation function is passed.
+
+        Returns:
+            Dict[str, float]: The standard error of each aggregate.
+        """
+        if how not in ("sum", "mean", "count", "share_above"):
+            raise ValueError("Not a valid function.")
+        if self.sample is None:
+            return {variable: 0.0 for variable in variables}
+        if period is None:
+            period = self.year
+        top_entity = self.group_entity_names[0]
+        results = {}
+        for variable in variables:
+            values = self.calc(
+                variable, period=period, map_to=map_to, weighted=False
+            )
+            entity = (
+                map_to
+                or self.simulation.tax_benefit_system.variables[
+                    variable
+                ].entity.key
+            )
+            weights = self.weights(entity, period)
+            if how == "count":
+                values = values != 0
+            elif how == "share_above":
+                values = values > threshold
+            # Each sampled group's contribution to the estimate.
+            totals = self.map_to(weights * values, entity, top_entity)
+            if how in ("mean", "share_above"):
+                weight_totals = self.map_to(weights, entity, top_entity)
+                mean = totals.sum() / weight_totals.sum()
+                totals = (totals - mean * weight_totals) / weight_totals.sum()
+            results[variable] = self.sample.standard_error(totals)
+        return results
+
+    def result_cache_key(self) -> str:
+        """Identifies the simulation's results, by hashing the dataset file
+        and `system_key`.
+
+        Returns:
+            str: The SHA-256 hex digest.
+        """
+        if self._result_cache_key is None:
+            key = hashlib.sha256()
+            for item in (
+                hash_file(self.dataset.file(self.year)),
+                self.system_key(),
+            ):
+                key.update(repr(item).encode())
+            self._result_cache_key = key.hexdigest()
+        return self._result_cache_key
+
+    def system_key(self) -> str:
+        """Identifies what the simulation's results depend on other than its
+        inputs: the year, sample, precision, package versions, parameter values
+        and definitions of variables changed by any reform, including
+        `pre_reform` and `post_reform`.
+
+        Returns:
+            str: The SHA-256 hex digest.
+        """
+        key = hashlib.sha256()
+        for item in (
+            self.year,
+            self.sampling(),
+            self.precision_policy(),
+            get_package_version(type(self.system).__module__),
+            get_package_version(__name__),
+            sorted(get_parameter_values(self.system.parameters).items()),
+            [
+                fingerprint_variable(self.system.variables.get(name))
+                for name in sorted(self.modified_variables)
+            ],
+        ):
+            key.update(repr(item).encode())
+        return key.hexdigest()
+
+    def _calculate_values(self, variable: str, period: int) -> np.ndarray:
+        # Reads results from, or writes them to, the persistent result cache
+        # if there is one and the dataset's inputs have not been changed.
+        if self.result_cache is None or self.inputs_changed:
+            return self.simulation.calculate(variable, period)
+        period = periods.period(period)
+        holder = self.simulation.get_holder(variable)
+        if holder.get_array(period) is not None:
+            return holder.get_array(period)
+        values = self.result_cache.get(
+            self.result_cache_key(), variable, period
+        )
+        if values is None:
+            values = self.simulation.calculate(variable, period)
+            self.result_cache.put(
+                self.result_cache_key(), variable, period, values
+            )
+            return values
+        metadata = self.system.variables[variable]
+        if metadata.value_type == Enum:
+            values = EnumArray(values, metadata.possible_values)
+        holder.put_in_cache(values, period)
+        return holder.get_array(period)
+
+    def weights(self, entity: str, period: int = None) -> np.ndarray:
+        """Returns the weights of an entity, calculating them once per period.
+
+        Args:
+            entity (str): The entity, e.g. "household".
+            period (int, optional): The time period. Defaults to the simulation year.
+
+        Returns:
+            np.ndarray: The weights, as 64-bit floats.
+        """
+        if period is None:
+            period = self.year
+        if (entity, period) not in self._weights:
+            self._weights[entity, period] = np.asarray(
+                self._calculate_values(f"{entity}_weight", period),
+                dtype=np.float64,
+            )
+        return self._weights[entity, period]
+
+    def aggregate(
+        self,
+        variables: List[str],
+        how: str = "sum",
+        period: int = None,
+        map_to: str = None,
+        threshold: float = 0,
+    ) -> Dict[str, float]:
+        """Calculates weighted aggregates of many variables, using dot products
+        with the cached weights rather than constructing MicroSeries.
+
+        Args:
+            variables (List[str]): The variables to aggregate.
+            how (str, optional): "sum", "mean", "count" (the weighted number of
+                non-zero values) or "share_above" (the weighted share of values
+                above `threshold`). Defaults to "sum".
+            period (int, optional): The time period to calculate for. Defaults to the simulation year.
+            map_to (str, optional): The entity to map to before aggregating. Defaults to None.
+            threshold (float, optional): The threshold for "share_above". Defaults to 0.
+
+        Raises:
+            ValueError: If an invalid aggregation function is passed.
+
+        Returns:
+            Dict[str, float]: The aggregate of each variable.
+        """
+        if how not in ("sum", "mean", "count", "share_above"):
+            raise ValueError("Not a valid function.")
+        if period is None:
+            period = self.year
+        results = {}
+        for variable in variables:
+            values = self.calc(
+                variable, period=period, map_to=map_to, weighted=False
+            )
+            entity = (
+                map_to
+                or self.simulation.tax_benefit_system.variables[
+                    variable
+                ].entity.key
+            )
+            weights = self.weights(entity, period)
+            if how == "sum":
+                result = np.dot(weights, values)
+            elif how == "mean":
+                result = np.dot(weights, values) / weights.sum()
+            elif how == "count":
+                result = weights[values != 0].sum()
+            else:
+                result = weights[values > threshold].sum() / weights.sum()
+            results[variable] = float(result)
+        return results
+
     def df(
         self,
         variables: List[str],
@@ -285,18 +1195,45 @@ class Microsimulation:
             MicroDataFrame: The weighted DataFrame.
         """
         if period is None:
-            period = self.default_year
-        df_dict = {}
-        var_metadata = self.simulation.tax_benefit_system.variables[
-            variables[0]
-        ]
-        entity = map_to or var_metadata.entity.key
-        weights = self.calc(f"{entity}_weight", period=period, weighted=False)
-        for var in variables:
-            df_dict[var] = self.calc(
-                var, period=period, map_to=entity, how=how
-            )
-        return MicroDataFrame(df_dict, weights=weights)
+            period = self.default_year or self.year
+        system = self.simulation.tax_benefit_system
+        variables = list(dict.fromkeys(variables))
+        entity = map_to or system.variables[variables[0]].entity.key
+        columns = {}
+        for variable in variables:
+            source = system.variables[variable].entity.key
+            values = self.calc(variable, period=period, weighted=False)
+            columns[variable] = self.map_to(values, source, entity, how)
+        return MicroDataFrame(columns, weights=self.weights(entity, period))
+
+    async def acalc(self, *args, **kwargs) -> MicroSeries:
+        """Calculates a variable as `calc` does, in the executor of
+        `openfisca_tools.concurrency` rather than blocking the event loop.
+        Identical concurrent calls share one calculation, which is stopped
+        if all its callers are cancelled.
+
+        Returns:
+            MicroSeries: The resulting values.
+        """
+        return await run_async(self, "calc", *args, **kwargs)
+
+    async def adf(self, *args, **kwargs) -> MicroDataFrame:
+        """Constructs a DataFrame as `df` does, without blocking the event
+        loop (see `acalc`).
+
+        Returns:
+            MicroDataFrame: The weighted DataFrame.
+        """
+        return await run_async(self, "df", *args, **kwargs)
+
+    async def aaggregate(self, *args, **kwargs) -> Dict[str, float]:
+        """Calculates aggregates as `aggregate` does, without blocking the
+        event loop (see `acalc`).
+
+        Returns:
+            Dict[str, float]: The aggregate of each variable.
+        """
+        return await run_async(self, "aggregate", *args, **kwargs)
 
     def deriv(
         self,
@@ -327,25 +1264,21 @@ class Microsimulation:
         if target_entity == wrt_entity:
             # calculating a derivative with both source and target in the same entity
             config = (wrt, delta, percent, "same-entity")
-            if config not in self.bonus_sims:
-                self.bonus_sims[config] = type(self)(
-                    self.bonus_sims,
-                    dataset=self.dataset,
-                    year=self.year,
-                )
-                original_values = (
-                    self.bonus_sims[config].calc(wrt, period=self.year).values
-                )
+            bonus_sim = self.bonus_sims.get(config)
+            if bonus_sim is None:
+                # Clones only recalculate variables downstream of `wrt`.
+                bonus_sim = self.clone()
+                original_values = self.calc(wrt, period=self.year).values
                 if not percent:
-                    self.bonus_sims[config].simulation.set_input(
+                    bonus_sim.set_input(
                         wrt, self.year, original_values + delta
                     )
                 else:
-                    self.bonus_sims[config].simulation.set_input(
+                    bonus_sim.set_input(
                         wrt, self.year, original_values * (1 + delta)
                     )
+                self.bonus_sims[config] = bonus_sim
 
-            bonus_sim = self.bonus_sims[config]
             bonus_increase = bonus_sim.calc(wrt).astype(float) - self.calc(
                 wrt
             ).astype(float)
@@ -372,33 +1305,26 @@ class Microsimulation:
 
             for i in range(max_group_size):
                 config = (wrt, delta, percent, "group-entity", i)
-                if config not in self.bonus_sims:
-                    self.bonus_sims[config] = type(self)(
-                        self.reform,
-                        dataset=self.dataset,
-                        year=self.year,
-                    )
-                    original_values = (
-                        self.bonus_sims[config]
-                        .calc(wrt, period=self.year)
-                        .values
-                    )
+                bonus_sim = self.bonus_sims.get(config)
+                if bonus_sim is None:
+                    bonus_sim = self.clone()
+                    original_values = self.calc(wrt, period=self.year).values
 
                     if not percent:
-                        self.bonus_sims[config].simulation.set_input(
+                        bonus_sim.set_input(
                             wrt,
                             self.year,
                             original_values + delta * (index_in_group == i),
                         )
                     else:
-                        self.bonus_sims[config].simulation.set_input(
+                        bonus_sim.set_input(
                             wrt,
                             self.year,
                             original_values
                             * (1 + delta * (index_in_group == i)),
                         )
+                    self.bonus_sims[config] = bonus_sim
 
-                bonus_sim = self.bonus_sims[config]
                 bonus_increase = bonus_sim.calc(wrt).astype(float) - self.calc(
                     wrt
                 ).astype(float)
@@ -434,4 +1360,124 @@ class Microsimulation:
         return df
 
 
+def encode_enum(values: Any, possible_values: type) -> EnumArray:
+    """Encodes the values of an Enum variable without comparing every value
+    with every item name. Unknown names are encoded as the first item.
+
+    Args:
+        values (Any): Item indices, item names (as strings or bytes), a categorical of item names or Enum items.
+        possible_values (type): The Enum class.
+
+    Raises:
+        ValueError: If an item index is not a whole number or is out of range.
+
+    Returns:
+        EnumArray: The encoded values.
+    """
+    if isinstance(values, EnumArray):
+        return values
+    if isinstance(values, pd.Series):
+        values = values.values
+    indices = {item.name: item.index for item in possible_values}
+    if isinstance(values, pd.Categorical):
+        lookup = np.array(
+            [indices.get(name, 0) for name in values.categories] + [0],
+            dtype=ENUM_ARRAY_DTYPE,
+        )
+        # Missing values have code -1, so take the last entry.
+        return EnumArray(lookup[values.codes], possible_values)
+    values = np.asarray(values)
+    if values.dtype.kind in "iuf":
+        if not np.all((values >= 0) & (values < len(possible_values))) or (
+            values.dtype.kind == "f" and np.any(values != np.floor(values))
+        ):
+            raise ValueError(
+                f"Enum indices must be whole numbers below {len(possible_values)}."
+            )
+        return EnumArray(
+            values.astype(ENUM_ARRAY_DTYPE, copy=False), possible_values
+        )
+    if values.dtype.kind in "SUO":
+        # Object arrays (e.g. of strings read by pandas) may hold names or
+        # Enum items, which are hashable but not ordered.
+        if values.dtype.kind == "O":
+            inverse, names = pd.factorize(values.ravel())
+            inverse = inverse.reshape(values.shape)
+        else:
+            names, inverse = np.unique(values, return_inverse=True)
+        lookup = np.array(
+            [indices.get(get_enum_name(name), 0) for name in names] + [0],
+            dtype=ENUM_ARRAY_DTYPE,
+        )
+        # Missing values are factorised as -1, so take the last entry.
+        return EnumArray(lookup[inverse], possible_values)
+    return possible_values.encode(values)
+
+
+def get_enum_name(value: Any) -> str:
+    """Gets the item name an Enum input value refers to.
+
+    Args:
+        value (Any): An item name, as a string or bytes, or an Enum item.
+
+    Returns:
+        str: The item name.
+    """
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, bytes):
+        return value.decode()
+    return str(value)
+
+
+def enum_to_categorical(values: EnumArray) -> pd.Categorical:
+    """Converts Enum values to a categorical of item names, sharing their codes.
+
+    Args:
+        values (EnumArray): The encoded values.
+
+    Returns:
+        pd.Categorical: The categorical.
+    """
+    return pd.Categorical.from_codes(
+        np.asarray(values),
+        categories=[item.name for item in values.possible_values],
+    )
+
+
+def narrow_integers(values: np.ndarray) -> np.ndarray:
+    """Casts integers to the narrowest of 32 or 64-bit integers that holds them.
+
+    Args:
+        values (np.ndarray): The integers.
+
+    Returns:
+        np.ndarray: The cast integers, or the values unchanged if not integers.
+    """
+    values = np.array(values)
+    if values.dtype.kind not in "iu" or len(values) == 0:
+        return values
+    info = np.iinfo(np.int32)
+    if info.min <= values.min() and values.max() <= info.max:
+        return values.astype(np.int32, copy=False)
+    return values
+
+
+def get_stored_arrays(simulation: Simulation) -> List[np.ndarray]:
+    """Lists the arrays held in memory by an OpenFisca simulation's holders.
+
+    Args:
+        simulation (Simulation): The OpenFisca simulation.
+
+    Returns:
+        List[np.ndarray]: The stored arrays.
+    """
+    return [
+        array
+        for population in simulation.populations.values()
+        for holder in population._holders.values()
+        for array in holder._memory_storage._arrays.values()
+    ]
+
+
 GeneralMicrosimulation = Microsimulation
@@ -5,6 +5,7 @@ from openfisca_core.variables import Variable
 from openfisca_core.projectors import EntityToPersonProjector, Projector
 from numpy.typing import ArrayLike
 from typing import Any, Callable
+from openfisca_tools.profiling import profile_section
 
 
 class CallableSubset:
@@ -25,13 +26,14 @@ class CallableSubset:
         # (filling in with zeroes), use OpenFisca's mapping, then re-filter.
         if len(array) == self.population.members.count:
             return self.callable(array, *args, **kwargs)[self.mask]
-        decompressed_size = self.population.members.count
-        if len(self.mask) != decompressed_size:
-            mask = self.population.project(self.mask)
-        else:
-            mask = self.mask
-        decompressed_array = np.zeros((decompressed_size,))
-        decompressed_array[mask] = array
+        with profile_section(self.population.simulation, "defined_for"):
+            decompressed_size = self.population.members.count
+            if len(self.mask) != decompressed_size:
+                mask = self.population.project(self.mask)
+            else:
+                mask = self.mask
+            decompressed_array = np.zeros((decompressed_size,))
+            decompressed_array[mask] = array
         return self.callable(decompressed_array, *args, **kwargs)[self.mask]
 
 
@@ -86,17 +88,22 @@ def make_partially_executed_formula(
         else:
             mask_values = mask
 
-        result = np.ones_like(mask_values, dtype=value_type) * default_value
+        with profile_section(entity.simulation, "defined_for"):
+            result = (
+                np.ones_like(mask_values, dtype=value_type) * default_value
+            )
 
-        if not mask_values.any():
-            return result
+            if not mask_values.any():
+                return result
 
-        subset_entity = PopulationSubset(entity, mask_values)
+            subset_entity = PopulationSubset(entity, mask_values)
 
         formula_result = formula(subset_entity, period, parameters)
-        formula_result = np.array(formula_result)
 
-        result[mask_values] = formula_result
+        with profile_section(entity.simulation, "defined_for"):
+            formula_result = np.array(formula_result)
+
+            result[mask_values] = formula_result
 
         entity = subset_entity.population
 
@@ -19,6 +19,7 @@ from numpy.typing import ArrayLike
 from pandas import Period
 from itertools import product
 from .use_current_parameters import use_current_parameters
+from openfisca_tools.profiling import profile_section
 from openfisca_tools.model_api.defined_for import (
     make_partially_executed_formula,
 )
@@ -91,38 +92,44 @@ def for_each_variable(
     Returns:
         ArrayLike: The result of the operation.
     """
-    result = None
-    agg_func = dict(
-        add=lambda x, y: x + y, multiply=lambda x, y: x * y, max=max_, min=min_
-    )[agg_func]
-    if not entity.entity.is_person:
-        group_agg_func = dict(
-            add=entity.sum, all=entity.all, max=entity.max, min=entity.min
-        )[group_agg_func]
-    for variable in variables:
-        variable_entity = entity.entity.get_variable(variable).entity
-        if variable_entity.key == entity.entity.key:
-            values = entity(variable, period, options=options)
-        elif variable_entity.is_person:
-            values = group_agg_func(
-                entity.members(variable, period, options=options)
-            )
-        elif entity.entity.is_person:
-            raise ValueError(
-                f"You requested to aggregate {variable} (defined for {variable_entity.plural}) to {entity.entity.plural}, but this is not yet implemented."
-            )
-        else:  # Group-to-group aggregation
-            variable_population = entity.simulation.populations[
-                variable_entity.key
-            ]
-            person_shares = variable_population.project(
-                variable_population(variable, period)
-            ) / variable_population.project(variable_population.nb_persons())
-            values = entity.sum(person_shares)
-        if result is None:
-            result = values
-        else:
-            result = agg_func(result, values)
+    with profile_section(entity.simulation, "for_each_variable"):
+        result = None
+        agg_func = dict(
+            add=lambda x, y: x + y,
+            multiply=lambda x, y: x * y,
+            max=max_,
+            min=min_,
+        )[agg_func]
+        if not entity.entity.is_person:
+            group_agg_func = dict(
+                add=entity.sum, all=entity.all, max=entity.max, min=entity.min
+            )[group_agg_func]
+        for variable in variables:
+            variable_entity = entity.entity.get_variable(variable).entity
+            if variable_entity.key == entity.entity.key:
+                values = entity(variable, period, options=options)
+            elif variable_entity.is_person:
+                values = group_agg_func(
+                    entity.members(variable, period, options=options)
+                )
+            elif entity.entity.is_person:
+                raise ValueError(
+                    f"You requested to aggregate {variable} (defined for {variable_entity.plural}) to {entity.entity.plural}, but this is not yet implemented."
+                )
+            else:  # Group-to-group aggregation
+                variable_population = entity.simulation.populations[
+                    variable_entity.key
+                ]
+                person_shares = variable_population.project(
+                    variable_population(variable, period)
+                ) / variable_population.project(
+                    variable_population.nb_persons()
+                )
+                values = entity.sum(person_shares)
+            if result is None:
+                result = values
+            else:
+                result = agg_func(result, values)
     return result
 
 
@@ -323,6 +330,9 @@ def uprated(by: str = None, start_year: int = 2015) -> Callable:
                 return uprating * old
 
         formula_start_year.__name__ = f"formula_{start_year}"
+        # Allows uprating over several years to be calculated in closed form.
+        formula_start_year.uprating = by
+        formula_start_year.fallback_formula = formula
         setattr(variable, formula_start_year.__name__, formula_start_year)
         return variable
 
@@ -0,0 +1,196 @@
+"""
+Pools of worker processes forked from a warm baseline simulation.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import Future
+from typing import Any, Dict, List, Union
+import pandas as pd
+from openfisca_tools.data.dataset import Dataset
+from openfisca_tools.model_api.model_api import ReformType
+from openfisca_tools.reforms import set_parameter
+from openfisca_tools.sweep import Metric
+
+# Per-process state, set in the parent before workers are forked.
+_worker = {}
+
+
+class WarmPool:
+    """A pool of worker processes which each evaluate reforms against the same
+    baseline simulation. The parent process loads the dataset, builds the
+    baseline and calculates any common variables before forking the workers,
+    which inherit all of it (copy-on-write), so each reform only loads and
+    recalculates what it changes.
+
+    Reforms are sent to workers by pickling, so must be importable (e.g.
+    defined at module level), or given as a dictionary of parameter values,
+    e.g. `{"tax.rate": 0.3}`. Metrics are functions of a simulation returning
+    a number, inherited by the workers and requested by name.
+    """
+
+    def __init__(
+        self,
+        microsimulation_class: type,
+        variables: List[str] = (),
+        metrics: Dict[str, Metric] = None,
+        dataset: Dataset = None,
+        year: int = None,
+        processes: int = None,
+    ):
+        """Builds and warms the baseline and starts the workers.
+
+        Args:
+            microsimulation_class (type): The Microsimulation subclass to run.
+            variables (List[str], optional): Variables to calculate in the baseline before forking. Defaults to ().
+            metrics (Dict[str, Metric], optional): Named functions of a simulation returning a number. Defaults to None.
+            dataset (Dataset, optional): The dataset to use. Defaults to the class's default dataset.
+            year (int, optional): The year to simulate. Defaults to the latest year of the dataset.
+            processes (int, optional): The number of worker processes. Defaults to the number of CPUs.
+                Reforms are evaluated in this process if 1, or if processes can't be forked.
+        """
+        self.baseline = microsimulation_class(dataset=dataset, year=year)
+        for variable in variables:
+            self.baseline.calc(variable)
+        self.metrics = metrics or {}
+        _worker.clear()
+        _worker.update(baseline=self.baseline, metrics=self.metrics)
+        processes = processes or os.cpu_count()
+        if processes > 1 and "fork" in multiprocessing.get_all_start_methods():
+            self.pool = multiprocessing.get_context("fork").Pool(processes)
+        else:
+            self.pool = None
+
+    def submit(
+        self,
+        reform: Union[ReformType, Dict[str, float]],
+        outputs: List[str],
+    ) -> Future:
+        """Starts evaluating a reform in a worker.
+
+        Args:
+            reform (Union[ReformType, Dict[str, float]]): The reform, or parameter values to set.
+            outputs (List[str]): The variables to total and metrics to calculate.
+
+        Returns:
+            Future: The value of each output, by name (awaitable with `asyncio.wrap_future`).
+        """
+        future = Future()
+        if self.pool is None:
+            try:
+                future.set_result(
+                    evaluate_reform(
+                        self.baseline, self.metrics, reform, outputs
+                    )
+                )
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            self.pool.apply_async(
+                _evaluate_in_worker,
+                (reform, outputs),
+                callback=future.set_result,
+                error_callback=future.set_exception,
+            )
+        return future
+
+    def evaluate(
+        self,
+        reform: Union[ReformType, Dict[str, float]],
+        outputs: List[str],
+    ) -> Dict[str, float]:
+        """Evaluates a reform in a worker, waiting for the result.
+
+        Args:
+            reform (Union[ReformType, Dict[str, float]]): The reform, or parameter values to set.
+            outputs (List[str]): The variables to total and metrics to calculate.
+
+        Returns:
+            Dict[str, float]: The value of each output.
+        """
+        return self.submit(reform, outputs).result()
+
+    def map(
+        self,
+        reforms: Dict[Any, Union[ReformType, Dict[str, float]]],
+        outputs: List[str],
+    ) -> pd.DataFrame:
+        """Evaluates many reforms across the workers.
+
+        Args:
+            reforms (Dict[Any, Union[ReformType, Dict[str, float]]]): The reforms, keyed by name.
+            outputs (List[str]): The variables to total and metrics to calculate.
+
+        Returns:
+            pd.DataFrame: One row per reform and output, with columns `reform`, `output` and `value`.
+        """
+        results = {
+            key: self.submit(reform, outputs)
+            for key, reform in reforms.items()
+        }
+        return pd.DataFrame(
+            [
+                (key, output, value)
+                for key, result in results.items()
+                for output, value in result.result().items()
+            ],
+            columns=["reform", "output", "value"],
+        )
+
+    def close(self) -> None:
+        """Stops the workers, and releases the baseline held for them."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        # Another pool may have been created since.
+        if _worker.get("baseline") is self.baseline:
+            _worker.clear()
+
+    def __enter__(self) -> "WarmPool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def evaluate_reform(
+    baseline: Any,
+    metrics: Dict[str, Metric],
+    reform: Union[ReformType, Dict[str, float]],
+    outputs: List[str],
+) -> Dict[str, float]:
+    """Evaluates a reform against a baseline simulation.
+
+    Args:
+        baseline (Microsimulation): The baseline simulation.
+        metrics (Dict[str, Metric]): Named functions of a simulation returning a number.
+        reform (Union[ReformType, Dict[str, float]]): The reform, or parameter values to set.
+        outputs (List[str]): The variables to total and metrics to calculate.
+
+    Returns:
+        Dict[str, float]: The value of each output.
+    """
+    if isinstance(reform, dict):
+        reform = tuple(
+            set_parameter(parameter, value)
+            for parameter, value in reform.items()
+        )
+    # Inputs and unaffected results are shared with the baseline.
+    sim = baseline.clone(reform)
+    return {
+        output: (
+            metrics[output](sim)
+            if output in metrics
+            else float(sim.calc(output).sum())
+        )
+        for output in outputs
+    }
+
+
+def _evaluate_in_worker(
+    reform: Union[ReformType, Dict[str, float]], outputs: List[str]
+) -> Dict[str, float]:
+    return evaluate_reform(
+        _worker["baseline"], _worker["metrics"], reform, outputs
+    )
@@ -0,0 +1,151 @@
+"""
+Construction of OpenFisca populations directly from dataset arrays.
+"""
+
+from typing import Dict
+import numpy as np
+from openfisca_core.populations import GroupPopulation, Population
+from openfisca_core.taxbenefitsystems import TaxBenefitSystem
+
+
+def build_populations(
+    system: TaxBenefitSystem,
+    ids: Dict[str, np.ndarray],
+    memberships: Dict[str, np.ndarray],
+    roles: Dict[str, np.ndarray] = None,
+    positions: Dict[str, np.ndarray] = None,
+    default_role: str = None,
+) -> Dict[str, Population]:
+    """Builds the populations of a simulation from arrays, as
+    `SimulationBuilder` does but without converting arrays to lists or
+    looping over people.
+
+    Args:
+        system (TaxBenefitSystem): The tax-benefit system.
+        ids (Dict[str, np.ndarray]): The IDs of each entity's members, by entity key.
+        memberships (Dict[str, np.ndarray]): The ID of each person's group, by group entity key.
+        roles (Dict[str, np.ndarray], optional): Each person's role in each group entity, as role keys or as
+            indices in the entity's flattened roles. Defaults to the default role.
+        positions (Dict[str, np.ndarray], optional): Each person's position among the members of their group,
+            by group entity key. Defaults to positions in the order of the person IDs.
+        default_role (str, optional): The role of people without one. Defaults to each entity's first role.
+
+    Raises:
+        ValueError: If IDs are duplicated, people belong to groups which don't exist, or roles or positions are invalid.
+
+    Returns:
+        Dict[str, Population]: The populations, by entity key.
+    """
+    roles = roles or {}
+    positions = positions or {}
+    populations = system.instantiate_entities()
+    for key, population in populations.items():
+        population.ids = np.asarray(ids[key])
+        population.count = len(population.ids)
+        if not isinstance(population, GroupPopulation):
+            continue
+        entity_ids = get_entity_index(population.ids, memberships[key])
+        population.members_entity_id = entity_ids
+        flattened_roles = population.entity.flattened_roles
+        if len(flattened_roles) == 0:
+            population.members_role = np.int64(0)
+        else:
+            codes = encode_roles(
+                roles.get(key), flattened_roles, len(entity_ids), default_role
+            )
+            # Set directly, as the setter copies roles to a list first.
+            population._members_role = np.array(flattened_roles, dtype=object)[
+                codes
+            ]
+        sizes = np.bincount(entity_ids, minlength=population.count)
+        if key in positions:
+            members_position = np.asarray(positions[key])
+            if np.any(members_position < 0) or np.any(
+                members_position >= sizes[entity_ids]
+            ):
+                raise ValueError(
+                    f"Positions of {population.entity.plural} members must be less than the group size."
+                )
+        else:
+            # Each person's rank among their group's members, in ID order.
+            order = np.argsort(entity_ids, kind="stable")
+            starts = np.cumsum(sizes) - sizes
+            members_position = np.empty(len(entity_ids), dtype=np.int32)
+            members_position[order] = (
+                np.arange(len(entity_ids)) - starts[entity_ids[order]]
+            )
+        population.members_position = members_position
+    return populations
+
+
+def get_entity_index(ids: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Finds the index of each of a set of IDs in a list of unique IDs.
+
+    Args:
+        ids (np.ndarray): The unique IDs.
+        keys (np.ndarray): The IDs to look up.
+
+    Raises:
+        ValueError: If the IDs aren't unique, or a key is not one of them.
+
+    Returns:
+        np.ndarray: The index of each key.
+    """
+    keys = np.asarray(keys)
+    if len(ids) > 1 and np.all(ids[1:] > ids[:-1]):
+        sorter = None
+        sorted_ids = ids
+    else:
+        sorter = np.argsort(ids, kind="stable")
+        sorted_ids = ids[sorter]
+        if np.any(sorted_ids[1:] == sorted_ids[:-1]):
+            raise ValueError("Entity IDs must be unique.")
+    index = np.minimum(
+        np.searchsorted(sorted_ids, keys), max(len(sorted_ids) - 1, 0)
+    )
+    if len(keys) > 0 and (
+        len(sorted_ids) == 0 or np.any(sorted_ids[index] != keys)
+    ):
+        raise ValueError("Some people belong to groups which don't exist.")
+    if sorter is not None:
+        index = sorter[index]
+    return index
+
+
+def encode_roles(
+    roles: np.ndarray, flattened_roles: list, count: int, default_role: str
+) -> np.ndarray:
+    """Converts role keys to indices in an entity's flattened roles.
+
+    Args:
+        roles (np.ndarray): The role keys or indices, or None for the default role.
+        flattened_roles (list): The entity's flattened roles.
+        count (int): The number of people.
+        default_role (str): The key of the default role.
+
+    Raises:
+        ValueError: If a role is not one of the entity's roles.
+
+    Returns:
+        np.ndarray: The role indices.
+    """
+    keys = [role.key for role in flattened_roles]
+    if roles is None:
+        index = keys.index(default_role) if default_role in keys else 0
+        return np.full(count, index, dtype=np.int16)
+    roles = np.asarray(roles)
+    if roles.dtype.kind in "iu":
+        codes = roles
+    else:
+        names, inverse = np.unique(roles, return_inverse=True)
+        names = [
+            name.decode() if isinstance(name, bytes) else str(name)
+            for name in names
+        ]
+        unknown = set(names) - set(keys)
+        if unknown:
+            raise ValueError(f"Unknown roles: {', '.join(sorted(unknown))}.")
+        codes = np.array([keys.index(name) for name in names])[inverse]
+    if len(codes) > 0 and (codes.min() < 0 or codes.max() >= len(keys)):
+        raise ValueError("Role indices must index the entity's roles.")
+    return codes
@@ -0,0 +1,187 @@
+"""
+Per-variable timing and memory profiling of simulations.
+"""
+
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+import time
+import tracemalloc
+from typing import Any, Iterator, Tuple
+import numpy as np
+import pandas as pd
+from openfisca_core.periods import Period
+from openfisca_tools.dependencies import DependencyTracer
+
+
+class ProfilingTracer(DependencyTracer):
+    """A tracer recording, for each (variable, period) calculated, the number
+    of calls, the time taken (including and excluding calculations of other
+    variables), the size of the result and optionally the peak memory allocated.
+    Named sections within formulas (e.g. `defined_for` subsetting) are profiled
+    as if they were variables called by the formula's variable."""
+
+    def __init__(self, memory: bool = False):
+        """Initialises a profiling tracer.
+
+        Args:
+            memory (bool, optional): Whether to record peak memory with `tracemalloc`, which slows calculations.
+                Before Python 3.9, memory is only measured at the start and end of each calculation. Defaults to False.
+        """
+        super().__init__()
+        self.memory = memory
+        self._started_tracemalloc = memory and not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start()
+        self._recording_memory = memory
+        self.calls = defaultdict(int)
+        self.time = defaultdict(float)
+        self.self_time = defaultdict(float)
+        self.nbytes = {}
+        self.peak_memory = defaultdict(int)
+        self.folded_stacks = defaultdict(float)
+        self._frames = []
+
+    def record_calculation_start(self, variable: str, period: Period):
+        super().record_calculation_start(variable, period)
+        self._start_frame((variable, period))
+
+    def record_calculation_result(self, value: Any):
+        if self._frames and hasattr(value, "nbytes"):
+            self.nbytes[self._frames[-1]["node"]] = value.nbytes
+
+    def record_calculation_end(self):
+        self._end_frame()
+        super().record_calculation_end()
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        """Profiles a block of code as part of the calculation in progress.
+
+        Args:
+            name (str): The name of the section, e.g. "defined_for".
+        """
+        variable, period = (
+            self._frames[-1]["node"] if self._frames else (None, None)
+        )
+        self._start_frame((f"{variable} [{name}]", period))
+        try:
+            yield
+        finally:
+            self._end_frame()
+
+    def _start_frame(self, node: tuple):
+        frame = dict(node=node, child_time=0.0)
+        if self._recording_memory:
+            current, peak = _get_traced_memory()
+            if self._frames and "peak" in self._frames[-1]:
+                parent = self._frames[-1]
+                parent["peak"] = max(parent["peak"], peak)
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            frame["start_memory"] = frame["peak"] = current
+        self._frames.append(frame)
+        frame["start"] = time.perf_counter()
+
+    def _end_frame(self):
+        elapsed = time.perf_counter() - self._frames[-1]["start"]
+        frame = self._frames.pop()
+        node = frame["node"]
+        self.calls[node] += 1
+        self.time[node] += elapsed
+        self.self_time[node] += elapsed - frame["child_time"]
+        path = ";".join(
+            f"{name}@{period}"
+            for name, period in [f["node"] for f in self._frames] + [node]
+        )
+        self.folded_stacks[path] += elapsed - frame["child_time"]
+        if self._frames:
+            self._frames[-1]["child_time"] += elapsed
+        if self._recording_memory and "peak" in frame:
+            peak = max(frame["peak"], _get_traced_memory()[1])
+            self.peak_memory[node] = max(
+                self.peak_memory[node], peak - frame["start_memory"]
+            )
+            if self._frames and "peak" in self._frames[-1]:
+                parent = self._frames[-1]
+                parent["peak"] = max(parent["peak"], peak)
+
+    def close(self) -> None:
+        """Stops memory tracing, if this tracer started it. Memory use is no
+        longer recorded afterwards."""
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self._recording_memory = False
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Summarises the profile as a table, slowest calculations first.
+
+        Returns:
+            pd.DataFrame: One row per (variable, period), with the number of calls, total and self
+                time in seconds, result size and peak memory allocated in bytes.
+        """
+        nodes = list(self.calls)
+        table = pd.DataFrame(
+            dict(
+                variable=[variable for variable, _ in nodes],
+                period=[str(period) for _, period in nodes],
+                calls=[self.calls[node] for node in nodes],
+                time=[self.time[node] for node in nodes],
+                self_time=[self.self_time[node] for node in nodes],
+                nbytes=[self.nbytes.get(node, np.nan) for node in nodes],
+                peak_memory=[
+                    self.peak_memory[node] if self.memory else np.nan
+                    for node in nodes
+                ],
+            )
+        )
+        return table.sort_values("self_time", ascending=False).reset_index(
+            drop=True
+        )
+
+    def to_folded_stacks(self) -> str:
+        """Exports self time by call stack in the folded format read by
+        `flamegraph.pl` and speedscope.
+
+        Returns:
+            str: One line per stack, with frames separated by semicolons followed by microseconds.
+        """
+        return "\n".join(
+            f"{path} {round(seconds * 1e6)}"
+            for path, seconds in self.folded_stacks.items()
+        )
+
+    def save_folded_stacks(self, path: Path) -> None:
+        """Writes the folded call stacks to a file.
+
+        Args:
+            path (Path): The file to write.
+        """
+        Path(path).write_text(self.to_folded_stacks() + "\n")
+
+
+def _get_traced_memory() -> Tuple[int, int]:
+    # The current memory allocated, and the peak since it was last reset.
+    current, peak = tracemalloc.get_traced_memory()
+    if not hasattr(tracemalloc, "reset_peak"):
+        # The peak can't be reset before Python 3.9.
+        peak = current
+    return current, peak
+
+
+@contextmanager
+def profile_section(simulation: Any, name: str) -> Iterator[None]:
+    """Profiles a block of code within a formula if the simulation has a
+    profiling tracer, and otherwise does nothing.
+
+    Args:
+        simulation (Any): The OpenFisca simulation.
+        name (str): The name of the section.
+    """
+    tracer = getattr(simulation, "tracer", None)
+    if isinstance(tracer, ProfilingTracer):
+        with tracer.section(name):
+            yield
+    else:
+        yield
@@ -0,0 +1,226 @@
+"""
+Saving and restoring the inputs and results of simulations.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Tuple
+import h5py
+import numpy as np
+from openfisca_core import periods
+from openfisca_core.indexed_enums import Enum, EnumArray
+from openfisca_core.populations import GroupPopulation, Population
+from openfisca_core.simulations import Simulation
+from openfisca_core.taxbenefitsystems import TaxBenefitSystem
+from openfisca_tools.data.dataset import MemoryMappedArrays
+from openfisca_tools.dependencies import DependencyTracer
+from openfisca_tools.populations import build_populations
+
+# Incremented when the layout of state files changes.
+STATE_FORMAT_VERSION = 2
+
+
+def save_simulation_state(
+    file: Path,
+    simulation: Simulation,
+    dependencies: DependencyTracer = None,
+    attributes: Dict[str, Any] = None,
+) -> None:
+    """Writes the entities and every stored array of a simulation to an HDF5
+    file. Arrays are stored contiguously and uncompressed, so can be memory-mapped
+    when loaded.
+
+    Args:
+        file (Path): The file to write.
+        simulation (Simulation): The OpenFisca simulation.
+        dependencies (DependencyTracer, optional): Recorded calculation dependencies to save. Defaults to None.
+        attributes (Dict[str, Any], optional): Metadata to store with the state. Defaults to None.
+    """
+    with h5py.File(file, mode="w") as f:
+        f.attrs["format_version"] = STATE_FORMAT_VERSION
+        for key, value in (attributes or {}).items():
+            f.attrs[key] = json.dumps(value)
+        for key, population in simulation.populations.items():
+            f[f"entities/{key}/ids"] = population.ids
+            if isinstance(population, GroupPopulation):
+                f[f"entities/{key}/members_entity_id"] = (
+                    population.members_entity_id
+                )
+                f[f"entities/{key}/members_position"] = (
+                    population.members_position
+                )
+                roles = np.zeros(population.members_entity_id.size, np.int16)
+                for i, role in enumerate(population.entity.flattened_roles):
+                    roles[population.members_role == role] = i
+                f[f"entities/{key}/members_role"] = roles
+            for variable, holder in population._holders.items():
+                for period in holder.get_known_periods():
+                    f[f"holders/{variable}/{period}"] = encode_array(
+                        holder.get_array(period)
+                    )
+        if dependencies is not None:
+            saved = []
+            for (name, period), nodes in dependencies.variables.items():
+                saved.append(
+                    [
+                        name,
+                        str(period),
+                        [[node[0], str(node[1])] for node in nodes],
+                        sorted(
+                            dependencies.parameters.get((name, period), ())
+                        ),
+                    ]
+                )
+            # Attributes are limited in size, so this is a string dataset.
+            f["dependencies"] = json.dumps(saved)
+
+
+def read_state_attributes(file: Path) -> Dict[str, Any]:
+    """Reads the metadata stored with a simulation state.
+
+    Args:
+        file (Path): The state file.
+
+    Raises:
+        ValueError: If the file was written by an incompatible version.
+
+    Returns:
+        Dict[str, Any]: The metadata.
+    """
+    with h5py.File(file, mode="r") as f:
+        if f.attrs.get("format_version") != STATE_FORMAT_VERSION:
+            raise ValueError("Not a compatible simulation state file.")
+        return {
+            key: json.loads(value)
+            for key, value in f.attrs.items()
+            if key != "format_version"
+        }
+
+
+def load_simulation_state(
+    file: Path, system: TaxBenefitSystem, memory_map: bool = True
+) -> Tuple[Dict[str, Population], Dict[str, Dict[str, np.ndarray]]]:
+    """Reads the entities and stored arrays of a simulation saved with
+    `save_simulation_state`.
+
+    Args:
+        file (Path): The state file.
+        system (TaxBenefitSystem): The tax-benefit system to build populations for.
+        memory_map (bool, optional): Whether to memory-map arrays, read-only, rather than read them. Defaults to True.
+
+    Returns:
+        Tuple[Dict[str, Population], Dict[str, Dict[str, np.ndarray]]]: The populations, and each variable's
+            arrays by period. Variables not in the tax-benefit system are skipped.
+    """
+    read_state_attributes(file)
+    if memory_map:
+        data = MemoryMappedArrays(file)
+    else:
+        data = {}
+        with h5py.File(file, mode="r") as f:
+            f.visititems(
+                lambda key, item: (
+                    data.update({key: item[()]})
+                    if isinstance(item, h5py.Dataset)
+                    else None
+                )
+            )
+        data = _nest(data)
+    entities = data["entities"]
+    ids = {key: arrays["ids"] for key, arrays in entities.items()}
+    group_entities = [
+        key
+        for key, arrays in entities.items()
+        if "members_entity_id" in arrays
+    ]
+    populations = build_populations(
+        system,
+        ids,
+        {
+            key: ids[key][entities[key]["members_entity_id"]]
+            for key in group_entities
+        },
+        roles={key: entities[key]["members_role"] for key in group_entities},
+        positions={
+            key: entities[key]["members_position"] for key in group_entities
+        },
+    )
+    arrays = {
+        variable: {
+            period: decode_array(values, system.variables[variable])
+            for period, values in variable_arrays.items()
+        }
+        for variable, variable_arrays in data.get("holders", {}).items()
+        if variable in system.variables
+    }
+    return populations, arrays
+
+
+def load_dependencies(file: Path, dependencies: DependencyTracer) -> None:
+    """Adds the calculation dependencies saved with a simulation state to a
+    tracer.
+
+    Args:
+        file (Path): The state file.
+        dependencies (DependencyTracer): The tracer.
+    """
+    with h5py.File(file, mode="r") as f:
+        saved = json.loads(
+            f["dependencies"][()] if "dependencies" in f else "[]"
+        )
+    for name, period, variables, parameters in saved:
+        node = (name, periods.period(period))
+        dependencies.variables[node] = set(
+            (dependency, periods.period(dependency_period))
+            for dependency, dependency_period in variables
+        )
+        dependencies.parameters[node] = set(parameters)
+
+
+def encode_array(values: np.ndarray) -> np.ndarray:
+    """Converts an array to a type HDF5 can store.
+
+    Args:
+        values (np.ndarray): The array.
+
+    Returns:
+        np.ndarray: Enum codes, bytes for strings, or day numbers for dates.
+    """
+    if isinstance(values, EnumArray):
+        return np.asarray(values)
+    if values.dtype.kind in "OU":
+        return np.char.encode(values.astype(str))
+    if values.dtype.kind == "M":
+        return values.astype("datetime64[D]").view(np.int64)
+    return values
+
+
+def decode_array(values: np.ndarray, variable: Any) -> np.ndarray:
+    """Converts an array read from a state file back to the variable's type.
+
+    Args:
+        values (np.ndarray): The stored array.
+        variable (Variable): The variable.
+
+    Returns:
+        np.ndarray: The array, as stored in OpenFisca holders.
+    """
+    if variable.value_type == Enum:
+        return EnumArray(values, variable.possible_values)
+    if values.dtype.kind == "S":
+        return np.char.decode(values).astype(variable.dtype)
+    if np.dtype(variable.dtype).kind == "M":
+        return values.view("datetime64[D]")
+    return values
+
+
+def _nest(data: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    # Converts "a/b/c" keys to nested dictionaries, as in `MemoryMappedArrays`.
+    nested = {}
+    for key, values in data.items():
+        *groups, name = key.split("/")
+        node = nested
+        for group in groups:
+            node = node.setdefault(group, {})
+        node[name] = values
+    return nested
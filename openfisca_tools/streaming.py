@@ -0,0 +1,99 @@
+"""
+Chunk-by-chunk microsimulation of datasets too large to simulate at once.
+"""
+
+from pathlib import Path
+from typing import List
+from openfisca_core.entities import GroupEntity
+import pandas as pd
+from openfisca_tools.data.chunks import iter_dataset_chunks
+from openfisca_tools.data.dataset import Dataset
+from openfisca_tools.model_api.model_api import ReformType
+from openfisca_tools.tax_benefit_system import get_tax_benefit_system
+
+
+def stream_microsimulation(
+    microsimulation_class: type,
+    variables: List[str],
+    reform: ReformType = (),
+    dataset: Dataset = None,
+    year: int = None,
+    chunk_size: int = 10_000,
+    map_to: str = None,
+    output_file: Path = None,
+) -> pd.DataFrame:
+    """Simulates a dataset in chunks of whole groups of its first group entity,
+    holding only one chunk's inputs and results in memory at a time.
+
+    Args:
+        microsimulation_class (type): The Microsimulation subclass to run.
+        variables (List[str]): The variables to aggregate.
+        reform (ReformType, optional): The reform to apply. Defaults to ().
+        dataset (Dataset, optional): The array dataset to use. Defaults to the class's default dataset.
+        year (int, optional): The year to simulate. Defaults to the latest year of the dataset.
+        chunk_size (int, optional): The number of groups per chunk. Defaults to 10,000.
+        map_to (str, optional): The entity to map variables to. Defaults to None (each variable's own).
+        output_file (Path, optional): A CSV file to write each chunk's values to. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The weighted sum, mean and count (of non-zero values) of each variable.
+    """
+
+    class StreamMicrosimulation(microsimulation_class):
+        # Chunks share one tax-benefit system rather than building their own.
+        cache_tax_benefit_system = True
+
+    if dataset is None:
+        dataset = microsimulation_class.default_dataset
+    if year is None:
+        year = microsimulation_class.default_year or max(dataset.years)
+    if year not in dataset.years:
+        dataset.generate(year)
+    if not hasattr(dataset, "data_format"):
+        dataset.data_format = Dataset.ARRAYS
+    system = get_tax_benefit_system(microsimulation_class.tax_benefit_system)
+    chunks = iter_dataset_chunks(
+        dataset,
+        year,
+        person_entity=[
+            entity.key
+            for entity in microsimulation_class.entities
+            if not isinstance(entity, GroupEntity)
+        ][0],
+        group_entities=[
+            entity.key
+            for entity in microsimulation_class.entities
+            if isinstance(entity, GroupEntity)
+        ],
+        variable_entities={
+            name: variable.entity.key
+            for name, variable in system.variables.items()
+        },
+        chunk_size=chunk_size,
+    )
+    # Weighted sums, counts and total weights merge by addition.
+    totals = pd.DataFrame(0.0, index=variables, columns=["sum", "count"])
+    weights = pd.Series(0.0, index=variables)
+    for i, chunk in enumerate(chunks):
+        sim = StreamMicrosimulation(reform, dataset=chunk, year=year)
+        totals["sum"] += pd.Series(sim.aggregate(variables, map_to=map_to))
+        totals["count"] += pd.Series(
+            sim.aggregate(variables, "count", map_to=map_to)
+        )
+        weights += pd.Series(
+            {
+                variable: sim.weights(
+                    map_to or system.variables[variable].entity.key
+                ).sum()
+                for variable in variables
+            }
+        )
+        if output_file is not None:
+            sim.df(variables, map_to=map_to).to_csv(
+                output_file,
+                mode="a" if i > 0 else "w",
+                header=i == 0,
+                index=False,
+            )
+    totals["mean"] = totals["sum"] / weights
+    return totals[["sum", "mean", "count"]]
@@ -0,0 +1,145 @@
+"""
+Parallel evaluation of many reforms against one dataset.
+"""
+
+import multiprocessing
+import os
+from typing import Any, Callable, Dict, List, Tuple, Union
+import pandas as pd
+from openfisca_tools.data.dataset import Dataset
+from openfisca_tools.model_api.model_api import ReformType
+
+Metric = Callable[[Any], float]
+
+# Per-process state, set by `_initialise_worker`.
+_worker = {}
+
+
+def sweep_reforms(
+    microsimulation_class: type,
+    reforms: Union[List[ReformType], Dict[Any, ReformType]],
+    variables: List[str] = (),
+    metrics: Dict[str, Metric] = None,
+    dataset: Dataset = None,
+    year: int = None,
+    processes: int = None,
+) -> pd.DataFrame:
+    """Evaluates outputs of many reforms on the same dataset in a process pool.
+
+    Array datasets are memory-mapped from `.npy` files, so the operating system
+    holds a single copy of the inputs shared by every worker. Each worker builds
+    one baseline simulation, and reformed simulations reuse its results for
+    variables their reform cannot affect.
+
+    Args:
+        microsimulation_class (type): The Microsimulation subclass to run.
+        reforms (Union[List[ReformType], Dict[Any, ReformType]]): The reforms, optionally keyed by name.
+        variables (List[str], optional): Variables to report the weighted totals of. Defaults to ().
+        metrics (Dict[str, Metric], optional): Named functions of a simulation returning a number. Defaults to None.
+        dataset (Dataset, optional): The dataset to use. Defaults to the class's default dataset.
+        year (int, optional): The year to simulate. Defaults to the latest year of the dataset.
+        processes (int, optional): The number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        pd.DataFrame: One row per reform and output, with columns `reform`, `output` and `value`.
+    """
+    if not isinstance(reforms, dict):
+        reforms = dict(enumerate(reforms))
+    if dataset is None:
+        dataset = microsimulation_class.default_dataset
+    if year is None:
+        year = microsimulation_class.default_year or max(dataset.years)
+    if year not in dataset.years:
+        dataset.generate(year)
+    memory_map = getattr(dataset, "data_format", Dataset.ARRAYS) in (
+        Dataset.ARRAYS,
+        Dataset.TIME_PERIOD_ARRAYS,
+    )
+    if memory_map and not dataset.has_memory_map(year):
+        dataset.save_memory_map(year)
+    outputs = {variable: variable for variable in variables}
+    outputs.update(metrics or {})
+    keys = list(reforms)
+    settings = (
+        microsimulation_class,
+        list(reforms.values()),
+        outputs,
+        dataset,
+        year,
+        memory_map,
+    )
+    processes = min(processes or os.cpu_count(), len(keys))
+    if processes <= 1:
+        _initialise_worker(*settings)
+        try:
+            results = list(map(_evaluate_reform, range(len(keys))))
+        finally:
+            # Don't keep the baseline and reforms alive in this process.
+            _worker.clear()
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        # Forked workers inherit reforms and metrics without pickling them.
+        context = multiprocessing.get_context(
+            "fork" if "fork" in methods else None
+        )
+        with context.Pool(
+            processes, initializer=_initialise_worker, initargs=settings
+        ) as pool:
+            results = pool.map(_evaluate_reform, range(len(keys)), chunksize=1)
+    return pd.DataFrame(
+        [
+            (keys[i], output, value)
+            for i, values in enumerate(results)
+            for output, value in values
+        ],
+        columns=["reform", "output", "value"],
+    )
+
+
+def _initialise_worker(
+    microsimulation_class: type,
+    reforms: List[ReformType],
+    outputs: Dict[str, Union[str, Metric]],
+    dataset: Dataset,
+    year: int,
+    memory_map: bool,
+) -> None:
+    class WorkerMicrosimulation(microsimulation_class):
+        cache_tax_benefit_system = True
+
+    WorkerMicrosimulation.memory_map = memory_map
+    WorkerMicrosimulation.lazy_inputs = memory_map
+    _worker.clear()
+    _worker.update(
+        microsimulation_class=WorkerMicrosimulation,
+        reforms=reforms,
+        outputs=outputs,
+        dataset=dataset,
+        year=year,
+        baseline=None,
+    )
+
+
+def _evaluate_reform(index: int) -> List[Tuple[str, float]]:
+    microsimulation_class = _worker["microsimulation_class"]
+    if _worker["baseline"] is None:
+        _worker["baseline"] = microsimulation_class(
+            dataset=_worker["dataset"], year=_worker["year"]
+        )
+    sim = microsimulation_class(
+        _worker["reforms"][index],
+        dataset=_worker["dataset"],
+        year=_worker["year"],
+        baseline=_worker["baseline"],
+    )
+    return [
+        (
+            name,
+            (
+                float(sim.calc(output).sum())
+                if isinstance(output, str)
+                else output(sim)
+            ),
+        )
+        for name, output in _worker["outputs"].items()
+    ]
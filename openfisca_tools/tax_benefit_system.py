@@ -0,0 +1,74 @@
+"""
+Process-level caching and cheap cloning of tax-benefit systems.
+"""
+
+import copy
+from threading import Lock
+from typing import Callable, Dict
+from openfisca_core.commons import empty_clone
+from openfisca_core.taxbenefitsystems import TaxBenefitSystem
+
+_templates: Dict[Callable, TaxBenefitSystem] = {}
+_templates_lock = Lock()
+
+
+def clone_tax_benefit_system(system: TaxBenefitSystem) -> TaxBenefitSystem:
+    """Copies a tax-benefit system just enough that reforms applied to the copy
+    do not affect the original. Variables are shared (reforms replace rather than
+    edit them), and the parameter tree is only copied when the clone's
+    `modify_parameters` is first called.
+
+    Args:
+        system (TaxBenefitSystem): The tax-benefit system to copy.
+
+    Returns:
+        TaxBenefitSystem: The copy.
+    """
+    clone = empty_clone(system)
+    clone.__dict__.update(system.__dict__)
+    clone.variables = system.variables.copy()
+    clone.open_api_config = system.open_api_config.copy()
+    # Entities look up variables in their own system, so can't be shared.
+    clone.entities = [copy.copy(entity) for entity in system.entities]
+    clone.person_entity = [
+        entity for entity in clone.entities if entity.is_person
+    ][0]
+    clone.group_entities = [
+        entity for entity in clone.entities if not entity.is_person
+    ]
+    for entity in clone.entities:
+        entity.set_tax_benefit_system(clone)
+    shared_parameters = system.parameters
+
+    def modify_parameters(self, modifier: Callable) -> None:
+        if self.parameters is shared_parameters:
+            self.parameters = shared_parameters.clone()
+            self._parameters_at_instant_cache = {}
+        self.parameters = modifier(self.parameters)
+
+    clone.modify_parameters = modify_parameters.__get__(clone)
+    return clone
+
+
+def get_tax_benefit_system(
+    tax_benefit_system: Callable[[], TaxBenefitSystem],
+) -> TaxBenefitSystem:
+    """Returns a clone of a cached, unmodified instance of a tax-benefit system,
+    building it on the first call in this process.
+
+    Args:
+        tax_benefit_system (Callable[[], TaxBenefitSystem]): The tax-benefit system class (or a function returning an instance).
+
+    Returns:
+        TaxBenefitSystem: A clone of the cached instance.
+    """
+    with _templates_lock:
+        if tax_benefit_system not in _templates:
+            _templates[tax_benefit_system] = tax_benefit_system()
+    return clone_tax_benefit_system(_templates[tax_benefit_system])
+
+
+def clear_tax_benefit_system_cache() -> None:
+    """Removes all cached tax-benefit systems, e.g. after editing parameter files."""
+    with _templates_lock:
+        _templates.clear()
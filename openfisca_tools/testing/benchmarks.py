@@ -0,0 +1,407 @@
+"""
+Benchmarks of the core hot paths, on synthetic data so that they run offline
+without a country package. Run `python -m openfisca_tools.testing.benchmarks --help`
+for options, e.g. to save results and compare them with an earlier commit's.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+import numpy as np
+import pandas as pd
+from microdf import MicroDataFrame
+from openfisca_core.parameters import ParameterNode
+from openfisca_tools.cache import get_package_version
+from openfisca_tools.parameters import (
+    interpolate_parameters,
+    propagate_parameter_metadata,
+    uprate_parameters,
+)
+from openfisca_tools.testing.synthetic import (
+    SyntheticIndividualSim,
+    synthetic_dataset,
+    synthetic_microsimulation_class,
+    synthetic_parameters,
+)
+
+DEFAULT_SIZES = dict(
+    households=10_000,
+    variables=10,
+    parameters=100,
+    years=1,
+    vary_points=1_001,
+)
+
+
+class BenchmarkContext:
+    """The synthetic data shared by every benchmark in a run."""
+
+    def __init__(self, folder: Path, sizes: Dict[str, int]):
+        """Generates the synthetic dataset.
+
+        Args:
+            folder (Path): The folder to save the dataset in.
+            sizes (Dict[str, int]): The sizes, with the keys of `DEFAULT_SIZES`.
+        """
+        self.sizes = sizes
+        self.years = list(range(2023 - sizes["years"], 2023))
+        self.dataset = synthetic_dataset(
+            folder,
+            households=sizes["households"],
+            variables=sizes["variables"],
+            years=self.years,
+        )
+        self.microsimulation_class = type(
+            "BenchmarkMicrosimulation",
+            (
+                synthetic_microsimulation_class(
+                    self.dataset, sizes["parameters"]
+                ),
+            ),
+            dict(cache_tax_benefit_system=True),
+        )
+        self.outputs = ["household_net_income"]
+        if sizes["variables"] > 0:
+            self.outputs += ["synthetic_household_total"]
+
+    def simulations(self) -> list:
+        return [self.microsimulation_class(year=year) for year in self.years]
+
+
+# Each benchmark takes the context, does any setup and returns the function
+# to time. Setup is repeated before every timed run, so that no run benefits
+# from the caches filled by the last.
+
+
+def benchmark_tax_benefit_system(context: BenchmarkContext) -> Callable:
+    return context.microsimulation_class.tax_benefit_system
+
+
+def benchmark_parameter_pipeline(context: BenchmarkContext) -> Callable:
+    root = ParameterNode(
+        data=synthetic_parameters(context.sizes["parameters"])
+    )
+
+    def run():
+        propagate_parameter_metadata(root)
+        interpolate_parameters(root)
+        uprate_parameters(root)
+
+    return run
+
+
+def benchmark_load_dataset(context: BenchmarkContext) -> Callable:
+    return context.simulations
+
+
+def benchmark_calc(context: BenchmarkContext) -> Callable:
+    sims = context.simulations()
+
+    def run():
+        for sim in sims:
+            for variable in context.outputs:
+                sim.calc(variable)
+
+    return run
+
+
+def benchmark_map_to(context: BenchmarkContext) -> Callable:
+    sim = context.microsimulation_class()
+    person_values = sim.calc("employment_income").values
+    household_values = sim.calc("household_net_income").values
+
+    def run():
+        sim.map_to(person_values, "person", "household")
+        sim.map_to(person_values, "person", "household", how="max")
+        sim.map_to(household_values, "household", "person")
+        sim.map_to(household_values, "household", "person", how="mean")
+
+    return run
+
+
+def get_person_variables(sim: Any) -> List[str]:
+    # Person-level numeric variables, for DataFrames of household totals.
+    return [
+        name
+        for name, variable in sim.system.variables.items()
+        if variable.entity.key == "person"
+        and variable.value_type in (float, int)
+    ]
+
+
+def benchmark_df(context: BenchmarkContext) -> Callable:
+    sim = context.microsimulation_class()
+    variables = get_person_variables(sim)
+    sim.df(variables, map_to="household")
+
+    def run():
+        sim.df(variables, map_to="household")
+
+    return run
+
+
+def benchmark_df_per_column(context: BenchmarkContext) -> Callable:
+    # The same DataFrame, built as `df` originally did by mapping each column
+    # with `calc`, to compare with `df`.
+    sim = context.microsimulation_class()
+    variables = get_person_variables(sim)
+    sim.df(variables, map_to="household")
+
+    def run():
+        MicroDataFrame(
+            {
+                variable: sim.calc(
+                    variable, map_to="household", weighted=False
+                )
+                for variable in variables
+            },
+            weights=sim.calc("household_weight", weighted=False),
+        )
+
+    return run
+
+
+def benchmark_deriv(context: BenchmarkContext) -> Callable:
+    sim = context.microsimulation_class()
+
+    def run():
+        sim.deriv("income_tax", "employment_income")
+        sim.deriv("household_net_income", "employment_income")
+
+    return run
+
+
+def benchmark_vary(context: BenchmarkContext) -> Callable:
+    def run():
+        sim = SyntheticIndividualSim()
+        sim.add_person(age=30, employment_income=20_000)
+        sim.vary(
+            "employment_income",
+            max=100_000,
+            step=100_000 / (context.sizes["vary_points"] - 1),
+        )
+        sim.calc("household_net_income")
+
+    return run
+
+
+def benchmark_vary_parameter(context: BenchmarkContext) -> Callable:
+    def run():
+        sim = SyntheticIndividualSim()
+        sim.add_person(age=30, employment_income=20_000)
+        sim.vary(
+            parameter="tax.rate",
+            max=0.5,
+            step=0.5 / (context.sizes["vary_points"] - 1),
+        )
+        sim.calc("household_net_income")
+
+    return run
+
+
+BENCHMARKS = {
+    "tax_benefit_system": benchmark_tax_benefit_system,
+    "parameter_pipeline": benchmark_parameter_pipeline,
+    "load_dataset": benchmark_load_dataset,
+    "calc": benchmark_calc,
+    "map_to": benchmark_map_to,
+    "df": benchmark_df,
+    "df_per_column": benchmark_df_per_column,
+    "deriv": benchmark_deriv,
+    "vary": benchmark_vary,
+    "vary_parameter": benchmark_vary_parameter,
+}
+
+
+def time_benchmark(
+    benchmark: Callable[[BenchmarkContext], Callable],
+    context: BenchmarkContext,
+    repeats: int = 5,
+) -> List[float]:
+    """Times a benchmark after one untimed warm-up run, with garbage
+    collection paused during each timed run.
+
+    Args:
+        benchmark (Callable[[BenchmarkContext], Callable]): The benchmark.
+        context (BenchmarkContext): The synthetic data.
+        repeats (int, optional): The number of timed runs. Defaults to 5.
+
+    Returns:
+        List[float]: The time of each run, in seconds.
+    """
+    benchmark(context)()
+    times = []
+    for _ in range(repeats):
+        run = benchmark(context)
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            run()
+            times += [time.perf_counter() - start]
+        finally:
+            gc.enable()
+    return times
+
+
+def run_benchmarks(
+    sizes: Dict[str, int] = None,
+    names: List[str] = None,
+    repeats: int = 5,
+    folder: Path = None,
+) -> dict:
+    """Runs benchmarks on newly generated synthetic data.
+
+    Args:
+        sizes (Dict[str, int], optional): Sizes overriding those in `DEFAULT_SIZES`. Defaults to None.
+        names (List[str], optional): The benchmarks to run. Defaults to all.
+        repeats (int, optional): The number of timed runs of each. Defaults to 5.
+        folder (Path, optional): The folder for the dataset. Defaults to a temporary folder.
+
+    Returns:
+        dict: The environment, sizes and timings, which can be saved as JSON.
+    """
+    sizes = {**DEFAULT_SIZES, **(sizes or {})}
+    names = names or list(BENCHMARKS)
+    with tempfile.TemporaryDirectory() as temporary_folder:
+        context = BenchmarkContext(Path(folder or temporary_folder), sizes)
+        timings = {
+            name: time_benchmark(BENCHMARKS[name], context, repeats)
+            for name in names
+        }
+        people = len(context.dataset.load(context.years[-1], "person_id"))
+    return dict(
+        environment=get_environment(),
+        sizes=sizes,
+        people=people,
+        benchmarks={
+            name: dict(
+                min=min(times),
+                median=float(np.median(times)),
+                times=times,
+            )
+            for name, times in timings.items()
+        },
+    )
+
+
+def get_environment() -> Dict[str, Any]:
+    """Describes the code and machine benchmarked.
+
+    Returns:
+        Dict[str, Any]: The git commit, Python and package versions and platform.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).parent,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return dict(
+        commit=commit or None,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        packages={
+            package: get_package_version(package)
+            for package in ("openfisca_tools", "openfisca_core", "numpy")
+        },
+    )
+
+
+def compare_results(baseline: dict, results: dict) -> pd.DataFrame:
+    """Compares the minimum time of each benchmark run in both sets of results.
+
+    Args:
+        baseline (dict): The earlier results.
+        results (dict): The new results.
+
+    Raises:
+        ValueError: If the results are of differently sized data.
+
+    Returns:
+        pd.DataFrame: The baseline and new minimum times, and their ratio, by benchmark.
+    """
+    if baseline["sizes"] != results["sizes"]:
+        raise ValueError(
+            f"Results of different sizes can't be compared: {baseline['sizes']} and {results['sizes']}."
+        )
+    names = [
+        name
+        for name in results["benchmarks"]
+        if name in baseline["benchmarks"]
+    ]
+    comparison = pd.DataFrame(
+        dict(
+            baseline=[baseline["benchmarks"][name]["min"] for name in names],
+            new=[results["benchmarks"][name]["min"] for name in names],
+        ),
+        index=pd.Index(names, name="benchmark"),
+    )
+    comparison["ratio"] = comparison.new / comparison.baseline
+    return comparison
+
+
+def main(args: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Time the core hot paths on synthetic data."
+    )
+    for size, default in DEFAULT_SIZES.items():
+        parser.add_argument(
+            f"--{size.replace('_', '-')}", type=int, default=default
+        )
+    parser.add_argument(
+        "--benchmarks", nargs="+", choices=list(BENCHMARKS), default=None
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--output", type=Path, help="A JSON file to save the results to."
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        help="A JSON file of earlier results to compare against.",
+    )
+    parser.add_argument(
+        "--max-slowdown",
+        type=float,
+        default=1.25,
+        help="Fail if any benchmark is this many times slower than in the compared results.",
+    )
+    args = parser.parse_args(args)
+    results = run_benchmarks(
+        {size: getattr(args, size) for size in DEFAULT_SIZES},
+        names=args.benchmarks,
+        repeats=args.repeats,
+    )
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2))
+    table = pd.DataFrame(results["benchmarks"]).T[["min", "median"]]
+    print(f"Sizes: {results['sizes']} ({results['people']} people)")
+    print(table.to_string(float_format="{:.4f}".format))
+    if args.compare is not None:
+        comparison = compare_results(
+            json.loads(args.compare.read_text()), results
+        )
+        print(comparison.to_string(float_format="{:.4f}".format))
+        slower = comparison.index[comparison.ratio > args.max_slowdown]
+        if len(slower) > 0:
+            print(
+                f"Slower than {args.max_slowdown}x the baseline: {', '.join(slower)}"
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -59,7 +59,10 @@ def generate_tests(sim: Microsimulation) -> Callable:
         if "value" in test:
             reform = set_parameter(parameter.name, test["value"])
             reformed = type(sim)(
-                (sim.reform, reform), dataset=sim.dataset, year=sim.year
+                (sim.reform, reform),
+                dataset=sim.dataset,
+                year=sim.year,
+                baseline=sim,
             )
         if "revenue" in test:
             baseline_net_income = sim.calc(
@@ -110,7 +113,10 @@ def generate_tests(sim: Microsimulation) -> Callable:
                     parameter.name, parameter(test["period"]) * 1.01 + 1e-2
                 )
             reformed = type(sim)(
-                (sim.reform, reform), dataset=sim.dataset, year=sim.year
+                (sim.reform, reform),
+                dataset=sim.dataset,
+                year=sim.year,
+                baseline=sim,
             )
             assert (
                 reformed.calc("household_net_income", period=test["period"])
@@ -125,7 +131,10 @@ def generate_tests(sim: Microsimulation) -> Callable:
                     parameter.name, parameter(test["period"]) * 1.01 + 1e-2
                 )
             reformed = type(sim)(
-                (sim.reform, reform), dataset=sim.dataset, year=sim.year
+                (sim.reform, reform),
+                dataset=sim.dataset,
+                year=sim.year,
+                baseline=sim,
             )
             assert (
                 reformed.calc("household_net_income", period=test["period"])
@@ -0,0 +1,475 @@
+"""
+A small synthetic country model and datasets of configurable size, for
+testing and benchmarking without a country package.
+"""
+
+import copy
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List
+import numpy as np
+from openfisca_core.entities import build_entity
+from openfisca_core.model_api import Enum, select
+from openfisca_core.parameters import ParameterNode
+from openfisca_core.taxbenefitsystems import TaxBenefitSystem
+from openfisca_tools.data.dataset import Dataset
+from openfisca_tools.hypothetical import IndividualSim
+from openfisca_tools.microsimulation import Microsimulation
+from openfisca_tools.model_api import *
+from openfisca_tools.parameters import (
+    interpolate_parameters,
+    propagate_parameter_metadata,
+    uprate_parameters,
+)
+
+Person = build_entity(
+    key="person",
+    plural="people",
+    label="Person",
+    is_person=True,
+)
+
+Household = build_entity(
+    key="household",
+    plural="households",
+    label="Household",
+    roles=[dict(key="member", plural="members", label="Member")],
+)
+
+ENTITIES = [Person, Household]
+
+
+class person_id(Variable):
+    value_type = int
+    entity = Person
+    label = "Person ID"
+    definition_period = YEAR
+
+
+class household_id(Variable):
+    value_type = int
+    entity = Household
+    label = "Household ID"
+    definition_period = YEAR
+
+
+class person_household_id(Variable):
+    value_type = int
+    entity = Person
+    label = "Person's household ID"
+    definition_period = YEAR
+
+
+class person_weight(Variable):
+    value_type = float
+    entity = Person
+    label = "Person weight"
+    definition_period = YEAR
+
+    def formula(person, period, parameters):
+        return person.household("household_weight", period)
+
+
+class household_weight(Variable):
+    value_type = float
+    entity = Household
+    label = "Household weight"
+    definition_period = YEAR
+
+
+class age(Variable):
+    value_type = int
+    entity = Person
+    label = "Age"
+    definition_period = YEAR
+
+
+class is_adult(Variable):
+    value_type = bool
+    entity = Person
+    label = "Is an adult"
+    definition_period = YEAR
+
+    def formula(person, period, parameters):
+        return person("age", period) >= 18
+
+
+class AgeGroup(Enum):
+    CHILD = "Child"
+    WORKING_AGE = "Working age"
+    SENIOR = "Senior"
+
+
+class age_group(Variable):
+    value_type = Enum
+    possible_values = AgeGroup
+    default_value = AgeGroup.WORKING_AGE
+    entity = Person
+    label = "Age group"
+    definition_period = YEAR
+
+    def formula(person, period, parameters):
+        age = person("age", period)
+        return select(
+            [age < 18, age < 65],
+            [AgeGroup.CHILD, AgeGroup.WORKING_AGE],
+            AgeGroup.SENIOR,
+        )
+
+
+class TenureType(Enum):
+    OWNER = "Owner"
+    RENTER = "Renter"
+
+
+class tenure_type(Variable):
+    value_type = Enum
+    possible_values = TenureType
+    default_value = TenureType.RENTER
+    entity = Household
+    label = "Tenure type"
+    definition_period = YEAR
+
+
+@uprated("uprating.earnings")
+class employment_income(Variable):
+    value_type = float
+    entity = Person
+    label = "Employment income"
+    definition_period = YEAR
+
+
+class income_tax(Variable):
+    value_type = float
+    entity = Person
+    label = "Income tax"
+    definition_period = YEAR
+
+    def formula(person, period, parameters):
+        tax = parameters(period).tax
+        income = person("employment_income", period)
+        return max_(income - tax.personal_allowance, 0) * tax.rate
+
+
+class household_size(Variable):
+    value_type = int
+    entity = Household
+    label = "Household size"
+    definition_period = YEAR
+
+    def formula(household, period, parameters):
+        return household.nb_persons()
+
+
+class benefit(Variable):
+    value_type = float
+    entity = Household
+    label = "Benefit"
+    definition_period = YEAR
+
+    def formula(household, period, parameters):
+        benefit = parameters(period).benefit
+        income = add(household, period, ["employment_income"])
+        maximum = benefit.amount * household("household_size", period)
+        return max_(maximum - income * benefit.taper, 0)
+
+
+class household_net_income(Variable):
+    value_type = float
+    entity = Household
+    label = "Household net income"
+    definition_period = YEAR
+
+    def formula(household, period, parameters):
+        market_income = add(household, period, ["employment_income"])
+        tax = add(household, period, ["income_tax"])
+        return market_income - tax + household("benefit", period)
+
+
+VARIABLES = [
+    person_id,
+    household_id,
+    person_household_id,
+    person_weight,
+    household_weight,
+    age,
+    is_adult,
+    age_group,
+    tenure_type,
+    employment_income,
+    income_tax,
+    household_size,
+    benefit,
+    household_net_income,
+]
+
+PARAMETERS = {
+    "tax": {
+        "rate": {"values": {"2015-01-01": 0.2}},
+        "personal_allowance": {"values": {"2015-01-01": 10_000}},
+    },
+    "uprating": {
+        "earnings": {
+            "values": {
+                "2015-01-01": 100,
+                "2023-01-01": 105,
+                "2024-01-01": 108,
+                "2025-01-01": 110,
+            }
+        },
+    },
+    "benefit": {
+        "amount": {"values": {"2015-01-01": 1_000}},
+        "taper": {"values": {"2015-01-01": 0.1}},
+    },
+}
+
+
+def synthetic_variables(count: int) -> List[type]:
+    """Generates input variables and formulas depending on them, so that models
+    of any size can be built. Each `synthetic_variable_{i}` adds the input
+    `synthetic_input_{i}` to its parent in a binary tree rooted at employment
+    income, and `synthetic_household_total` sums them all by household.
+
+    Args:
+        count (int): The number of input variables (and of formulas).
+
+    Returns:
+        List[type]: The variable classes.
+    """
+    variables = []
+    for i in range(count):
+        parent = (
+            "employment_income" if i == 0 else f"synthetic_variable_{(i-1)//2}"
+        )
+
+        def formula(person, period, parameters, i=i, parent=parent):
+            rate = parameters(period).tax.rate
+            return person(f"synthetic_input_{i}", period) * rate + person(
+                parent, period
+            )
+
+        variables += [
+            type(
+                f"synthetic_input_{i}",
+                (Variable,),
+                dict(
+                    value_type=float,
+                    entity=Person,
+                    label=f"Synthetic input {i}",
+                    definition_period=YEAR,
+                ),
+            ),
+            type(
+                f"synthetic_variable_{i}",
+                (Variable,),
+                dict(
+                    value_type=float,
+                    entity=Person,
+                    label=f"Synthetic variable {i}",
+                    definition_period=YEAR,
+                    formula=formula,
+                ),
+            ),
+        ]
+    if count > 0:
+        components = [f"synthetic_variable_{i}" for i in range(count)]
+
+        def formula(household, period, parameters):
+            return add(household, period, components)
+
+        variables += [
+            type(
+                "synthetic_household_total",
+                (Variable,),
+                dict(
+                    value_type=float,
+                    entity=Household,
+                    label="Synthetic household total",
+                    definition_period=YEAR,
+                    formula=formula,
+                ),
+            )
+        ]
+    return variables
+
+
+def synthetic_parameters(count: int = 0, years: int = 5) -> dict:
+    """Generates the parameter tree of the synthetic model, with `count`
+    additional parameters to be interpolated and uprated.
+
+    Args:
+        count (int, optional): The number of additional parameters. Defaults to 0.
+        years (int, optional): The number of years each additional parameter is interpolated over, before being uprated. Defaults to 5.
+
+    Returns:
+        dict: The parameter data, to pass to `ParameterNode`.
+    """
+    data = copy.deepcopy(PARAMETERS)
+    if count > 0:
+        data["synthetic"] = {
+            "metadata": {
+                "propagate_metadata_to_children": True,
+                "uprating": "uprating.earnings",
+            },
+            **{
+                f"parameter_{i}": {
+                    "values": {
+                        "2015-01-01": i,
+                        f"{2015 + years}-01-01": 2 * i,
+                    },
+                    "metadata": {"interpolation": {"interval": "year"}},
+                }
+                for i in range(count)
+            },
+        }
+    return data
+
+
+class SyntheticTaxBenefitSystem(TaxBenefitSystem):
+    """The synthetic model, optionally with generated variables and
+    parameters (set by `synthetic_tax_benefit_system_class`)."""
+
+    synthetic_variables: int = 0
+    synthetic_parameters: int = 0
+
+    def __init__(self):
+        super().__init__(ENTITIES)
+        self.add_variables(
+            *VARIABLES, *synthetic_variables(self.synthetic_variables)
+        )
+        root = ParameterNode(
+            data=synthetic_parameters(self.synthetic_parameters)
+        )
+        root = propagate_parameter_metadata(root)
+        root = interpolate_parameters(root)
+        self.parameters = uprate_parameters(root)
+
+
+@lru_cache()
+def synthetic_tax_benefit_system_class(
+    variables: int = 0, parameters: int = 0
+) -> type:
+    """Returns the synthetic tax-benefit system class with generated variables
+    and parameters. The same class is returned for the same sizes, so that
+    caches keyed by the class are shared.
+
+    Args:
+        variables (int, optional): The number of generated input variables (and of formulas). Defaults to 0.
+        parameters (int, optional): The number of generated parameters. Defaults to 0.
+
+    Returns:
+        type: The TaxBenefitSystem subclass.
+    """
+    if variables == 0 and parameters == 0:
+        return SyntheticTaxBenefitSystem
+    return type(
+        f"SyntheticTaxBenefitSystem_{variables}_{parameters}",
+        (SyntheticTaxBenefitSystem,),
+        dict(synthetic_variables=variables, synthetic_parameters=parameters),
+    )
+
+
+class SyntheticDataset(Dataset):
+    """Random households of one to four people, with the inputs of the
+    synthetic model. The same seed always generates the same data."""
+
+    name = "synthetic"
+    label = "Synthetic"
+    data_format = Dataset.ARRAYS
+    households: int = 100
+    synthetic_variables: int = 0
+    seed: int = 0
+
+    def generate(self, year: int):
+        random_state = np.random.RandomState(self.seed)
+        sizes = random_state.randint(1, 5, size=self.households)
+        num_people = sizes.sum()
+        data = dict(
+            person_id=np.arange(num_people),
+            household_id=np.arange(self.households),
+            person_household_id=np.repeat(np.arange(self.households), sizes),
+            household_weight=random_state.uniform(
+                50, 150, size=self.households
+            ),
+            age=random_state.randint(0, 90, size=num_people),
+            employment_income=random_state.lognormal(9.5, 1, size=num_people),
+        )
+        for i in range(self.synthetic_variables):
+            data[f"synthetic_input_{i}"] = random_state.uniform(
+                0, 1_000, size=num_people
+            )
+        # Enum inputs are stored as the indices of their items.
+        data["tenure_type"] = random_state.randint(
+            0, len(TenureType), size=self.households
+        )
+        for key, values in data.items():
+            self.save(year, key, values)
+
+
+def synthetic_dataset(
+    folder: Path,
+    households: int = 100,
+    variables: int = 0,
+    years: Iterable[int] = (2022,),
+    seed: int = 0,
+) -> SyntheticDataset:
+    """Generates a synthetic dataset, saving one file per year.
+
+    Args:
+        folder (Path): The folder to save the dataset in.
+        households (int, optional): The number of households (people number around 2.5 times this). Defaults to 100.
+        variables (int, optional): The number of generated input variables. Defaults to 0.
+        years (Iterable[int], optional): The years to generate. Defaults to (2022,).
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        SyntheticDataset: The dataset.
+    """
+    dataset = type(
+        "SyntheticDataset",
+        (SyntheticDataset,),
+        dict(
+            folder_path=folder,
+            households=households,
+            synthetic_variables=variables,
+            seed=seed,
+        ),
+    )()
+    for year in years:
+        dataset.generate(year)
+    return dataset
+
+
+def synthetic_microsimulation_class(
+    dataset: SyntheticDataset, parameters: int = 0
+) -> type:
+    """Returns a Microsimulation subclass running the synthetic model on a
+    synthetic dataset, including any generated variables the dataset has.
+
+    Args:
+        dataset (SyntheticDataset): The default dataset.
+        parameters (int, optional): The number of generated parameters. Defaults to 0.
+
+    Returns:
+        type: The Microsimulation subclass.
+    """
+    return type(
+        "SyntheticMicrosimulation",
+        (Microsimulation,),
+        dict(
+            tax_benefit_system=synthetic_tax_benefit_system_class(
+                dataset.synthetic_variables, parameters
+            ),
+            entities=ENTITIES,
+            default_dataset=dataset,
+        ),
+    )
+
+
+class SyntheticIndividualSim(IndividualSim):
+    """Hypothetical households in the synthetic model."""
+
+    tax_benefit_system = SyntheticTaxBenefitSystem
+    default_roles = {"household": "member"}
+    required_entities = ["household"]
@@ -0,0 +1,75 @@
+import h5py
+import numpy as np
+from openfisca_tools.data import Dataset
+
+
+def make_dataset(folder_path, data_format=Dataset.ARRAYS) -> Dataset:
+    class ExampleDataset(Dataset):
+        name = "example"
+        label = "Example"
+
+    ExampleDataset.folder_path = folder_path
+    ExampleDataset.data_format = data_format
+    return ExampleDataset()
+
+
+def test_memory_mapped_arrays_are_read_only(tmp_path):
+    """Tests that memory-mapped arrays match the stored arrays and cannot be written to."""
+    dataset = make_dataset(tmp_path)
+    dataset.save(2022, "income", np.arange(10, dtype=float))
+
+    income = dataset.load(2022, memory_map=True)["income"]
+
+    assert type(income) == np.ndarray
+    assert not income.flags.writeable
+    assert (income == np.arange(10)).all()
+
+
+def test_memory_mapped_time_period_arrays(tmp_path):
+    """Tests that time-period arrays are memory-mapped as nested keys, including from `.npy` copies."""
+    dataset = make_dataset(tmp_path, Dataset.TIME_PERIOD_ARRAYS)
+    dataset.save(2022, "income/2021", np.ones(5))
+    dataset.save(2022, "income/2022", np.zeros(5))
+    dataset.save_memory_map(2022)
+    dataset.save(2022, "income/2022", np.full(5, 2.0))
+
+    data = dataset.load(2022, memory_map=True)
+
+    assert set(data["income"].keys()) == {"2021", "2022"}
+    assert (data["income"]["2022"] == 2).all()
+    assert (dataset.load(2022, "income/2021", memory_map=True) == 1).all()
+
+
+def test_compressed_arrays_are_read_on_use(tmp_path):
+    """Tests that datasets which can't be memory-mapped are only read when accessed."""
+    dataset = make_dataset(tmp_path)
+    with h5py.File(dataset.file(2022), "w") as f:
+        f.create_dataset("income", data=np.arange(10.0), compression="gzip")
+
+    data = dataset.load(2022, memory_map=True)
+    assert not isinstance(dict.__getitem__(data, "income"), np.ndarray)
+    income = data["income"]
+    assert (income == np.arange(10)).all()
+    assert not income.flags.writeable
+    assert data["income"] is income
+    assert (dict(data.items())["income"] == np.arange(10)).all()
+
+
+def test_stale_memory_map_is_ignored(tmp_path):
+    """Tests that `.npy` copies are not used once the HDF5 file is rewritten, e.g. by regenerating the dataset."""
+    dataset = make_dataset(tmp_path)
+    dataset.save(2022, "income", np.zeros(5))
+    dataset.save_memory_map(2022)
+    assert dataset.has_memory_map(2022)
+    dataset.save(2022, "income", np.ones(5))
+    assert dataset.has_memory_map(2022)
+    assert (dataset.load(2022, "income", memory_map=True) == 1).all()
+
+    with h5py.File(dataset.file(2022), "w") as f:
+        f.create_dataset("income", data=np.full(5, 2.0))
+
+    assert not dataset.has_memory_map(2022)
+    assert (dataset.load(2022, "income", memory_map=True) == 2).all()
+    dataset.save_memory_map(2022)
+    assert dataset.has_memory_map(2022)
+    assert (dataset.load(2022, "income", memory_map=True) == 2).all()
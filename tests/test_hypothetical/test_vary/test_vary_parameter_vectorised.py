@@ -0,0 +1,75 @@
+import numpy as np
+from openfisca_core.model_api import YEAR, Variable
+from openfisca_tools.testing.synthetic import Person, SyntheticIndividualSim
+
+
+def test_vectorised_parametric_vary():
+    """Tests that varying a parameter in one replicated simulation gives the same results as one simulation per value."""
+
+    def vary(vectorised: bool) -> SyntheticIndividualSim:
+        class Sim(SyntheticIndividualSim):
+            vectorised_parametric_vary = vectorised
+
+        sim = Sim()
+        sim.add_person(name="adult", age=30, employment_income=30_000)
+        sim.add_person(name="child", age=5)
+        sim.vary(parameter="tax.rate", min=0, max=0.5, step=0.1)
+        return sim
+
+    sim, expected = vary(True), vary(False)
+    for kwargs in (
+        dict(var="income_tax"),
+        dict(var="household_net_income"),
+        dict(var="income_tax", target="adult"),
+        dict(var="income_tax", map_to="household"),
+    ):
+        result = sim.calc(**kwargs)
+        assert result.shape[0] == 6
+        assert np.allclose(result, expected.calc(**kwargs))
+    assert sim.vectorised_parametric_vary
+    assert sim.parametric_simulation.persons.count == 12
+    assert sim.calc("income_tax", target="adult")[-1] > 0
+
+
+def test_vectorised_parametric_vary_after_adding_people():
+    """Tests that people added after varying a parameter are included in the results."""
+    sim = SyntheticIndividualSim()
+    sim.add_person(name="adult", age=30, employment_income=30_000)
+    sim.vary(parameter="tax.rate", min=0, max=0.5, step=0.1)
+    assert sim.calc("income_tax").shape == (6, 1)
+    sim.add_person(name="partner", age=30, employment_income=20_000)
+    result = sim.calc("income_tax")
+    assert result.shape == (6, 2)
+    assert sim.calc("income_tax", target="partner")[-1] > 0
+
+
+def test_vectorised_parametric_vary_falls_back_per_variable(caplog):
+    """Tests that a variable whose formula can't take an array of parameter values is calculated per value, without affecting other variables."""
+
+    class high_rate(Variable):
+        value_type = bool
+        entity = Person
+        label = "High tax rate"
+        definition_period = YEAR
+
+        def formula(person, period, parameters):
+            if parameters(period).tax.rate > 0.2:
+                return person("age", period) > 0
+            return person("age", period) < 0
+
+    class Sim(SyntheticIndividualSim):
+        @staticmethod
+        def tax_benefit_system():
+            system = SyntheticIndividualSim.tax_benefit_system()
+            system.add_variable(high_rate)
+            return system
+
+    sim = Sim()
+    sim.add_person(name="adult", age=30, employment_income=30_000)
+    sim.vary(parameter="tax.rate", min=0, max=0.5, step=0.1)
+    assert list(sim.calc("high_rate", target="adult")) == [0, 0, 0, 1, 1, 1]
+    assert "high_rate" in caplog.text
+    assert sim.unvectorised_variables == {"high_rate"}
+    sim.calc("income_tax")
+    assert sim.unvectorised_variables == {"high_rate"}
+    assert sim.parametric_simulation.get_array("income_tax", 2022) is not None
@@ -0,0 +1,14 @@
+"""
+A small synthetic country model and dataset for microsimulation tests.
+"""
+
+import pytest
+from openfisca_tools.testing.synthetic import (
+    synthetic_dataset,
+    synthetic_microsimulation_class,
+)
+
+
+@pytest.fixture
+def microsimulation_class(tmp_path) -> type:
+    return synthetic_microsimulation_class(synthetic_dataset(tmp_path))
@@ -0,0 +1,30 @@
+import numpy as np
+
+
+def test_aggregate_matches_microseries(microsimulation_class):
+    """Tests that dot-product aggregates agree with weighted MicroSeries results."""
+    sim = microsimulation_class()
+    variables = ["income_tax", "benefit", "household_net_income"]
+    totals = sim.aggregate(variables)
+    means = sim.aggregate(variables, how="mean")
+    recipients = sim.aggregate(["benefit"], how="count")["benefit"]
+    share = sim.aggregate(
+        ["employment_income"], how="share_above", threshold=10_000
+    )["employment_income"]
+
+    for variable in variables:
+        assert np.isclose(totals[variable], sim.calc(variable).sum())
+        assert np.isclose(means[variable], sim.calc(variable).mean())
+    assert np.isclose(recipients, (sim.calc("benefit") > 0).sum())
+    income = sim.calc("employment_income")
+    assert np.isclose(share, (income > 10_000).sum() / income.count())
+
+
+def test_weights_cached_until_inputs_change(microsimulation_class):
+    """Tests that weights are reused between calls and refreshed after set_input."""
+    sim = microsimulation_class()
+    weights = sim.weights("person")
+
+    assert sim.weights("person") is weights
+    sim.set_input("person_weight", 2022, weights * 2)
+    assert np.allclose(sim.weights("person"), weights * 2)
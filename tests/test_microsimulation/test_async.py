@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import numpy as np
+from openfisca_tools.concurrency import CalculationCancelled
+from openfisca_tools.reforms import set_parameter
+from openfisca_tools.testing.synthetic import SyntheticIndividualSim
+
+
+def test_concurrent_calls_are_coalesced(microsimulation_class):
+    """Tests that identical concurrent calls share one calculation, and others give the same results as blocking calls."""
+    sim = microsimulation_class()
+    calc = sim.calc
+    calls = []
+
+    def counted_calc(*args, **kwargs):
+        calls.append(args)
+        return calc(*args, **kwargs)
+
+    sim.calc = counted_calc
+
+    async def main():
+        return await asyncio.gather(
+            *[sim.acalc("household_net_income") for _ in range(5)],
+            sim.adf(["income_tax", "benefit"], map_to="household"),
+            sim.aaggregate(["income_tax"]),
+        )
+
+    *incomes, df, aggregates = asyncio.run(main())
+    assert calls.count(("household_net_income",)) == 1
+    assert all(income is incomes[0] for income in incomes)
+    expected = microsimulation_class()
+    assert np.allclose(
+        incomes[0].values, expected.calc("household_net_income").values
+    )
+    assert np.allclose(
+        df.income_tax.values,
+        expected.calc("income_tax", map_to="household").values,
+    )
+    assert aggregates == expected.aggregate(["income_tax"])
+
+
+def test_cancelled_calls_stop(microsimulation_class):
+    """Tests that a calculation stops once all its callers are cancelled."""
+    sim = microsimulation_class()
+    calc = sim.calc
+    started, release, finished = (threading.Event() for _ in range(3))
+
+    def blocking_calc(*args, **kwargs):
+        started.set()
+        release.wait()
+        try:
+            return calc(*args, **kwargs)
+        finally:
+            finished.set()
+
+    sim.calc = blocking_calc
+
+    async def main():
+        task = asyncio.ensure_future(sim.acalc("household_net_income"))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        release.set()
+        return task
+
+    assert asyncio.run(main()).cancelled()
+    finished.wait(10)
+    holder = sim.simulation.get_holder("household_net_income")
+    assert holder.get_array(2022) is None
+    del sim.calc
+    assert asyncio.run(sim.acalc("household_net_income")).sum() > 0
+
+
+def test_individual_sim_acalc():
+    """Tests that awaiting an individual simulation's calculation gives the blocking result."""
+    sim = SyntheticIndividualSim()
+    sim.add_person(name="adult", age=30, employment_income=20_000)
+    assert asyncio.run(sim.acalc("income_tax"))[0] == sim.calc("income_tax")[0]
+
+
+def test_cancelled_individual_sim_reform_calls_stop():
+    """Tests that a cancelled calculation stops in the simulation an individual simulation rebuilds for a reform."""
+    sim = SyntheticIndividualSim()
+    sim.add_person(name="adult", age=30, employment_income=20_000)
+    calc = sim.calc
+    started, release, finished = (threading.Event() for _ in range(3))
+    errors = []
+
+    def blocking_calc(*args, **kwargs):
+        started.set()
+        release.wait()
+        try:
+            return calc(*args, **kwargs)
+        except Exception as e:
+            errors.append(e)
+            raise
+        finally:
+            finished.set()
+
+    sim.calc = blocking_calc
+    reform = set_parameter("tax.rate", 0.5, "year:2022:10")
+
+    async def main():
+        task = asyncio.ensure_future(sim.acalc("income_tax", reform=reform))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        release.set()
+        return task
+
+    assert asyncio.run(main()).cancelled()
+    finished.wait(10)
+    assert isinstance(errors[0], CalculationCancelled)
+    assert sim.simulation.get_holder("income_tax").get_array(2022) is None
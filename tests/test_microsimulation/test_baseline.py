@@ -0,0 +1,50 @@
+import numpy as np
+from openfisca_tools.dependencies import DependencyTracer
+from openfisca_tools.reforms import set_parameter
+
+
+def test_reform_reuses_unaffected_baseline_results(microsimulation_class):
+    """Tests that a reform built from a baseline reuses exactly the results the reform cannot change."""
+    baseline = microsimulation_class()
+    reform = set_parameter("tax.rate", 0.3)
+    reformed = microsimulation_class(reform, baseline=baseline)
+    independent = microsimulation_class(reform)
+
+    assert np.allclose(
+        reformed.calc("household_net_income").values,
+        independent.calc("household_net_income").values,
+    )
+    # Only the untaxed parts of the calculation are shared.
+    assert reformed.simulation.get_array(
+        "benefit", 2022
+    ) is baseline.simulation.get_array("benefit", 2022)
+    assert reformed.simulation.get_array(
+        "income_tax", 2022
+    ) is not baseline.simulation.get_array("income_tax", 2022)
+    assert (
+        reformed.calc("income_tax").sum() > baseline.calc("income_tax").sum()
+    )
+
+
+def test_reform_recomputes_after_input_change(microsimulation_class):
+    """Tests that inputs overwritten on the reform simulation are not read from the baseline."""
+    baseline = microsimulation_class()
+    reformed = microsimulation_class(baseline=baseline)
+    income = reformed.calc("employment_income", weighted=False)
+    reformed.set_input("employment_income", 2022, income + 1_000)
+
+    assert (
+        reformed.calc("income_tax").sum() > baseline.calc("income_tax").sum()
+    )
+
+
+def test_circular_dependencies_are_not_memoised_early():
+    """Tests that calculations in a cycle are not remembered as unaffected while the cycle is still being checked."""
+    tracer = DependencyTracer()
+    first, second, changed = (("a", 2022), ("b", 2022), ("c", 2022))
+    # The cycle is entered through `first`, and `second` checked before `changed`.
+    tracer.variables = {first: [second, changed], second: [first], changed: []}
+    tracer.parameters = {first: set(), second: set(), changed: set()}
+    memo = {}
+    assert tracer.depends_on(first, {"c"}, set(), memo)
+    assert tracer.depends_on(second, {"c"}, set(), memo)
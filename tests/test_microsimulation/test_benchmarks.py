@@ -0,0 +1,41 @@
+import json
+import pytest
+from openfisca_tools.testing.benchmarks import (
+    BENCHMARKS,
+    compare_results,
+    main,
+    run_benchmarks,
+)
+
+SIZES = dict(households=50, variables=3, parameters=5, vary_points=11)
+
+
+def test_benchmarks_run_on_synthetic_data(tmp_path):
+    """Tests that every benchmark runs on a small synthetic model and reports serialisable timings."""
+    results = run_benchmarks(SIZES, repeats=2, folder=tmp_path)
+    assert set(results["benchmarks"]) == set(BENCHMARKS)
+    for timing in results["benchmarks"].values():
+        assert len(timing["times"]) == 2
+        assert 0 < timing["min"] <= timing["median"]
+    assert results["sizes"]["households"] == 50
+    assert results["people"] > 50
+    json.dumps(results)
+
+
+def test_benchmark_comparison_fails_on_slowdown(tmp_path):
+    """Tests that comparing against a faster baseline, or one with other sizes, fails."""
+    baseline = run_benchmarks(SIZES, names=["map_to"], repeats=1)
+    comparison = compare_results(baseline, baseline)
+    assert comparison.ratio["map_to"] == 1
+    with pytest.raises(ValueError):
+        compare_results(baseline, {**baseline, "sizes": {}})
+
+    baseline["benchmarks"]["map_to"]["min"] = 1e-12
+    baseline_file = tmp_path / "baseline.json"
+    baseline_file.write_text(json.dumps(baseline))
+    arguments = [
+        f"--{size.replace('_', '-')}={value}"
+        for size, value in baseline["sizes"].items()
+    ]
+    arguments += ["--benchmarks", "map_to", "--repeats", "1"]
+    assert main(arguments + ["--compare", str(baseline_file)]) == 1
@@ -0,0 +1,36 @@
+def test_bonus_sims_evicted_within_memory_budget(microsimulation_class):
+    """Tests that derivative simulations are evicted least-recently-used first, and that clearing them is not counted as use."""
+
+    class LimitedMicrosimulation(microsimulation_class):
+        bonus_sims_max_memory = 1
+
+    sim = LimitedMicrosimulation()
+    sim.deriv("income_tax", "employment_income", delta=100)
+    sim.deriv("income_tax", "employment_income", delta=100)
+    sim.deriv("income_tax", "employment_income", delta=200)
+
+    assert sim.bonus_sims.stats["hits"] == 1
+    assert sim.bonus_sims.stats["misses"] == 2
+    assert sim.bonus_sims.stats["evictions"] == 1
+    assert list(sim.bonus_sims) == [
+        ("employment_income", 200, False, "same-entity")
+    ]
+    list(sim.bonus_sims.values())
+    sim.set_input("age", 2022, sim.calc("age").values)
+    assert len(sim.bonus_sims) == 0
+    assert sim.bonus_sims.stats["hits"] == 1
+    assert sim.bonus_sims.stats["evictions"] == 1
+
+
+def test_bonus_sim_memory_excludes_baseline_arrays(microsimulation_class):
+    """Tests that arrays reused from the parent simulation are not counted."""
+    sim = microsimulation_class()
+    sim.deriv("income_tax", "employment_income")
+    bonus_sim = list(sim.bonus_sims.values())[0]
+    changed = [
+        bonus_sim.simulation.get_array(variable, 2022)
+        for variable in ("employment_income", "income_tax")
+    ]
+
+    assert bonus_sim.memory_usage() == sum(array.nbytes for array in changed)
+    assert sim.bonus_sims.memory_usage() == bonus_sim.memory_usage()
@@ -0,0 +1,22 @@
+import numpy as np
+from openfisca_tools.reforms import abolish, set_parameter
+
+
+def test_cached_system_is_not_modified_by_reforms(microsimulation_class):
+    """Tests that reforms applied to clones of a cached tax-benefit system do not leak into later simulations."""
+    microsimulation_class.cache_tax_benefit_system = True
+    baseline = microsimulation_class()
+    reformed = microsimulation_class(
+        (set_parameter("tax.rate", 0.5), abolish("benefit"))
+    )
+    later = microsimulation_class()
+
+    assert later.system.parameters is baseline.system.parameters
+    assert later.system.parameters.tax.rate("2022-01-01") == 0.2
+    assert reformed.system.parameters.tax.rate("2022-01-01") == 0.5
+    assert later.calc("benefit").sum() > 0
+    assert reformed.calc("benefit").sum() == 0
+    assert np.allclose(
+        later.calc("household_net_income").values,
+        baseline.calc("household_net_income").values,
+    )
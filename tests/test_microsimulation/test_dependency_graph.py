@@ -0,0 +1,49 @@
+import numpy as np
+from openfisca_tools.dependencies import VariableGraph
+from openfisca_tools.testing.synthetic import (
+    synthetic_tax_benefit_system_class,
+)
+
+
+def test_static_dependencies():
+    """Tests that dependencies are found from formulas, including lists of variables and parameter reads."""
+    graph = VariableGraph(synthetic_tax_benefit_system_class(variables=3)())
+    assert graph.variables["income_tax"] == {"employment_income"}
+    assert graph.variables["synthetic_household_total"] == {
+        f"synthetic_variable_{i}" for i in range(3)
+    }
+    assert graph.upstream(["synthetic_variable_2"]) == {
+        "synthetic_variable_0",
+        "employment_income",
+    }
+    assert graph.downstream(["age"]) == {"is_adult", "age_group"}
+    assert {"tax.rate", "tax.personal_allowance"} <= graph.parameter_reads(
+        ["income_tax"]
+    )
+    assert graph.inputs(
+        ["household_net_income"],
+        available={"employment_income", "household_size", "age"},
+    ) == {"employment_income", "household_size"}
+
+
+def test_output_variables_prune_inputs(microsimulation_class):
+    """Tests that only inputs needed for the output variables are set on loading, and others on use."""
+
+    class PrunedMicrosimulation(microsimulation_class):
+        output_variables = ["income_tax"]
+
+    sim = PrunedMicrosimulation()
+    assert "age" in sim.pending_inputs
+    assert "employment_income" not in sim.pending_inputs
+    assert "household_weight" not in sim.pending_inputs
+    assert np.allclose(
+        sim.calc("income_tax").values,
+        microsimulation_class().calc("income_tax").values,
+    )
+    assert np.array_equal(
+        sim.calc("age").values, microsimulation_class().calc("age").values
+    )
+
+    sim.calc("household_net_income")
+    graph = sim.dependency_graph()
+    assert "benefit" in graph.variables["household_net_income"]
@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def test_deriv_same_entity(microsimulation_class):
+    """Tests marginal tax rates calculated from a clone recalculating only downstream variables."""
+    sim = microsimulation_class()
+    rates = sim.deriv("income_tax", "employment_income").values
+    income = sim.calc("employment_income", weighted=False)
+
+    assert np.allclose(rates[income > 10_000], 0.2, atol=1e-3)
+    assert np.allclose(rates[income < 9_900], 0)
+    bonus_sim = list(sim.bonus_sims.values())[0]
+    assert bonus_sim.simulation.get_array(
+        "household_size", 2022
+    ) is sim.simulation.get_array("household_size", 2022)
+
+
+def test_deriv_group_entity(microsimulation_class):
+    """Tests per-person marginal effects on a household variable."""
+    sim = microsimulation_class()
+    rates = sim.deriv("household_net_income", "employment_income").values
+    sizes = sim.calc("household_size", map_to="person", weighted=False)
+    income = sim.calc("employment_income", weighted=False)
+
+    # Single people receiving no benefit keep 80% of extra income above the allowance
+    benefit = sim.calc("benefit", map_to="person", weighted=False)
+    single_taxpayers = (sizes == 1) & (income > 10_000) & (benefit == 0)
+    assert single_taxpayers.any()
+    assert np.allclose(rates[single_taxpayers], 0.8, atol=1e-3)
@@ -0,0 +1,26 @@
+import numpy as np
+
+
+def test_df_matches_individual_calculations(microsimulation_class):
+    """Tests that batched columns equal mapping each variable separately."""
+    sim = microsimulation_class()
+    variables = [
+        "employment_income",
+        "is_adult",
+        "income_tax",
+        "benefit",
+        "household_net_income",
+    ]
+    df = sim.df(variables, map_to="household")
+
+    assert list(df.columns) == variables
+    assert np.allclose(df.weights, sim.calc("household_weight").values)
+    for variable in variables:
+        assert np.allclose(
+            df[variable].values,
+            sim.calc(variable, map_to="household").values,
+        )
+    assert np.allclose(
+        sim.df(["age"], map_to="household", how="max").age.values,
+        sim.calc("age", map_to="household", how="max").values,
+    )
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def test_enum_results_are_categorical(microsimulation_class):
+    """Tests that Enum results are categoricals sharing OpenFisca's codes."""
+    sim = microsimulation_class()
+    age_group = sim.calc("age_group", weighted=False)
+    codes = sim.simulation.calculate("age_group", 2022)
+
+    assert isinstance(age_group, pd.Categorical)
+    assert list(age_group.categories) == ["CHILD", "WORKING_AGE", "SENIOR"]
+    assert np.array_equal(age_group.codes, codes)
+    assert np.array_equal(
+        age_group == "CHILD", sim.calc("age", weighted=False) < 18
+    )
+    weighted = sim.calc("age_group")
+    seniors = sim.calc("age", weighted=False) >= 65
+    assert np.isclose(
+        (weighted == "SENIOR").sum(), sim.weights("person")[seniors].sum()
+    )
+    tenure = sim.calc("tenure_type", map_to="person", weighted=False)
+    assert np.array_equal(
+        tenure,
+        np.asarray(sim.calc("tenure_type", weighted=False))[
+            sim.membership["household"].group_index
+        ],
+    )
+
+    class StringEnumMicrosimulation(microsimulation_class):
+        categorical_enums = False
+
+    strings = StringEnumMicrosimulation().calc("age_group", weighted=False)
+    assert np.array_equal(strings, np.asarray(age_group).astype(str))
+
+
+def test_enum_inputs(microsimulation_class):
+    """Tests that Enum inputs can be codes, names, Enum items or categoricals, and that invalid codes are rejected."""
+    sim = microsimulation_class()
+    stored = sim.calc("tenure_type", weighted=False)
+    assert set(stored.categories) == {"OWNER", "RENTER"}
+    assert (stored == "OWNER").any() and (stored == "RENTER").any()
+
+    names = np.where(stored == "OWNER", "RENTER", "OWNER")
+    tenure_type = sim.system.variables["tenure_type"].possible_values
+    codes = (names == "RENTER").astype(float)
+    for values in (
+        names,
+        names.astype(bytes),
+        names.astype(object),
+        pd.Series(names, dtype=object),
+        pd.Categorical(names),
+        np.array([tenure_type[name] for name in names], dtype=object),
+        codes,
+    ):
+        sim.set_input("tenure_type", 2022, values)
+        assert np.array_equal(sim.calc("tenure_type", weighted=False), names)
+    for values in (codes + 1, codes - 1, codes / 2):
+        with pytest.raises(ValueError):
+            sim.set_input("tenure_type", 2022, values)
@@ -0,0 +1,31 @@
+import numpy as np
+
+
+def test_set_input_recalculates_only_dependents(microsimulation_class):
+    """Tests that changing an input on a live simulation invalidates only the results depending on it."""
+    sim = microsimulation_class()
+    sim.calc("household_net_income")
+    sim.calc("is_adult")
+    next_year_income = sim.calc("employment_income", period=2023).values
+    holder = sim.simulation.get_holder
+    is_adult = holder("is_adult").get_array(2022)
+
+    income = sim.calc("employment_income").values * 1.1
+    sim.set_input("employment_income", 2022, income)
+
+    assert holder("is_adult").get_array(2022) is is_adult
+    assert holder("household_size").get_array(2022) is not None
+    assert holder("income_tax").get_array(2022) is None
+    assert holder("household_net_income").get_array(2022) is None
+    assert holder("employment_income").get_array(2023) is None
+
+    expected = microsimulation_class()
+    expected.set_input("employment_income", 2022, income)
+    assert np.allclose(
+        sim.calc("household_net_income").values,
+        expected.calc("household_net_income").values,
+    )
+    assert np.allclose(
+        sim.calc("employment_income", period=2023).values,
+        next_year_income * 1.1,
+    )
@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def test_lazy_inputs_are_only_read_when_used(microsimulation_class):
+    """Tests that lazily-loaded inputs are only set when a calculation needs them."""
+    eager = microsimulation_class()
+    microsimulation_class.lazy_inputs = True
+    lazy = microsimulation_class()
+
+    assert lazy.simulation.get_array("age", 2022) is None
+    lazy.calc("is_adult")
+    assert lazy.simulation.get_array("age", 2022) is not None
+    assert "employment_income" in lazy.pending_inputs
+    assert np.allclose(
+        lazy.calc("household_net_income").values,
+        eager.calc("household_net_income").values,
+    )
+    assert "employment_income" not in lazy.pending_inputs
+
+
+def test_lazy_inputs_are_overridden_by_set_input(microsimulation_class):
+    """Tests that inputs set explicitly, for a period given in any form, are not replaced by the dataset's values."""
+    microsimulation_class.lazy_inputs = True
+    microsimulation_class.memory_map = True
+    for period in (2022, "2022", "year:2022"):
+        sim = microsimulation_class()
+        sim.set_input("age", period, np.full(sim.simulation.person.count, 30))
+        assert sim.calc("is_adult").all()
+        assert not sim.pending_inputs.get("age")
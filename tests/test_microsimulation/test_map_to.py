@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from openfisca_tools.membership import MembershipIndex
+
+
+def test_map_to_matches_openfisca_populations(microsimulation_class):
+    """Tests that indexed mapping agrees with OpenFisca's population methods."""
+    sim = microsimulation_class()
+    household = sim.simulation.populations["household"]
+    income = sim.calc("employment_income", weighted=False)
+    adult = sim.calc("is_adult", weighted=False)
+    net_income = sim.calc("household_net_income", weighted=False)
+
+    for how in ("sum", "min", "max", "value_from_first_person"):
+        assert np.allclose(
+            sim.map_to(income, "person", "household", how=how),
+            getattr(household, how)(income),
+        )
+    for how in ("any", "all"):
+        assert (
+            sim.map_to(adult, "person", "household", how=how)
+            == getattr(household, how)(adult)
+        ).all()
+    # Values of opposite signs don't cancel out (as they do in OpenFisca's `any`).
+    signed = np.where(np.arange(len(income)) % 2 == 0, -1.0, 1.0)
+    assert sim.map_to(signed, "person", "household", how="any").all()
+    assert np.allclose(
+        sim.map_to(net_income, "household", "person"),
+        household.project(net_income),
+    )
+    assert np.allclose(
+        sim.map_to(net_income, "household", "person", how="mean"),
+        household.project(net_income / household.nb_persons()),
+    )
+    with pytest.raises(ValueError):
+        sim.map_to(income, "person", "household", how="median")
+
+
+def test_value_from_first_person_uses_positions(microsimulation_class):
+    """Tests that the first person of a group is the member at position 0, not the first in person order."""
+    sim = microsimulation_class()
+    household = sim.simulation.populations["household"]
+    income = sim.calc("employment_income", weighted=False)
+    sizes = np.bincount(household.members_entity_id)
+    # Reverse the order of members within each household.
+    household.members_position = (
+        sizes[household.members_entity_id] - 1 - household.members_position
+    )
+    household._ordered_members_map = None
+    index = MembershipIndex(household)
+    first = index.aggregate(income, "value_from_first_person")
+
+    assert np.allclose(first, household.value_from_first_person(income))
+    assert not np.allclose(
+        first,
+        sim.map_to(
+            income, "person", "household", how="value_from_first_person"
+        ),
+    )
@@ -0,0 +1,15 @@
+import numpy as np
+
+
+def test_memory_mapped_inputs_are_not_copied(microsimulation_class):
+    """Tests that memory-mapped inputs of the right dtype are passed to the simulation without copying."""
+    dataset = microsimulation_class.default_dataset
+    income = dataset.load(2022, "employment_income")
+    dataset.save(2022, "employment_income", income.astype(np.float32))
+    microsimulation_class.memory_map = True
+    sim = microsimulation_class()
+
+    income = sim.simulation.get_array("employment_income", 2022)
+    assert isinstance(income.base, np.memmap)
+    assert not income.flags.writeable
+    assert sim.calc("income_tax").sum() > 0
@@ -0,0 +1,79 @@
+import numpy as np
+from openfisca_core.reforms import Reform
+from openfisca_tools.pool import _worker
+from openfisca_tools.reforms import set_parameter
+
+
+class redefine_employment_income(Reform):
+    def apply(self):
+        self.update_variable(type(self.variables["employment_income"]))
+
+
+def test_warm_pool_matches_separate_simulations(microsimulation_class):
+    """Tests that reforms evaluated in workers forked from a warm baseline give the same results as fresh simulations."""
+    with microsimulation_class.warm_pool(
+        variables=["household_net_income"],
+        metrics=dict(mean_benefit=lambda sim: sim.calc("benefit").mean()),
+        processes=2,
+    ) as pool:
+        results = pool.map(
+            {rate: {"tax.rate": rate} for rate in (0.1, 0.3)},
+            ["income_tax", "mean_benefit"],
+        )
+        single = pool.evaluate({"tax.rate": 0.3}, ["household_net_income"])
+
+    totals = results[results.output == "income_tax"].set_index("reform").value
+    for rate in (0.1, 0.3):
+        sim = microsimulation_class(set_parameter("tax.rate", rate))
+        assert np.isclose(totals[rate], sim.calc("income_tax").sum())
+    assert np.isclose(
+        single["household_net_income"],
+        sim.calc("household_net_income").sum(),
+    )
+    assert results[results.output == "mean_benefit"].value.nunique() == 1
+
+
+def test_reformed_clone_shares_inputs(microsimulation_class):
+    """Tests that a reformed clone matches a fresh reformed simulation while sharing the baseline's inputs."""
+    baseline = microsimulation_class()
+    baseline.calc("household_net_income")
+    reform = set_parameter("tax.rate", 0.4)
+    sim = baseline.clone(reform)
+    assert np.allclose(
+        sim.calc("household_net_income").values,
+        microsimulation_class(reform).calc("household_net_income").values,
+    )
+    assert np.allclose(
+        baseline.calc("income_tax").values * 2, sim.calc("income_tax").values
+    )
+    assert np.shares_memory(
+        sim.calc("age").values, baseline.calc("age").values
+    )
+
+
+def test_clone_keeps_inputs_of_reformed_variables(microsimulation_class):
+    """Tests that a clone whose reform redefines an input variable keeps the variable's inputs."""
+    reform = redefine_employment_income
+    expected = microsimulation_class(reform).calc("household_net_income")
+    for lazy in (False, True):
+
+        class LazyMicrosimulation(microsimulation_class):
+            lazy_inputs = lazy
+
+        sim = LazyMicrosimulation().clone(reform)
+        assert "employment_income" in sim.changed_variables
+        assert np.allclose(
+            sim.calc("household_net_income").values, expected.values
+        )
+    with microsimulation_class.warm_pool(processes=2) as pool:
+        result = pool.evaluate(reform, ["household_net_income"])
+    assert np.isclose(result["household_net_income"], expected.sum())
+
+
+def test_closed_pool_releases_baseline(microsimulation_class):
+    """Tests that closing a pool stops keeping its baseline alive."""
+    for processes in (1, 2):
+        with microsimulation_class.warm_pool(processes=processes) as pool:
+            assert _worker["baseline"] is pool.baseline
+            pool.evaluate({"tax.rate": 0.3}, ["income_tax"])
+        assert _worker == {}
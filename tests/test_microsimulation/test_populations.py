@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from openfisca_core.simulation_builder import SimulationBuilder
+from openfisca_tools.populations import build_populations
+from openfisca_tools.testing.synthetic import SyntheticTaxBenefitSystem
+
+
+def test_populations_match_simulation_builder():
+    """Tests that populations built from arrays match those of SimulationBuilder, with unsorted IDs."""
+    system = SyntheticTaxBenefitSystem()
+    household_ids = np.array([30, 10, 20])
+    person_ids = np.arange(6)
+    person_household_ids = np.array([20, 30, 20, 10, 30, 20])
+    builder = SimulationBuilder()
+    builder.create_entities(system)
+    builder.declare_person_entity("person", person_ids)
+    households = builder.declare_entity("household", household_ids)
+    builder.join_with_persons(
+        households, person_household_ids, np.array(["member"] * 6)
+    )
+    expected = builder.build(system).populations["household"]
+
+    populations = build_populations(
+        system,
+        dict(person=person_ids, household=household_ids),
+        dict(household=person_household_ids),
+        roles=dict(household=np.zeros(6, dtype=int)),
+    )
+    households = populations["household"]
+    assert np.array_equal(
+        households.members_entity_id, expected.members_entity_id
+    )
+    assert np.array_equal(
+        households.members_position, expected.members_position
+    )
+    assert np.all(households.members_role == expected.members_role)
+
+    given_positions = build_populations(
+        system,
+        dict(person=person_ids, household=household_ids),
+        dict(household=person_household_ids),
+        positions=dict(household=expected.members_position),
+    )["household"]
+    assert given_positions.members_position is expected.members_position
+
+
+def test_invalid_populations():
+    system = SyntheticTaxBenefitSystem()
+    ids = dict(person=np.arange(3), household=np.array([1, 2]))
+    with pytest.raises(ValueError):
+        build_populations(system, ids, dict(household=np.array([1, 2, 3])))
+    with pytest.raises(ValueError):
+        build_populations(
+            system,
+            dict(person=np.arange(3), household=np.array([2, 1, 2])),
+            dict(household=np.array([1, 2, 2])),
+        )
+    with pytest.raises(ValueError):
+        build_populations(
+            system,
+            ids,
+            dict(household=np.array([1, 2, 2])),
+            roles=dict(household=np.array(["member", "head", "member"])),
+        )
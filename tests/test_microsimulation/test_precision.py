@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+
+def test_single_precision(microsimulation_class):
+    """Tests that single precision narrows floats and indices, except for overridden variables."""
+
+    class SinglePrecisionMicrosimulation(microsimulation_class):
+        precision = "single"
+        precision_overrides = dict(household_net_income=np.float64)
+
+    default = microsimulation_class()
+    sim = SinglePrecisionMicrosimulation()
+    holder = sim.simulation.get_holder
+
+    assert sim.calc("employment_income").values.dtype == np.float32
+    assert sim.calc("income_tax").values.dtype == np.float32
+    assert sim.calc("household_net_income").values.dtype == np.float64
+    assert holder("employment_income").get_array(2022).dtype == np.float32
+    assert sim.simulation.persons.ids.dtype == np.int32
+    household = sim.membership["household"]
+    assert household.group_index.dtype == np.int32
+    assert household.order.dtype == np.int32
+    assert np.allclose(
+        sim.calc("household_net_income").values,
+        default.calc("household_net_income").values,
+        rtol=1e-6,
+    )
+    assert sim.aggregate(["income_tax"])["income_tax"] == pytest.approx(
+        default.aggregate(["income_tax"])["income_tax"], rel=1e-6
+    )
+    # Other simulations keep the default dtype.
+    assert default.calc("household_net_income").values.dtype == np.float32
+
+
+def test_double_precision(microsimulation_class):
+    """Tests that double precision stores floats as 64-bit, and can't be mixed with a baseline of another precision."""
+
+    class DoublePrecisionMicrosimulation(microsimulation_class):
+        precision = "double"
+
+    sim = DoublePrecisionMicrosimulation()
+    assert sim.calc("income_tax").values.dtype == np.float64
+    assert sim.calc("age").values.dtype == np.int32
+    with pytest.raises(ValueError):
+        microsimulation_class(baseline=sim)
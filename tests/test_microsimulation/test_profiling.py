@@ -0,0 +1,25 @@
+def test_profiler_records_variables_and_sections(
+    microsimulation_class, tmp_path
+):
+    """Tests that calculations and aggregation sections are timed and exported."""
+
+    class ProfiledMicrosimulation(microsimulation_class):
+        profiling = True
+        profile_memory = True
+
+    sim = ProfiledMicrosimulation()
+    sim.calc("household_net_income")
+    sim.profiler.close()
+    table = sim.profiler.to_dataframe().set_index("variable")
+
+    assert table.calls["income_tax"] == 1
+    assert table.nbytes["income_tax"] == sim.calc("income_tax").values.nbytes
+    assert table.peak_memory["income_tax"] > 0
+    assert "household_net_income [for_each_variable]" in table.index
+    assert (table.time >= table.self_time).all()
+    sim.profiler.save_folded_stacks(tmp_path / "profile.folded")
+    stacks = (tmp_path / "profile.folded").read_text()
+    assert (
+        "household_net_income@2022;household_net_income [for_each_variable]@2022;income_tax@2022 "
+        in stacks
+    )
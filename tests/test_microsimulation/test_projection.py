@@ -0,0 +1,32 @@
+import numpy as np
+
+
+def test_uprating_in_closed_form(microsimulation_class):
+    """Tests that uprated inputs skip the years between their input and the requested year."""
+    sim = microsimulation_class()
+    income = sim.calc("employment_income", 2022, weighted=False)
+    projected = sim.calc("employment_income", 2025, weighted=False)
+
+    assert np.allclose(projected, income * 1.1)
+    assert sim.simulation.get_array("employment_income", 2024) is None
+    assert np.allclose(
+        sim.calc("household_weight", 2025), sim.calc("household_weight", 2022)
+    )
+
+
+def test_project(microsimulation_class):
+    """Tests that projected totals match calculating each year separately."""
+    results = microsimulation_class().project(
+        ["employment_income", "income_tax"], 2022, 2025
+    )
+
+    assert list(results.index) == [2022, 2023, 2024, 2025]
+    for year in results.index:
+        sim = microsimulation_class()
+        assert np.isclose(
+            results.income_tax[year], sim.calc("income_tax", year).sum()
+        )
+    assert np.isclose(
+        results.employment_income[2024] / results.employment_income[2022],
+        1.08,
+    )
@@ -0,0 +1,152 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+import numpy as np
+from openfisca_tools.reforms import set_parameter
+from openfisca_core.reforms import Reform
+import openfisca_tools
+from openfisca_tools.cache import fingerprint_function
+
+
+def test_results_persist_between_simulations(microsimulation_class, tmp_path):
+    """Tests that a new simulation reads results stored by an earlier one with the same reform."""
+
+    class CachedMicrosimulation(microsimulation_class):
+        result_cache_folder = tmp_path / "results"
+
+    first = CachedMicrosimulation().calc("household_net_income").values
+    second = CachedMicrosimulation()
+    reformed = CachedMicrosimulation(set_parameter("tax.rate", 0.3))
+
+    assert np.array_equal(second.calc("household_net_income").values, first)
+    assert second.result_cache.hits == 1
+    assert second.simulation.get_array("income_tax", 2022) is None
+    assert reformed.result_cache_key() != second.result_cache_key()
+    assert not np.array_equal(
+        reformed.calc("household_net_income").values, first
+    )
+
+
+def test_result_cache_eviction(microsimulation_class, tmp_path):
+    """Tests that the least recently used results are removed beyond the size limit."""
+
+    class CachedMicrosimulation(microsimulation_class):
+        result_cache_folder = tmp_path / "results"
+        result_cache_max_size = 1_000
+
+    sim = CachedMicrosimulation()
+    sim.calc("income_tax")
+    sim.calc("benefit")
+
+    assert sim.result_cache.evictions > 0
+    assert sim.result_cache.size() <= 1_000
+
+
+def test_result_cache_key_covers_post_reform(microsimulation_class, tmp_path):
+    """Tests that variables redefined by `post_reform` change the result cache key."""
+    variable = type(microsimulation_class().system.variables["income_tax"])
+
+    class double_income_tax(Reform):
+        def apply(self):
+            class income_tax(variable):
+                def formula(person, period, parameters):
+                    return 2 * person("employment_income", period)
+
+            self.update_variable(income_tax)
+
+    class CachedMicrosimulation(microsimulation_class):
+        result_cache_folder = tmp_path / "results"
+
+    class PostReformMicrosimulation(CachedMicrosimulation):
+        post_reform = double_income_tax
+
+    baseline = CachedMicrosimulation()
+    baseline.calc("income_tax")
+    reformed = PostReformMicrosimulation()
+
+    assert reformed.result_cache_key() != baseline.result_cache_key()
+    assert not np.array_equal(
+        reformed.calc("income_tax").values, baseline.calc("income_tax").values
+    )
+
+
+# Reads household net income through a result cache in a new process,
+# printing the number of cache hits.
+READ_IN_NEW_PROCESS = """
+import sys
+from openfisca_tools.testing.synthetic import (
+    SyntheticDataset,
+    synthetic_microsimulation_class,
+)
+
+dataset = type(
+    "SyntheticDataset",
+    (SyntheticDataset,),
+    dict(folder_path=sys.argv[1], households=100, synthetic_variables=0, seed=0),
+)()
+
+
+class CachedMicrosimulation(synthetic_microsimulation_class(dataset)):
+    result_cache_folder = sys.argv[2]
+
+
+sim = CachedMicrosimulation()
+sim.calc("household_net_income")
+print(sim.result_cache.hits)
+"""
+
+
+def test_results_persist_between_processes(microsimulation_class, tmp_path):
+    """Tests that results stored by one process are read by another, including for carried-over input variables."""
+
+    dataset = microsimulation_class.default_dataset
+    age = dataset.load(2022, "age")
+    # An input variable with a formula, so carried over by a closure.
+    dataset.save(2022, "is_adult", age >= 18)
+
+    class CachedMicrosimulation(microsimulation_class):
+        result_cache_folder = tmp_path / "results"
+
+    CachedMicrosimulation().calc("household_net_income")
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            READ_IN_NEW_PROCESS,
+            str(dataset.folder_path),
+            str(tmp_path / "results"),
+        ],
+        env=dict(
+            os.environ,
+            PYTHONPATH=str(Path(openfisca_tools.__file__).parents[1]),
+        ),
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    assert int(output.split()[-1]) == 1
+
+
+def test_fingerprints_include_default_arguments():
+    """Tests that functions differing only in their default arguments, or in functions they close over, have different fingerprints."""
+
+    def formula(person, period, parameters, rate=0.1):
+        return rate
+
+    def other_formula(person, period, parameters, rate=0.2):
+        return rate
+
+    def wrap(function):
+        def wrapper(person, period, parameters):
+            return function(person, period, parameters)
+
+        return wrapper
+
+    assert fingerprint_function(formula) != fingerprint_function(other_formula)
+    assert fingerprint_function(wrap(formula)) != fingerprint_function(
+        wrap(other_formula)
+    )
+    assert fingerprint_function(wrap(formula)) == fingerprint_function(
+        wrap(formula)
+    )
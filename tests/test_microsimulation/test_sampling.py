@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from openfisca_tools.testing.synthetic import (
+    synthetic_dataset,
+    synthetic_microsimulation_class,
+)
+
+
+@pytest.fixture
+def large_microsimulation_class(tmp_path) -> type:
+    return synthetic_microsimulation_class(
+        synthetic_dataset(tmp_path, households=2_000)
+    )
+
+
+def test_sample_keeps_households_whole(large_microsimulation_class):
+    """Tests that a subsample contains whole households, reweighted to the dataset's total weight."""
+    full = large_microsimulation_class()
+    sample = large_microsimulation_class(sample_fraction=0.1)
+
+    households = sample.calc("household_id").values
+    assert len(households) == pytest.approx(200, abs=10)
+    assert np.array_equal(
+        sample.calc("household_size").values,
+        full.calc("household_size").values[households],
+    )
+    assert sample.weights("household").sum() == pytest.approx(
+        full.weights("household").sum(), rel=0.02
+    )
+    same_seed = large_microsimulation_class(sample_fraction=0.1)
+    assert np.array_equal(same_seed.calc("household_id").values, households)
+
+
+def test_sample_standard_errors(large_microsimulation_class):
+    """Tests that subsample estimates are close to full results, relative to their standard errors."""
+    full = large_microsimulation_class()
+    sample = large_microsimulation_class(sample_fraction=0.1)
+    variables = ["employment_income", "benefit", "household_net_income"]
+
+    for how in ("sum", "mean", "count"):
+        estimates = sample.aggregate(variables, how=how)
+        errors = sample.standard_errors(variables, how=how)
+        actual = full.aggregate(variables, how=how)
+        for variable in variables:
+            assert errors[variable] > 0
+            assert abs(estimates[variable] - actual[variable]) < 4 * (
+                errors[variable]
+            )
+    assert full.standard_errors(variables) == dict.fromkeys(variables, 0.0)
+    census = large_microsimulation_class(sample_fraction=1)
+    assert census.standard_errors(variables) == pytest.approx(
+        dict.fromkeys(variables, 0.0), abs=1e-3
+    )
+
+
+def test_sample_baseline_must_match(large_microsimulation_class):
+    """Tests that a subsampled simulation can't use a baseline with a different sample."""
+    baseline = large_microsimulation_class()
+    with pytest.raises(ValueError):
+        large_microsimulation_class(baseline=baseline, sample_fraction=0.1)
@@ -0,0 +1,106 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+import numpy as np
+import pytest
+import openfisca_tools
+from openfisca_tools.reforms import set_parameter
+from openfisca_tools.testing.synthetic import synthetic_dataset
+
+
+def test_state_restores_results(microsimulation_class, tmp_path):
+    """Tests that a saved simulation is restored with its inputs, results and dependencies, without recalculating."""
+    sim = microsimulation_class()
+    income = sim.calc("household_net_income").values
+    age_group = sim.calc("age_group", weighted=False)
+    sim.save_state(tmp_path / "state.h5")
+
+    restored = microsimulation_class(state=tmp_path / "state.h5")
+    holder = restored.simulation.get_holder("household_net_income")
+    # Arrays are memory-mapped, read-only.
+    assert not holder.get_array(2022).flags.writeable
+    assert np.array_equal(restored.calc("household_net_income").values, income)
+    assert np.array_equal(
+        restored.calc("age_group", weighted=False), age_group
+    )
+    assert np.allclose(
+        restored.calc("benefit", period=2023).values,
+        sim.calc("benefit", period=2023).values,
+    )
+    assert np.array_equal(
+        restored.membership["household"].group_index,
+        sim.membership["household"].group_index,
+    )
+
+    # The restored simulation can be a baseline for reforms.
+    reform = set_parameter("tax.rate", 0.4)
+    reformed = microsimulation_class(reform, baseline=restored)
+    assert np.allclose(
+        reformed.calc("household_net_income").values,
+        microsimulation_class(reform).calc("household_net_income").values,
+    )
+    assert np.shares_memory(
+        reformed.calc("household_size").values,
+        restored.calc("household_size").values,
+    )
+
+    with pytest.raises(ValueError):
+        microsimulation_class(reform, state=tmp_path / "state.h5")
+    with pytest.raises(ValueError):
+        reformed.save_state(tmp_path / "reformed.h5")
+
+
+def test_state_must_match_dataset(microsimulation_class, tmp_path):
+    """Tests that a state can't be restored with a different dataset from the one it was saved from."""
+    microsimulation_class().save_state(tmp_path / "state.h5")
+    other = synthetic_dataset(tmp_path / "other", seed=1)
+    with pytest.raises(ValueError):
+        microsimulation_class(dataset=other, state=tmp_path / "state.h5")
+
+
+# Restores a simulation state in a new process, printing a total.
+RESTORE_IN_NEW_PROCESS = """
+import sys
+from openfisca_tools.testing.synthetic import (
+    SyntheticDataset,
+    synthetic_microsimulation_class,
+)
+
+dataset = type(
+    "SyntheticDataset",
+    (SyntheticDataset,),
+    dict(folder_path=sys.argv[1], households=100, synthetic_variables=0, seed=0),
+)()
+sim = synthetic_microsimulation_class(dataset)(state=sys.argv[2])
+print(sim.calc("household_net_income").sum())
+"""
+
+
+def test_state_restores_in_new_process(microsimulation_class, tmp_path):
+    """Tests that a state saved in one process can be restored in another, including with carried-over input variables."""
+    dataset = microsimulation_class.default_dataset
+    age = dataset.load(2022, "age")
+    # An input variable with a formula, so carried over by a closure.
+    dataset.save(2022, "is_adult", age >= 18)
+    sim = microsimulation_class()
+    total = sim.calc("household_net_income").sum()
+    sim.save_state(tmp_path / "state.h5")
+
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            RESTORE_IN_NEW_PROCESS,
+            str(dataset.folder_path),
+            str(tmp_path / "state.h5"),
+        ],
+        env=dict(
+            os.environ,
+            PYTHONPATH=str(Path(openfisca_tools.__file__).parents[1]),
+        ),
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    assert np.isclose(float(output.split()[-1]), total)
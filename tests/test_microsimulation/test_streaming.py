@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from openfisca_tools.reforms import set_parameter
+
+
+def test_stream_matches_full_simulation(microsimulation_class, tmp_path):
+    """Tests that merged chunk results equal those of simulating all households at once."""
+    reform = set_parameter("tax.rate", 0.3)
+    variables = ["income_tax", "benefit", "household_net_income"]
+    output_file = tmp_path / "output.csv"
+    results = microsimulation_class.stream(
+        variables,
+        reform=reform,
+        chunk_size=7,
+        map_to="household",
+        output_file=output_file,
+    )
+    sim = microsimulation_class(reform)
+
+    for variable in variables:
+        values = sim.calc(variable, map_to="household")
+        assert np.isclose(results["sum"][variable], values.sum())
+        assert np.isclose(results["mean"][variable], values.mean())
+        assert np.isclose(results["count"][variable], (values != 0).sum())
+    output = pd.read_csv(output_file)
+    assert list(output.columns) == variables
+    assert np.isclose(
+        output.household_net_income.sum(),
+        sim.calc("household_net_income", weighted=False).sum(),
+    )
+
+
+def test_stream_builds_tax_benefit_system_once(microsimulation_class):
+    """Tests that streamed chunks share one cached tax-benefit system."""
+    built = []
+    system_class = microsimulation_class.tax_benefit_system
+
+    class CountingMicrosimulation(microsimulation_class):
+        @staticmethod
+        def tax_benefit_system():
+            built.append(1)
+            return system_class()
+
+    CountingMicrosimulation.stream(["income_tax"], chunk_size=7)
+    assert len(built) == 1
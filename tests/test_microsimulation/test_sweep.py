@@ -0,0 +1,39 @@
+import numpy as np
+from openfisca_tools.reforms import set_parameter
+from openfisca_tools.sweep import _worker
+
+
+def test_sweep_matches_separate_simulations(microsimulation_class):
+    """Tests that reforms evaluated in worker processes give the same totals as serial runs."""
+    reforms = {
+        rate: set_parameter("tax.rate", rate) for rate in (0.1, 0.2, 0.3)
+    }
+    results = microsimulation_class.sweep(
+        reforms,
+        variables=["income_tax"],
+        metrics=dict(
+            mean_benefit=lambda sim: sim.calc("benefit").mean(),
+        ),
+        processes=2,
+    )
+
+    assert len(results) == 6
+    totals = results[results.output == "income_tax"].set_index("reform").value
+    for rate, reform in reforms.items():
+        sim = microsimulation_class(reform)
+        assert np.isclose(totals[rate], sim.calc("income_tax").sum())
+    assert results[results.output == "mean_benefit"].value.nunique() == 1
+    assert microsimulation_class.default_dataset.memory_map_folder(
+        2022
+    ).exists()
+
+
+def test_sweep_in_process_releases_state(microsimulation_class):
+    """Tests that a sweep run in this process doesn't keep its simulations alive."""
+    results = microsimulation_class.sweep(
+        [set_parameter("tax.rate", 0.3)],
+        variables=["income_tax"],
+        processes=1,
+    )
+    assert len(results) == 1
+    assert _worker == {}